@@ -2,33 +2,100 @@ from app.agents.report_agent_module.utility_report import Node
 import re
 from .template_generator import ResultTemplate, Product, Reviews, Purchase_Info_Stores
 import os
-import h5py
 import hashlib
 import json
+import time
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Optional
+from app.config import settings
+from .cache_backend import open_backend
 from app.utils.logger import logger
+@dataclass
+class CachePolicy:
+    """캐시 네임스페이스(파일 이름)별 만료/크기 제한 정책"""
+    ttl: Optional[float] = None          # 항목 유효 시간(초), None이면 만료 없음
+    max_entries: Optional[int] = None    # 최대 항목 수
+    max_bytes: Optional[int] = None      # 값 크기 합계 상한
+    eviction: str = "lru"                # 상한 초과 시 제거 순서: lru 또는 lfu
+    compact_interval: float = 600.0      # 백그라운드 만료 정리/파일 재작성 주기(초), 0이면 사용 안 함
+
+
+def get_cache_policy(namespace):
+    """settings.CACHE_POLICIES의 default 정책에 네임스페이스별 설정을 덮어씁니다."""
+    fields = dict(settings.CACHE_POLICIES.get("default", {}))
+    fields.update(settings.CACHE_POLICIES.get(namespace, {}))
+    return CachePolicy(**fields)
+
+
+class _Compactor:
+    """
+    모든 CacheManager의 만료 정리와 파일 재작성을 하나의 데몬 스레드에서 수행합니다.
+    매니저는 약한 참조로만 보관하므로 리포터마다 만든 CacheManager도 정상적으로 해제됩니다.
+    """
+    def __init__(self):
+        self.managers = weakref.WeakSet()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def register(self, manager):
+        with self.lock:
+            self.managers.add(manager)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="cache-compactor", daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(10)
+            now = time.time()
+            for manager in list(self.managers):
+                interval = manager.policy.compact_interval
+                if manager.backend is not None and interval and now - manager.last_compacted >= interval:
+                    try:
+                        manager.purge_expired()
+                        manager.compact()
+                    except Exception as e:
+                        logger.error(f"캐시 압축 실패 ({manager.file_path}): {e}")
+
+
+_compactor = _Compactor()
+
+
 class CacheManager:
     """
-    HDF5 파일을 사용하여 해시화된 키-값 쌍을 저장하고 검색하는 클래스
+    해시화된 키-값 쌍을 저장하고 검색하는 클래스
+    저장은 CacheBackend(settings.CACHE_BACKEND: 기본 SQLite WAL, 또는 기존 HDF5)에 맡기고,
+    여기서는 네임스페이스 정책(CachePolicy)에 따른 TTL 만료와 LRU/LFU 제거를 수행합니다.
+    조회 기록(최근 사용 시각, 사용 횟수)은 모아 두었다가 쓰기/압축/종료 때 한 번에 반영합니다.
     """
-    def __init__(self, file_path):
+    def __init__(self, file_path, policy=None, backend=None):
         """
         파일 경로를 입력받아 초기화하고, 파일이 없으면 생성함
         
         Args:
-            file_path (str): HDF5 파일의 경로 (확장자 포함)
+            file_path (str): HDF5 파일의 경로 (확장자 포함, SQLite 백엔드는 같은 이름의 .sqlite3 파일 사용)
+            policy (CachePolicy, optional): 없으면 파일 이름(확장자 제외)을 네임스페이스로 settings에서 조회
+            backend (CacheBackend, optional): 없으면 open_backend(file_path)
         """
         self.file_path = file_path
-        self.get_dict = {}  # 검색 결과를 저장할 딕셔너리
+        self.get_dict = {}  # 마지막 get_value 검색 결과
         # 확장자가 h5인지 확인
         if not file_path.endswith('.h5'):
             raise ValueError("파일 확장자는 반드시 .h5여야 합니다.")
-        # 파일이 존재하는지 확인
-        if os.path.exists(file_path):
-            # 파일이 존재하면 읽기 모드로 열기
-            self.file = h5py.File(file_path, 'r+')
-        else:
-            # 파일이 존재하지 않으면 생성
-            self.file = h5py.File(file_path, 'w')
+        self.namespace = os.path.splitext(os.path.basename(file_path))[0]
+        self.policy = policy or get_cache_policy(self.namespace)
+        self.on_evict = []  # 항목이 만료/제거될 때 원본 key로 호출할 콜백
+        self._lock = threading.Lock()
+        self._touches = {}  # 해시 키 -> (최근 사용 시각, 사용 횟수 증가분)
+        self.last_compacted = time.time()
+        self.backend = backend or open_backend(file_path)
+        self.purge_expired()
+        self._enforce_bounds()
+        if self.policy.compact_interval:
+            _compactor.register(self)
+
     def _hash_key(self, key):
         """
         키 값을 SHA-256 해시로 변환
@@ -40,11 +107,77 @@ class CacheManager:
         """
         key_str = str(key)
         return hashlib.sha256(key_str.encode('utf-8')).hexdigest()
-    def add_hash(self, input_dict, reject_key=None, require_key=None):
+
+    def __contains__(self, key):
+        """원본 key가 만료되지 않은 상태로 저장돼 있는지 확인합니다."""
+        meta = self.backend.meta(self._hash_key(key))
+        return meta is not None and not self._expired(meta, time.time())
+
+    # ---- 만료/제거 ----
+    def _expired(self, meta, now):
+        ttl = meta.get("ttl") if meta.get("ttl") is not None else self.policy.ttl
+        return ttl is not None and now - meta["created"] > ttl
+
+    def _delete(self, hashed_keys):
+        for key in self.backend.delete_many(hashed_keys):
+            for callback in self.on_evict:
+                try:
+                    callback(key)
+                except Exception as e:
+                    logger.error(f"캐시 제거 콜백 실패: {e}")
+
+    def purge_expired(self):
+        """TTL이 지난 항목을 모두 삭제하고 삭제 수를 반환합니다."""
+        expired = self.backend.expired_keys(time.time(), self.policy.ttl)
+        self._delete(expired)
+        return len(expired)
+
+    def _enforce_bounds(self, protect=()):
+        """
+        항목 수/크기 상한을 넘으면 정책(LRU/LFU) 순서로 제거합니다.
+        protect(방금 저장한 해시 키)는 맨 마지막에 제거합니다. LFU에서는 새 항목의 사용 횟수가 0이라
+        그대로 두면 캐시가 찬 뒤로는 새 항목이 저장되자마자 제거되기 때문입니다.
+        """
+        policy = self.policy
+        if policy.max_entries is None and policy.max_bytes is None:
+            return
+        count, total_bytes = self.backend.stats()
+        def over():
+            return ((policy.max_entries is not None and count > policy.max_entries) or
+                    (policy.max_bytes is not None and total_bytes > policy.max_bytes))
+        if not over():
+            return
+        self._flush_touches()
+        protect = set(protect)
+        order = self.backend.eviction_order(policy.eviction)
+        order = [item for item in order if item[0] not in protect] + [item for item in order if item[0] in protect]
+        victims = []
+        for hashed_key, size in order:
+            if not over():
+                break
+            victims.append(hashed_key)
+            count -= 1
+            total_bytes -= size
+        self._delete(victims)
+
+    def _flush_touches(self):
+        with self._lock:
+            touches, self._touches = self._touches, {}
+        if touches:
+            self.backend.touch_many(touches)
+
+    def compact(self):
+        """조회 기록을 반영하고, 삭제된 항목이 있으면 저장소 파일을 다시 씁니다."""
+        self.last_compacted = time.time()
+        self._flush_touches()
+        self.backend.flush()
+        return self.backend.compact()
+
+    def add_hash(self, input_dict, reject_key=None, require_key=None, ttl=None):
         """
         input_dict의 각 key에 대해, 해당 value가 딕셔너리들의 리스트여야 하며,
         각 리스트 요소(딕셔너리)에 대해 require_key 및 reject_key 조건을 적용하여
-        조건을 만족하는 요소들만 필터링한 결과를 H5 파일에 저장합니다.
+        조건을 만족하는 요소들만 필터링한 결과를 저장소에 저장합니다 (여러 키는 한 번에 원자적으로).
         
         Args:
             input_dict (dict): 저장할 키-값 쌍이 있는 딕셔너리.
@@ -57,6 +190,7 @@ class CacheManager:
                 - 리스트 형태로 필수 키들을 지정.
                 - 각 리스트 요소의 딕셔너리에 이 리스트의 모든 키가 존재할 때만 해당 요소를 포함.
                 - None이면 조건 없이 포함.
+            ttl (float, optional): 이 항목들만의 유효 시간(초), None이면 네임스페이스 정책을 따름.
                 
         Returns:
             bool: 적어도 하나의 항목이 새로 추가되면 True, 아니면 False.
@@ -64,8 +198,7 @@ class CacheManager:
         if not input_dict:
             return False
 
-        success = False
-
+        entries = []
         # input_dict의 각 key와 그에 해당하는 리스트 처리
         for key, value_list in input_dict.items():
             # value가 리스트가 아닌 경우 건너뜁니다.
@@ -104,58 +237,85 @@ class CacheManager:
             if not filtered_list:
                 continue
 
-            # HDF5에 저장할 키 생성 및 이미 존재하는지 확인
+            # 이미 유효한 항목이 있으면 건너뛰고, 나머지는 한 번에 저장
             hashed_key = self._hash_key(key)
-            if hashed_key in self.file:
+            meta = self.backend.meta(hashed_key)
+            if meta is not None and not self._expired(meta, time.time()):
                 continue
 
             # 원본 key와 필터링된 리스트를 JSON 문자열로 직렬화하여 저장
             value_str = json.dumps({"key": key, "value": filtered_list})
-            self.file.create_dataset(hashed_key, data=value_str.encode('utf-8'))
-            success = True
+            entries.append((hashed_key, key, value_str, ttl))
 
-        self.file.flush()
-        return success
+        if not entries:
+            return False
+        self.backend.put_many(entries)
+        self._flush_touches()
+        self._enforce_bounds(protect=[entry[0] for entry in entries])
+        return True
 
+    def get_values(self, keys):
+        """
+        키들을 해시화하여 저장소에서 검색 (만료된 항목은 삭제하고 없는 것으로 처리)
 
+        Returns:
+            dict: {원본 key: 값} (찾은 항목만)
+        """
+        found = {}
+        expired = []
+        now = time.time()
+        for key in keys:
+            hashed_key = self._hash_key(key)
+            hit = self.backend.get(hashed_key)
+            if hit is None:
+                continue
+            value_str, meta = hit
+            if self._expired(meta, now):
+                expired.append(hashed_key)
+                continue
+            value_data = json.loads(value_str)
+            # 원본 키와 값으로 결과 딕셔너리 구성
+            found[value_data["key"]] = value_data["value"]
+            with self._lock:
+                _, hits = self._touches.get(hashed_key, (now, 0))
+                self._touches[hashed_key] = (now, hits + 1)
+        if expired:
+            self._delete(expired)
+        return found
 
     def get_value(self, input_dict):
         """
-        딕셔너리의 키를 해시화하여 H5 파일에서 검색
+        딕셔너리의 키를 해시화하여 검색하고 결과를 self.get_dict에 저장
+        (여러 스레드가 같은 인스턴스를 쓰면 get_values의 반환값을 사용)
         
         Args:
             input_dict (dict): 검색할 키가 있는 딕셔너리
             
         Returns:
-            bool: 모든 키가 파일에서 발견되면 True, 하나라도 없으면 False
+            bool: 모든 키가 발견되면 True, 하나라도 없으면 False
         """
         if not input_dict:
             return False
-        # 결과 딕셔너리 초기화
-        self.get_dict = {}
-        found_all = True
-        for key in input_dict.keys():
-            hashed_key = self._hash_key(key)
-            
-            # 해시 키가 H5 파일에 있는지 확인
-            if hashed_key in self.file:
-                # 데이터셋에서 값 읽기
-                value_bytes = self.file[hashed_key][()]
-                value_str = value_bytes.decode('utf-8')
-                value_data = json.loads(value_str)
-                
-                # 원본 키와 값으로 결과 딕셔너리 구성
-                self.get_dict[value_data["key"]] = value_data["value"]
-            else:
-                found_all = False
-        return found_all
+        self.get_dict = self.get_values(list(input_dict.keys()))
+        return len(self.get_dict) == len(input_dict)
+
+    def remove(self, key):
+        """원본 key에 해당하는 항목을 삭제합니다."""
+        hashed_key = self._hash_key(key)
+        if self.backend.meta(hashed_key) is None:
+            return False
+        self._delete([hashed_key])
+        return True
+
     def clean(self):
-        if self.file is not None:
+        backend = getattr(self, "backend", None)
+        if backend is not None:
             try:
-                self.file.close()
+                self._flush_touches()
+                backend.close()
             except Exception as e:
                 print("파일 닫는 중 에러 발생:", e)
-            self.file = None
+            self.backend = None
     def __del__(self):
         """
         객체가 소멸될 때 clean 메서드 호출
@@ -196,8 +356,9 @@ class BaseReporter:
         return data if data is not None else []
     
     def get_response(self):
-        if self.cache.get_value(self.find_dict):
-            return list(self.cache.get_dict.values())[0],["cached output"]
+        found=self.cache.get_values(list(self.find_dict.keys())) if self.find_dict else {}
+        if found and len(found)==len(self.find_dict):
+            return list(found.values())[0],["cached output"]
         else:
             result, response=self.get_response_with_llm()
             if not self.cache_key:
@@ -0,0 +1,430 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+import h5py
+from app.config import settings
+from app.utils.logger import logger
+
+
+class CacheBackend(ABC):
+    """
+    CacheManager가 사용하는 키-값 저장소 인터페이스
+    항목은 해시 키 -> (원본 key, JSON 값 문자열, 메타데이터) 이고,
+    메타데이터는 {'key', 'created', 'accessed', 'hits', 'size', 'ttl'} 형식입니다
+    (ttl은 항목별 유효 시간, None이면 네임스페이스 정책을 따름).
+    """
+
+    @abstractmethod
+    def get(self, hashed_key):
+        """(값 문자열, 메타데이터) 또는 None"""
+
+    @abstractmethod
+    def meta(self, hashed_key):
+        """메타데이터 또는 None"""
+
+    @abstractmethod
+    def put_many(self, entries):
+        """[(해시 키, 원본 key, 값 문자열, ttl), ...]을 한 번에(원자적으로) 저장합니다. 같은 해시 키는 덮어씁니다."""
+
+    @abstractmethod
+    def touch_many(self, touches):
+        """{해시 키: (최근 사용 시각, 증가할 사용 횟수)}를 반영합니다."""
+
+    @abstractmethod
+    def delete_many(self, hashed_keys):
+        """항목을 삭제하고 실제로 삭제된 항목의 원본 key 목록을 반환합니다."""
+
+    @abstractmethod
+    def iter_meta(self):
+        """(해시 키, 메타데이터)를 순회합니다."""
+
+    @abstractmethod
+    def compact(self):
+        """삭제로 생긴 빈 공간을 회수합니다. 수행했으면 True"""
+
+    @abstractmethod
+    def close(self):
+        """저장소를 닫습니다."""
+
+    def flush(self):
+        """버퍼에 남은 변경을 저장소에 씁니다."""
+
+    def stats(self):
+        """(항목 수, 값 크기 합계)"""
+        count = total = 0
+        for _, meta in self.iter_meta():
+            count += 1
+            total += meta["size"]
+        return count, total
+
+    def expired_keys(self, now, default_ttl=None):
+        """만료된 항목의 해시 키 (항목 ttl이 없으면 default_ttl 적용, 둘 다 없으면 만료 없음)"""
+        expired = []
+        for hashed_key, meta in self.iter_meta():
+            ttl = meta.get("ttl") if meta.get("ttl") is not None else default_ttl
+            if ttl is not None and now - meta["created"] > ttl:
+                expired.append(hashed_key)
+        return expired
+
+    def eviction_order(self, eviction):
+        """제거 순서대로 (해시 키, 크기) (lru: 오래 안 쓴 순, lfu: 적게 쓴 순)"""
+        metas = list(self.iter_meta())
+        if eviction == "lfu":
+            metas.sort(key=lambda item: (item[1]["hits"], item[1]["accessed"]))
+        else:
+            metas.sort(key=lambda item: item[1]["accessed"])
+        return [(hashed_key, meta["size"]) for hashed_key, meta in metas]
+
+    def items(self):
+        """(해시 키, 원본 key, 값 문자열, 메타데이터)를 순회합니다 (다른 백엔드로 옮길 때 사용)."""
+        for hashed_key, meta in list(self.iter_meta()):
+            found = self.get(hashed_key)
+            if found is not None:
+                yield hashed_key, meta["key"], found[0], found[1]
+
+
+class HDF5Backend(CacheBackend):
+    """
+    해시 키마다 데이터셋 하나를 쓰는 기존 HDF5 형식
+    메타데이터는 데이터셋 속성에 저장하고 메모리에도 올려 두며, 사용 기록은 flush 때 모아서 씁니다.
+    HDF5는 동시에 여러 곳에서 쓰는 것을 허용하지 않으므로 한 프로세스의 한 인스턴스만 쓰는 용도입니다.
+    """
+    def __init__(self, file_path, readonly=False):
+        self.file_path = file_path
+        self.readonly = readonly
+        self._lock = threading.RLock()
+        self._meta = {}
+        self._dirty = set()
+        self._deleted = 0
+        self._open()
+        self._load_meta()
+
+    def _open(self):
+        if self.readonly:
+            self.file = h5py.File(self.file_path, 'r')
+        elif os.path.exists(self.file_path):
+            self.file = h5py.File(self.file_path, 'r+')
+        else:
+            self.file = h5py.File(self.file_path, 'w')
+
+    def _load_meta(self):
+        """속성이 없는 예전 항목은 값을 한 번 읽어 원본 key를 얻고 지금 시각으로 채웁니다."""
+        now = time.time()
+        for hashed_key, dataset in self.file.items():
+            attrs = dataset.attrs
+            if "created" in attrs:
+                meta = {
+                    "key": json.loads(attrs["key"]),
+                    "created": float(attrs["created"]),
+                    "accessed": float(attrs["accessed"]),
+                    "hits": int(attrs["hits"]),
+                    "size": int(attrs["size"]),
+                    "ttl": float(attrs["ttl"]) if "ttl" in attrs else None,
+                }
+            else:
+                value_bytes = dataset[()]
+                meta = {
+                    "key": json.loads(value_bytes.decode('utf-8'))["key"],
+                    "created": now,
+                    "accessed": now,
+                    "hits": 0,
+                    "size": len(value_bytes),
+                    "ttl": None,
+                }
+                self._dirty.add(hashed_key)
+            self._meta[hashed_key] = meta
+        self.flush()
+
+    def get(self, hashed_key):
+        with self._lock:
+            meta = self._meta.get(hashed_key)
+            if meta is None:
+                return None
+            return self.file[hashed_key][()].decode('utf-8'), dict(meta)
+
+    def meta(self, hashed_key):
+        meta = self._meta.get(hashed_key)
+        return dict(meta) if meta is not None else None
+
+    def put_many(self, entries):
+        with self._lock:
+            now = time.time()
+            for hashed_key, key, value_str, ttl in entries:
+                data = value_str.encode('utf-8')
+                if hashed_key in self.file:
+                    del self.file[hashed_key]
+                    self._deleted += 1
+                self.file.create_dataset(hashed_key, data=data)
+                self._meta[hashed_key] = {"key": key, "created": now, "accessed": now, "hits": 0,
+                                          "size": len(data), "ttl": ttl}
+                self._dirty.add(hashed_key)
+            self.flush()
+
+    def touch_many(self, touches):
+        with self._lock:
+            for hashed_key, (accessed, hits) in touches.items():
+                meta = self._meta.get(hashed_key)
+                if meta is not None:
+                    meta["accessed"] = max(meta["accessed"], accessed)
+                    meta["hits"] += hits
+                    self._dirty.add(hashed_key)
+
+    def delete_many(self, hashed_keys):
+        with self._lock:
+            removed = []
+            for hashed_key in hashed_keys:
+                meta = self._meta.pop(hashed_key, None)
+                self._dirty.discard(hashed_key)
+                if hashed_key in self.file:
+                    del self.file[hashed_key]
+                    self._deleted += 1
+                if meta is not None:
+                    removed.append(meta["key"])
+            if removed:
+                self.file.flush()
+            return removed
+
+    def iter_meta(self):
+        return [(hashed_key, dict(meta)) for hashed_key, meta in list(self._meta.items())]
+
+    def flush(self):
+        with self._lock:
+            if self.readonly or self.file is None:
+                return
+            for hashed_key in self._dirty:
+                meta = self._meta.get(hashed_key)
+                if meta is None or hashed_key not in self.file:
+                    continue
+                attrs = self.file[hashed_key].attrs
+                attrs["key"] = json.dumps(meta["key"])
+                for name in ("created", "accessed", "hits", "size"):
+                    attrs[name] = meta[name]
+                if meta.get("ttl") is not None:
+                    attrs["ttl"] = meta["ttl"]
+            self._dirty.clear()
+            self.file.flush()
+
+    def compact(self):
+        """살아 있는 항목만 새 파일로 복사해 교체합니다."""
+        with self._lock:
+            if self.file is None or self.readonly:
+                return False
+            self.flush()
+            if not self._deleted:
+                return False
+            tmp_path = self.file_path + ".compact"
+            with h5py.File(tmp_path, 'w') as dst:
+                for hashed_key in self.file:
+                    self.file.copy(self.file[hashed_key], dst, name=hashed_key)
+            self.file.close()
+            os.replace(tmp_path, self.file_path)
+            self._open()
+            self._deleted = 0
+            return True
+
+    def close(self):
+        with self._lock:
+            if self.file is not None:
+                self.flush()
+                self.file.close()
+                self.file = None
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    WAL 모드 SQLite 저장소
+    읽기는 스레드별 연결로 동시에 처리하고, 쓰기는 프로세스 안에서는 writer 락,
+    프로세스 사이에서는 BEGIN IMMEDIATE(예약 잠금)로 직렬화합니다. 여러 키 저장은 한 트랜잭션입니다.
+    처음 열 때 migrate_from(기존 HDF5 파일)이 있으면 그 항목을 한 번 가져옵니다.
+    """
+    def __init__(self, db_path, migrate_from=None, busy_timeout=30.0):
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._connections = []
+        self._conn_lock = threading.Lock()
+        self._writer = threading.Lock()
+        self._deleted = 0
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " hashed TEXT PRIMARY KEY, key TEXT NOT NULL, value TEXT NOT NULL,"
+                " created REAL NOT NULL, accessed REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0,"
+                " size INTEGER NOT NULL, ttl REAL)"
+            )
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(entries)")]
+            if "ttl" not in columns:
+                conn.execute("ALTER TABLE entries ADD COLUMN ttl REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_created ON entries(created)")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed)")
+            conn.execute("CREATE TABLE IF NOT EXISTS info (name TEXT PRIMARY KEY, value TEXT)")
+        if migrate_from and os.path.exists(migrate_from):
+            self._migrate(migrate_from)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._conn_lock:
+                self._connections.append(conn)
+        return conn
+
+    class _Transaction:
+        def __init__(self, backend):
+            self.backend = backend
+
+        def __enter__(self):
+            self.backend._writer.acquire()
+            self.conn = self.backend._conn()
+            try:
+                self.conn.execute("BEGIN IMMEDIATE")
+            except Exception:
+                self.backend._writer.release()
+                raise
+            return self.conn
+
+        def __exit__(self, exc_type, exc_val, exc_tb):
+            try:
+                self.conn.execute("COMMIT" if exc_type is None else "ROLLBACK")
+            finally:
+                self.backend._writer.release()
+
+    def _transaction(self):
+        return self._Transaction(self)
+
+    def _migrate(self, h5_path):
+        """기존 HDF5 캐시 항목을 가져옵니다 (info 테이블에 기록해 한 번만)."""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT value FROM info WHERE name = 'migrated_from'").fetchone()
+            if row is not None:
+                return
+            source = HDF5Backend(h5_path, readonly=True)
+            try:
+                rows = [(hashed_key, json.dumps(key), value_str,
+                         meta["created"], meta["accessed"], meta["hits"], meta["size"], meta.get("ttl"))
+                        for hashed_key, key, value_str, meta in source.items()]
+            finally:
+                source.close()
+            conn.executemany(
+                "INSERT OR IGNORE INTO entries (hashed, key, value, created, accessed, hits, size, ttl)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            conn.execute("INSERT INTO info VALUES ('migrated_from', ?)", (h5_path,))
+        logger.info(f"HDF5 캐시 {len(rows)}개 항목을 {self.db_path}로 옮겼습니다.")
+
+    @staticmethod
+    def _row_meta(row):
+        key, created, accessed, hits, size, ttl = row
+        return {"key": json.loads(key), "created": created, "accessed": accessed, "hits": hits,
+                "size": size, "ttl": ttl}
+
+    def get(self, hashed_key):
+        row = self._conn().execute(
+            "SELECT value, key, created, accessed, hits, size, ttl FROM entries WHERE hashed = ?", (hashed_key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], self._row_meta(row[1:])
+
+    def meta(self, hashed_key):
+        row = self._conn().execute(
+            "SELECT key, created, accessed, hits, size, ttl FROM entries WHERE hashed = ?", (hashed_key,)
+        ).fetchone()
+        return self._row_meta(row) if row is not None else None
+
+    def put_many(self, entries):
+        now = time.time()
+        rows = [(hashed_key, json.dumps(key), value_str, now, now, len(value_str.encode('utf-8')), ttl)
+                for hashed_key, key, value_str, ttl in entries]
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO entries (hashed, key, value, created, accessed, hits, size, ttl)"
+                " VALUES (?, ?, ?, ?, ?, 0, ?, ?)", rows
+            )
+
+    def touch_many(self, touches):
+        if not touches:
+            return
+        with self._transaction() as conn:
+            conn.executemany(
+                "UPDATE entries SET accessed = MAX(accessed, ?), hits = hits + ? WHERE hashed = ?",
+                [(accessed, hits, hashed_key) for hashed_key, (accessed, hits) in touches.items()]
+            )
+
+    def delete_many(self, hashed_keys):
+        removed = []
+        if not hashed_keys:
+            return removed
+        with self._transaction() as conn:
+            for hashed_key in hashed_keys:
+                row = conn.execute("SELECT key FROM entries WHERE hashed = ?", (hashed_key,)).fetchone()
+                if row is not None:
+                    conn.execute("DELETE FROM entries WHERE hashed = ?", (hashed_key,))
+                    removed.append(json.loads(row[0]))
+        self._deleted += len(removed)
+        return removed
+
+    def iter_meta(self):
+        rows = self._conn().execute("SELECT hashed, key, created, accessed, hits, size, ttl FROM entries").fetchall()
+        return [(row[0], self._row_meta(row[1:])) for row in rows]
+
+    def stats(self):
+        count, total = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return count, total
+
+    def expired_keys(self, now, default_ttl=None):
+        if default_ttl is None:
+            rows = self._conn().execute(
+                "SELECT hashed FROM entries WHERE ttl IS NOT NULL AND created + ttl < ?", (now,)
+            ).fetchall()
+        else:
+            rows = self._conn().execute(
+                "SELECT hashed FROM entries WHERE created + COALESCE(ttl, ?) < ?", (default_ttl, now)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def eviction_order(self, eviction):
+        order = "hits, accessed" if eviction == "lfu" else "accessed"
+        rows = self._conn().execute(f"SELECT hashed, size FROM entries ORDER BY {order}").fetchall()
+        return [(row[0], row[1]) for row in rows]
+
+    def compact(self):
+        """삭제가 있었으면 WAL을 체크포인트하고 VACUUM으로 파일을 다시 씁니다."""
+        if not self._deleted:
+            return False
+        with self._writer:
+            conn = self._conn()
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            conn.execute("VACUUM")
+            self._deleted = 0
+        return True
+
+    def close(self):
+        with self._conn_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception as e:
+                logger.error(f"SQLite 연결 닫기 실패: {e}")
+        self._local = threading.local()
+
+
+def open_backend(file_path, kind=None):
+    """
+    settings.CACHE_BACKEND에 맞는 저장소를 엽니다.
+    sqlite면 같은 이름의 .sqlite3 파일을 쓰고, 기존 .h5 파일은 처음 한 번 가져옵니다.
+    """
+    kind = (kind or settings.CACHE_BACKEND).lower()
+    if kind == "hdf5":
+        return HDF5Backend(file_path)
+    if kind == "sqlite":
+        return SQLiteBackend(os.path.splitext(file_path)[0] + ".sqlite3", migrate_from=file_path)
+    raise ValueError(f"지원하지 않는 캐시 백엔드: {kind}")
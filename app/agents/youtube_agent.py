@@ -2,39 +2,32 @@
 from typing import Dict, Any
 import asyncio
 from .base import BaseAgent
-from .youtube_agent_module.queue_manager import add_log, LogConsumer
+from .youtube_agent_module.queue_manager import add_log, get_log_consumer, stop_log_consumer
 from .youtube_agent_module.cache import YouTubeCacheSystem
 from .youtube_agent_module.search import print_with_output, Keyword_filter
-globalist=[]
 
 def log_wrapper(log_message):
-    globalist.append(log_message)
     add_log(log_message)
     
 class YouTubeAgent(BaseAgent):
     def __init__(self, name="youtube_agent"):
         self.name = name
+        # 요청별 입력/쿼리/출력은 지역 변수로만 다루고, 인스턴스에는 공유 인덱스와 캐시만 둠
         self.filtter= Keyword_filter()
-        self.input= {}
-        self.query= ""
-        self.output= {}
-        self.flag= False    
-        self.log_manager = LogConsumer(max_logs=200)
-        self.log_manager.run()
+        self.log_manager = get_log_consumer(max_logs=200)
         self.CacheSystem = YouTubeCacheSystem()
 
     async def run(self, state: Dict[str, Any]) -> Dict[str, Any]:
         
         # 입력 처리...
-        self.input = state
-        if "query" not in self.input.keys():
+        if "query" not in state.keys():
             log_wrapper( "<<::STATE::ail error: query key is not in input>>")
             return {"fail error": "query key is not in input"}
         
         
-        self.query = [self.input["query"][0] + ", 중요하게 확인할 키워드들 : " + ", ".join(self.input["검색_키워드"]["필수_포함"])]
+        query = [state["query"][0] + ", 중요하게 확인할 키워드들 : " + ", ".join(state["검색_키워드"]["필수_포함"])]
         try:
-            result=self.CacheSystem.find_matching_queries(self.query)
+            result=await self.CacheSystem.afind_matching_queries(query)
             if result:
                 matched_data, matched_query_id = result
                 print(f'Cache : {matched_data}')
@@ -42,7 +35,7 @@ class YouTubeAgent(BaseAgent):
             else:
                 log_wrapper(f"<<::STATE::inference_thread_started>>")
                 # 서브스레드에서 실행하고 결과를 직접 받음
-                result = await asyncio.to_thread(self.run_inference)
+                result = await asyncio.to_thread(self.run_inference, query)
                 
                 log_wrapper(f"<<::STATE::inference_thread_completed>>")
 
@@ -54,34 +47,33 @@ class YouTubeAgent(BaseAgent):
             
             return {"fail error": str(e)}
 
-    def run_inference(self):
+    def run_inference(self, query):
         """결과를 직접 반환하는 서브스레드 메서드"""
         try:
-            # 플래그 설정 (모니터링용)
-            self.flag = True
             # 실제 추론 실행
-            result = self.extract_from_query()
+            result, rag_out = self.extract_from_query(query)
             # 최종 출력 구성
-            self.CacheSystem.add_query(self.query, result)
-            # 플래그 해제
-            self.flag = False
+            # 키워드 필터링 결과가 없어 검색 자체를 못 한 경우(rag_out None)만 짧은 TTL로 실패를 캐시하고,
+            # 클립 추출 실패(marker False)는 LLM/API 일시 오류일 수 있으므로 캐시하지 않음
+            if rag_out is None:
+                self.CacheSystem.add_negative(query, result)
+            elif rag_out.marker:
+                self.CacheSystem.add_query(query, result)
+            else:
+                log_wrapper("클립 추출 실패 결과는 캐시하지 않습니다.")
             
             # 결과 직접 반환
             return result
         except Exception as e:
-            self.flag = False
             log_wrapper(f"서브스레드 오류: {str(e)}")
             raise  # 예외를 메인스레드로 전파
         
-    def extract_from_query(self):
-        a,b,c =print_with_output(self.filtter,self.query)
-        self.output['recent result']= a
-        self.output['key_name']= b
-        self.output['RAGOUT_class']= c
-        self.flag= False        
-        return a
+    def extract_from_query(self, query):
+        a,b,c =print_with_output(self.filtter,query)
+        return a, c
     def clean(self):
-        self.log_manager.stop()
+        # 로그 소비자는 모든 세션이 공유하므로 여기서 멈추지 않음 (앱 종료 시 stop_log_consumer)
+        self.CacheSystem.close()
 
 
 
@@ -91,3 +83,4 @@ if __name__ == "__main__":
     input_data = {"query": "애플 태블릿 추천해줘 "}
     result=asyncio.run(youtube_agent.run(input_data))
     youtube_agent.clean()
+    stop_log_consumer()
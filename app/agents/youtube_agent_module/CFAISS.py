@@ -2,17 +2,15 @@ import faiss
 import h5py
 import numpy as np
 import os
-import hashlib
 from .queue_manager import add_log
+from .video_table import chunk_key
 import openai
 from langchain.schema import Document, BaseRetriever
 from pydantic import Field
 from typing import Any, List
 
 
-globalist=[]
 def log_wrapper(log_message):
-    globalist.append(log_message)
     add_log(log_message)  
 class WrIndexFlatL2:
     def __init__(self, dimension,embedingmodel="text-embedding-3-small"):
@@ -72,15 +70,12 @@ class WrIndexFlatL2:
             raise ValueError("입력 데이터는 딕셔너리여야 합니다.")
 def _hash_trans( metadata, page):
     """
-    WrIndexFlatL2 객체를 입력으로 받아, `metadata + page` 조합을 사용하여 해시값 생성
+    video_id 목록과 page 목록을 입력으로 받아, `video_id + page` 조합의 청크 키 생성
     """
-
-    hash_dict = {}
-    for i in range(len(metadata)):
-        meta=metadata[i][0]
-        unique_key = f"{meta}{page[i][0]}"
-        hash_dict[i] = int(hashlib.sha256(unique_key.encode()).hexdigest(), 16) % (2**63)
-    return hash_dict  # ✅ 해시값을 딕셔너리 형태로 반환 (index -> hash)
+    video_ids = [meta[0] for meta in metadata]
+    pages = [p[0] for p in page]
+    keys = chunk_key(video_ids, pages)
+    return dict(enumerate(keys.tolist()))  # ✅ 청크 키를 딕셔너리 형태로 반환 (index -> key)
 
 
 class HDF5VectorDB:
@@ -97,24 +92,41 @@ class HDF5VectorDB:
         if not os.path.exists(filename):
             with h5py.File(filename, "w") as f:
                 f.create_dataset("vectors", shape=(0, dimension), maxshape=(None, dimension), dtype=np.float32)
-                f.create_dataset("metadata", shape=(0,), maxshape=(None,), dtype=h5py.string_dtype(encoding='utf-8'))
+                f.create_dataset("metadata", shape=(0,), maxshape=(None,), dtype=np.int64)
                 f.create_dataset("hash_table", shape=(0,), maxshape=(None,), dtype=np.int64)
                 f.create_dataset("page", shape=(0,), maxshape=(None,), dtype=np.int64)
                 f.create_dataset("text", shape=(0,), maxshape=(None,), dtype=h5py.string_dtype(encoding='utf-8'))
 
     def _hash_metadata(self, wr_index):
         """
-        WrIndexFlatL2 객체를 입력으로 받아, `metadata + page` 조합을 사용하여 해시값 생성
+        WrIndexFlatL2 객체를 입력으로 받아, `video_id + page` 조합의 청크 키 생성
         """
         if not isinstance(wr_index, WrIndexFlatL2):
             raise ValueError("입력 데이터는 WrIndexFlatL2 객체여야 합니다.")
 
-        hash_dict = {}
-        for i, meta in wr_index.metadata.items():
-            unique_key = f"{meta}{wr_index.page[i]}"
-            hash_dict[i] = int(hashlib.sha256(unique_key.encode()).hexdigest(), 16) % (2**63)
+        indices = list(wr_index.metadata.keys())
+        keys = chunk_key([wr_index.metadata[i] for i in indices], [wr_index.page[i] for i in indices])
+        return dict(zip(indices, keys.tolist()))  # ✅ 청크 키를 딕셔너리 형태로 반환 (index -> key)
+
+    def migrate_metadata(self, key_to_id):
+        """
+        문자열 식별자로 저장된 metadata 컬럼을 video_id(int64)로 변환하고 hash_table을 청크 키로 다시 계산합니다.
+        변환할 식별자를 찾지 못한 행은 -1로 저장됩니다.
 
-        return hash_dict  # ✅ 해시값을 딕셔너리 형태로 반환 (index -> hash)
+        Returns:
+            bool: 변환이 수행되면 True
+        """
+        with h5py.File(self.filename, "a") as f:
+            if f["metadata"].dtype.kind in ("i", "u"):
+                return False
+            legacy = f["metadata"][:]
+            video_ids = np.array([key_to_id(meta) for meta in legacy], dtype=object)
+            video_ids = np.array([-1 if vid is None else vid for vid in video_ids], dtype=np.int64)
+            pages = f["page"][:]
+            del f["metadata"]
+            f.create_dataset("metadata", data=video_ids, maxshape=(None,), dtype=np.int64)
+            f["hash_table"][:] = chunk_key(video_ids, pages)
+        return True
 
 
     def load_by_indices(self, wr_index):########################################
@@ -181,7 +193,7 @@ class HDF5VectorDB:
             new_text = []
             hash_dict = self._hash_metadata(wr_index) 
             for i, meta in wr_index.metadata.items():
-                meta_str = str(meta)  # 문자열 변환
+                meta_str = int(meta)  # video_id
                 meta_hash = hash_dict[i] 
                 if meta_hash in existing_hash_table:
                     # 기존 데이터 덮어쓰기
@@ -254,44 +266,47 @@ class HDF5VectorDB:
             else:
                 self.active = matched_indices.tolist()  # 🔥 검색 가능한 인덱스를 self.active에 저장
                 log_wrapper(f"<<::STATE::Keyword Search SECCEED>> 검색 대상 인덱스: {self.active}")
-    def extract_custom_from_p_I(self, metadata, page):
-        
-
-        # ✅ WrIndexFlatL2 객체에서 `metadata + page` 조합을 해시로 변환
+    def match_indices(self, metadata, page):
+        """
+        `metadata + page` 조합에 해당하는 행 인덱스를 반환합니다. self.active는 바꾸지 않습니다.
+        """
         hash_dict = _hash_trans(metadata, page)
         query_hashes = list(hash_dict.values())  # ✅ 해시 값 리스트로 변환
 
         with h5py.File(self.filename, "r") as f:
             hash_table = f["hash_table"][:]
 
-            matched_indices = np.where(np.isin(hash_table, query_hashes))[0]  # ✅ 해당 해시값이 있는 인덱스 찾기
+        matched_indices = np.where(np.isin(hash_table, query_hashes))[0]  # ✅ 해당 해시값이 있는 인덱스 찾기
+        if len(matched_indices) == 0:
+            log_wrapper("<<::STATE::Keyword Search FAIl : To hard filttering>> 검색 가능한 데이터 없음")
+        else:
+            log_wrapper(f"<<::STATE::Keyword Search SECCEED>> 검색 대상 인덱스: {matched_indices.tolist()}")
+        return matched_indices
 
-            if len(matched_indices) == 0:
-                log_wrapper("<<::STATE::Keyword Search FAIl : To hard filttering>> 검색 가능한 데이터 없음")
-                self.active = []  # 🔥 검색할 데이터가 없으면 active를 비움
-            else:
-                self.active = matched_indices.tolist()  # 🔥 검색 가능한 인덱스를 self.active에 저장
-                log_wrapper(f"<<::STATE::Keyword Search SECCEED>> 검색 대상 인덱스: {self.active}")
-        
+    def extract_custom_from_p_I(self, metadata, page):
+        self.active = self.match_indices(metadata, page).tolist()  # 🔥 검색 가능한 인덱스를 self.active에 저장
 
-    def search(self, query_vector, k=5):
+
+    def search(self, query_vector, k=5, active=None):
         """
-        FAISS 검색 수행 (self.active에 해당하는 인덱스에서만 검색)
+        FAISS 검색 수행 (active(생략 시 self.active)에 해당하는 인덱스에서만 검색)
+        요청별 active를 넘기면 공유 상태(self.active)를 읽거나 바꾸지 않으므로 동시 요청끼리 섞이지 않습니다.
         """
+        active = self.active if active is None else list(active)
         with h5py.File(self.filename, "r") as f:
             vectors = f["vectors"][:]
             metadata = f["metadata"][:]
             pages = f["page"][:]
             texts = f["text"][:]
 
-        if len(vectors) == 0 or len(self.active) == 0:
+        if len(vectors) == 0 or len(active) == 0:
             return None, None, None  # 🔥 검색할 데이터가 없으면 빈 결과 반환
 
-        # 🔥 self.active에 해당하는 벡터만 FAISS에 추가하여 검색
-        active_vectors = np.array([vectors[i] for i in self.active], dtype=np.float32)
-        active_metadata = [metadata[i] for i in self.active]
-        active_pages = [pages[i] for i in self.active]
-        active_texts = [texts[i] for i in self.active]
+        # 🔥 active에 해당하는 벡터만 FAISS에 추가하여 검색
+        active_vectors = np.array([vectors[i] for i in active], dtype=np.float32)
+        active_metadata = [metadata[i] for i in active]
+        active_pages = [pages[i] for i in active]
+        active_texts = [texts[i] for i in active]
 
         # 🔥 FAISS 차원과 벡터 차원이 맞는지 확인 (`self.index.d` 대신 `self.dimension` 사용)
         if active_vectors.shape[1] != self.dimension:
@@ -314,24 +329,47 @@ class HDF5VectorDB:
         for idx in indices[0]:
             if idx != -1:
                 search_data["vectors"].append(active_vectors[idx])  # ✅ 리스트에 추가
-                search_data["metadata"].append(active_metadata[idx].decode('utf8'))  # ✅ 리스트에 추가
+                search_data["metadata"].append(int(active_metadata[idx]))  # ✅ 리스트에 추가
                 search_data["page"].append(active_pages[idx])  # ✅ 리스트에 추가
                 search_data["text"].append(active_texts[idx].decode('utf8'))  # ✅ 리스트에 추가
 
         search_result.add(search_data)        
 
-        return self.to_document(search_result), distances, indices
+        return self.to_document(search_result, active=active), distances, indices
+
 
+    def search_video_ids(self, query_vector, k=5, active=None):
+        """
+        active(생략 시 self.active) 범위에서 query_vector와 가까운 청크를 찾아 video_id를 거리 순(중복 제거)으로 반환합니다.
+        Document 변환 없이 순위만 필요한 하이브리드 랭킹에서 사용하며, 요청별 active를 넘기면 공유 상태를 건드리지 않습니다.
+        """
+        active = self.active if active is None else active
+        if len(active) == 0:
+            return []
+        active = np.unique(np.asarray(active, dtype=np.int64))
+        with h5py.File(self.filename, "r") as f:
+            vectors = np.ascontiguousarray(f["vectors"][active], dtype=np.float32)
+            metadata = f["metadata"][active]
+        index = faiss.IndexFlatL2(self.dimension)
+        index.add(vectors)
+        query_vector = np.array(query_vector, dtype=np.float32).reshape(1, -1)
+        _, indices = index.search(query_vector, min(k, len(active)))
+        ranked = []
+        for idx in indices[0]:
+            if idx != -1 and int(metadata[idx]) not in ranked:
+                ranked.append(int(metadata[idx]))
+        return ranked
 
-    def to_document(self, data):
+    def to_document(self, data, active=None):
         """
-        WrIndexFlatL2 객체를 입력받아, `self.active` 내부의 데이터만 변환하여 LangChain Document 객체로 변환
+        WrIndexFlatL2 객체를 입력받아, active(생략 시 `self.active`) 내부의 데이터만 변환하여 LangChain Document 객체로 변환
         """
+        active = self.active if active is None else active
         if not isinstance(data, WrIndexFlatL2):
             log_wrapper("<<::STATE::Critical raise ValueError >>입력 데이터는 WrIndexFlatL2 객체여야 합니다.")
             raise ValueError("입력 데이터는 WrIndexFlatL2 객체여야 합니다.")
 
-        if len(self.active) == 0:
+        if len(active) == 0:
             log_wrapper("[INFO] 변환할 데이터가 없습니다.")
             return []
         hesh=self._hash_metadata(data)
@@ -343,8 +381,8 @@ class HDF5VectorDB:
             pages = f["page"][:]
             texts = f["text"][:]
             hash_table = f["hash_table"][:]
-            hash_to_idx = {hash_table[idx]: idx for idx in self.active}
-            # ✅ `self.active` 내부의 데이터만 변환
+            hash_to_idx = {hash_table[idx]: idx for idx in active}
+            # ✅ active 내부의 데이터만 변환
             total_hash=[]
             for values in hash_to_idx.keys():
                 total_hash.append(values)
@@ -357,7 +395,7 @@ class HDF5VectorDB:
                 # ✅ 변환된 데이터 추가
                 page_content = texts[hash_to_idx[meta_hesh]]  # ✅ 원본 텍스트 활용
                 metadata_dict = {
-                    "index": metadata[hash_to_idx[meta_hesh]].decode("utf-8"),
+                    "index": int(metadata[hash_to_idx[meta_hesh]]),
                     "page": pages[hash_to_idx[meta_hesh]],
                     "vectors": vectors[hash_to_idx[meta_hesh]]  # ✅ HDF5에서 직접 벡터 가져오기
                 }
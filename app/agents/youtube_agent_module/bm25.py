@@ -0,0 +1,169 @@
+import os
+import re
+import h5py
+import numpy as np
+from collections import Counter
+from .queue_manager import add_log
+from .morph import get_morph_analyzer
+
+
+def log_wrapper(log_message):
+    add_log(log_message)
+
+
+_WORD_PATTERN = re.compile(r'[0-9a-z가-힣]+')
+_SRT_TIMING = re.compile(r'^\s*(\d+|\d{2}:\d{2}:\d{2}[,.]\d{3}\s*-->\s*\d{2}:\d{2}:\d{2}[,.]\d{3})\s*$', re.MULTILINE)
+
+
+def char_bigrams(text):
+    """
+    어절별 문자 bigram 토크나이저 (한 글자 어절은 그대로 사용)
+    형태소 분석 없이 띄어쓰기 변형('갤럭시탭'/'갤럭시 탭')과 조사 결합에 강합니다.
+    """
+    tokens = []
+    for word in _WORD_PATTERN.findall(text.lower()):
+        if len(word) == 1:
+            tokens.append(word)
+        else:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+def okt_morphs(text):
+    """Okt 형태소 토크나이저 (konlpy 필요, 프로세스 공용 분석기 사용)"""
+    return [m.lower() for m in get_morph_analyzer().morphs(text, stem=True) if _WORD_PATTERN.fullmatch(m.lower())]
+
+
+TOKENIZERS = {
+    "bigram": char_bigrams,
+    "okt": okt_morphs,
+}
+
+# 필드별 (가중치, 길이 정규화 b)
+DEFAULT_FIELDS = {
+    "제목": (3.0, 0.5),
+    "태그": (2.5, 0.3),
+    "설명": (1.0, 0.75),
+    "자막": (1.0, 0.75),
+}
+
+
+def strip_srt(text):
+    """SRT의 번호/타임코드 줄을 제거한 자막 본문"""
+    return _SRT_TIMING.sub("", text)
+
+
+class BM25Index:
+    """
+    제목, 태그, 설명, 자막에 대한 BM25F 역색인
+    필드 가중치와 길이 정규화를 색인 시점에 반영한 의사 빈도(tf)를 CSR 형태(indptr, doc_ids, tfs)로 저장하고,
+    질의 시에는 질의 토큰의 포스팅만 읽어 점수를 누적합니다. 문서 id는 video_id입니다.
+    """
+    def __init__(self, terms, indptr, doc_ids, tfs, idf, n_docs, tokenizer="bigram", k1=1.2):
+        self.terms = list(terms)
+        self.term_id = {term: i for i, term in enumerate(self.terms)}
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        self.tfs = np.asarray(tfs, dtype=np.float32)
+        self.idf = np.asarray(idf, dtype=np.float32)
+        self.n_docs = int(n_docs)
+        self.tokenizer = tokenizer
+        self.tokenize = TOKENIZERS[tokenizer]
+        self.k1 = k1
+
+    @classmethod
+    def build(cls, documents, n_docs, tokenizer="bigram", fields=None, k1=1.2):
+        """
+        Args:
+            documents (iterable): (video_id, {필드명: 텍스트}) 쌍
+            n_docs (int): video_id 공간의 크기
+            tokenizer (str): TOKENIZERS의 키
+            fields (dict, optional): {필드명: (가중치, b)}
+        """
+        fields = fields or DEFAULT_FIELDS
+        tokenize = TOKENIZERS[tokenizer]
+        field_counts = {name: [] for name in fields}  # 필드별 [(video_id, Counter, 길이)]
+        for video_id, doc in documents:
+            for name in fields:
+                tokens = tokenize(doc.get(name) or "")
+                field_counts[name].append((video_id, Counter(tokens), len(tokens)))
+
+        pseudo_tf = {}  # term -> {video_id: tf}
+        for name, (weight, b) in fields.items():
+            entries = field_counts[name]
+            avg_len = max(np.mean([length for _, _, length in entries]) if entries else 0.0, 1.0)
+            for video_id, counts, length in entries:
+                norm = weight / (1 - b + b * length / avg_len)
+                for term, tf in counts.items():
+                    postings = pseudo_tf.setdefault(term, {})
+                    postings[video_id] = postings.get(video_id, 0.0) + tf * norm
+
+        terms = sorted(pseudo_tf)
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        doc_ids, tfs = [], []
+        for i, term in enumerate(terms):
+            postings = pseudo_tf[term]
+            ids = np.fromiter(postings.keys(), dtype=np.int64, count=len(postings))
+            order = np.argsort(ids)
+            doc_ids.append(ids[order])
+            tfs.append(np.fromiter(postings.values(), dtype=np.float32, count=len(postings))[order])
+            indptr[i + 1] = indptr[i] + len(postings)
+        df = np.diff(indptr).astype(np.float64)
+        n_indexed = max(len(field_counts[next(iter(fields))]), 1)
+        idf = np.log(1 + (n_indexed - df + 0.5) / (df + 0.5))
+        return cls(
+            terms, indptr,
+            np.concatenate(doc_ids) if doc_ids else np.empty(0, dtype=np.int64),
+            np.concatenate(tfs) if tfs else np.empty(0, dtype=np.float32),
+            idf, n_docs, tokenizer, k1,
+        )
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with h5py.File(path, "w") as f:
+            f.create_dataset("terms", data=np.array(self.terms, dtype=h5py.string_dtype()))
+            f.create_dataset("indptr", data=self.indptr)
+            f.create_dataset("doc_ids", data=self.doc_ids)
+            f.create_dataset("tfs", data=self.tfs)
+            f.create_dataset("idf", data=self.idf)
+            f.attrs["n_docs"] = self.n_docs
+            f.attrs["tokenizer"] = self.tokenizer
+            f.attrs["k1"] = self.k1
+        log_wrapper(f"BM25 색인 저장 완료 ({len(self.terms)} terms, {self.n_docs} docs)")
+
+    @classmethod
+    def load(cls, path):
+        with h5py.File(path, "r") as f:
+            terms = [t.decode("utf-8") if isinstance(t, bytes) else t for t in f["terms"][:]]
+            return cls(
+                terms, f["indptr"][:], f["doc_ids"][:], f["tfs"][:], f["idf"][:],
+                f.attrs["n_docs"], str(f.attrs["tokenizer"]), float(f.attrs["k1"]),
+            )
+
+    def scores(self, query):
+        """질의에 대한 video_id별 BM25F 점수 배열 (길이 n_docs)"""
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for term, qtf in Counter(self.tokenize(query)).items():
+            i = self.term_id.get(term)
+            if i is None:
+                continue
+            start, end = self.indptr[i], self.indptr[i + 1]
+            tf = self.tfs[start:end]
+            scores[self.doc_ids[start:end]] += qtf * self.idf[i] * tf * (self.k1 + 1) / (tf + self.k1)
+        return scores
+
+    def search(self, query, k=30, candidates=None):
+        """
+        점수 상위 k개 (video_id, 점수) 목록. candidates가 주어지면 해당 video_id 안에서만 찾습니다.
+        점수가 0인 문서는 제외합니다.
+        """
+        scores = self.scores(query)
+        if candidates is not None:
+            mask = np.zeros(self.n_docs, dtype=bool)
+            mask[np.asarray(candidates, dtype=np.int64)] = True
+            scores[~mask] = 0
+        hits = np.nonzero(scores > 0)[0]
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(int(i), float(scores[i])) for i in hits]
@@ -1,18 +1,23 @@
-from konlpy.tag import Okt
 import h5py
 import json
 import os
 import numpy as np
 from collections import defaultdict
 import hashlib
-from konlpy.tag import Okt
+import threading
+import asyncio
 from app.agents.report_agent_module.bsae_reporter import CacheManager
+from .morph import get_morph_analyzer
+from .lexicon import LexiconMatcher, extract_model_codes, model_tokens
+from .semantic_cache import SemanticCache
+from app.config import settings
 class KeywordExtractor:
     """
     텍스트에서 키워드를 추출하고 분류하는 클래스
     """
     def __init__(self):
-        self.okt = Okt()
+        # 프로세스 공용 분석기 (Okt 인스턴스 풀, 결과 메모)
+        self.okt = get_morph_analyzer()
         # 기능(Features) 키워드
         self.features = [
             "성능", "배터리", "화면", "무게", "휴대성", "저장용량", "속도", "램", "칩셋", "화질",
@@ -72,10 +77,28 @@ class KeywordExtractor:
             "brands": self.brands,
             "others": self.others
         }
+
+        # 사전 기반 추출기와 키워드별 가중치를 미리 만들어 둠
+        self.lexicon = LexiconMatcher(
+            self.keywords_by_category,
+            {"top80": self.keywords_top80, "top40": self.keywords_top40, "top20": self.keywords_top20},
+        )
+        self.keyword_weights = {}
+        for kw in set(self.lexicon.category_of) | set(self.keywords_top80):
+            weight = 3 if kw in self.lexicon.category_of else 0
+            if kw in self.lexicon.tier_members["top20"]:
+                weight += 3
+            elif kw in self.lexicon.tier_members["top40"]:
+                weight += 2
+            elif kw in self.lexicon.tier_members["top80"]:
+                weight += 1
+            self.keyword_weights[kw] = max(weight, 1)
     
     def extract_keywords(self, text):
         """
         텍스트에서 키워드 추출
+        사전(카테고리/티어 키워드)과 모델 번호('S24', 'M2')를 먼저 찾고, 사전 단어가 질의 전체를 덮지 못하면
+        형태소 분석 결과를 합칩니다 (사전 결과만 쓰면 '아이패드 에어 M2'/'아이패드 프로 M4'가 같은 키워드가 됨).
         
         Args:
             text (str): 키워드를 추출할 텍스트
@@ -83,9 +106,39 @@ class KeywordExtractor:
         Returns:
             list: 추출된 키워드 목록
         """
-        tokens = self.okt.pos(text, stem=True)
-        keywords = [word for word, pos in tokens if pos in ('Noun', 'Verb', 'Adjective')]
-        return keywords
+        keywords, residue = self.lexicon.extract_with_residue(text)
+        if not residue:
+            return keywords
+        try:
+            tokens = self.okt.pos(text, stem=True)
+        except Exception as e:
+            print(f"형태소 분석 실패, 사전 외 단어를 그대로 사용: {e}")
+            tokens = None
+        return self._merge_keywords(text, keywords, residue, tokens)
+
+    async def aextract_keywords(self, text):
+        """extract_keywords의 비동기 버전 (형태소 분석을 이벤트 루프 밖에서 수행)"""
+        keywords, residue = self.lexicon.extract_with_residue(text)
+        if not residue:
+            return keywords
+        try:
+            tokens = await self.okt.apos(text, stem=True)
+        except Exception as e:
+            print(f"형태소 분석 실패, 사전 외 단어를 그대로 사용: {e}")
+            tokens = None
+        return self._merge_keywords(text, keywords, residue, tokens)
+
+    @staticmethod
+    def _merge_keywords(text, keywords, residue, tokens):
+        """
+        사전 키워드 + 모델 번호 + 형태소(명사/동사/형용사) 순으로 중복 없이 합칩니다.
+        형태소 분석을 못 했으면(tokens=None) 사전이 덮지 못한 단어(residue)를 대신 씁니다.
+        """
+        if tokens is None:
+            morphs = residue
+        else:
+            morphs = [word for word, pos in tokens if pos in ('Noun', 'Verb', 'Adjective')]
+        return list(dict.fromkeys(keywords + extract_model_codes(text) + morphs))
     
     def match_category(self, text_or_keywords):
         """
@@ -102,25 +155,7 @@ class KeywordExtractor:
             keywords = self.extract_keywords(text_or_keywords)
         else:
             keywords = text_or_keywords
-            
-        category = {
-            "features": [],
-            "usage": [],
-            "brands": [],
-            "others": []
-        }
-        
-        for kw in keywords:
-            if kw in self.features:
-                category["features"].append(kw)
-            elif kw in self.usage:
-                category["usage"].append(kw)
-            elif kw in self.brands:
-                category["brands"].append(kw)
-            elif kw in self.others:
-                category["others"].append(kw)
-                
-        return category
+        return self.lexicon.match_category(keywords)
     
     def match_tier(self, keywords):
         """
@@ -132,33 +167,7 @@ class KeywordExtractor:
         Returns:
             dict: 티어별 키워드 목록
         """
-        tier = {}
-        keywords_top80_row = []
-        
-        for kw in keywords:
-            if kw in self.keywords_top80:
-                keywords_top80_row.append(kw)
-                
-        tier["top80"] = keywords_top80_row.copy()
-        
-        # Top40에 없는 키워드 제거
-        iterser = list(set(self.keywords_top80) - set(self.keywords_top40))
-        keywords_top40_row = keywords_top80_row.copy()
-        for kw in iterser:
-            if kw in keywords_top40_row:
-                keywords_top40_row.remove(kw)
-                
-        tier["top40"] = keywords_top40_row.copy()
-        
-        # Top20에 없는 키워드 제거
-        iterser = list(set(self.keywords_top40) - set(self.keywords_top20))
-        keywords_top20_row = keywords_top40_row.copy()
-        for kw in iterser:
-            if kw in keywords_top20_row:
-                keywords_top20_row.remove(kw)
-                
-        tier["top20"] = keywords_top20_row.copy()
-        return tier
+        return self.lexicon.match_tier(keywords)
     
     def get_keyword_weight(self, keyword):
         """
@@ -170,22 +179,12 @@ class KeywordExtractor:
         Returns:
             int: 키워드 가중치
         """
-        weight = 0
-        
-        # 카테고리 기반 가중치 (모든 카테고리에 동일한 가중치 3 적용)
-        if (keyword in self.features or keyword in self.usage or 
-            keyword in self.brands or keyword in self.others):
-            weight += 3
-        
-        # 티어 기반 가중치 (기존대로 유지)
-        if keyword in self.keywords_top20:
-            weight += 3
-        elif keyword in self.keywords_top40:
-            weight += 2
-        elif keyword in self.keywords_top80:
-            weight += 1
-        
-        return max(weight, 1)  # 최소 가중치는 1 (어떤 카테고리에도 속하지 않는 키워드)
+        # 카테고리 기반 3 + 티어 기반(top20: 3, top40: 2, top80: 1), 사전에 없는 키워드는 1
+        # 모델을 가르는 토큰(모델 번호, 프로/에어 등)은 사전 최고 가중치와 같게 둠
+        weight = self.keyword_weights.get(keyword, 1)
+        if model_tokens([keyword]):
+            weight = max(weight, 6)
+        return weight
     
     def print_keyword_info(self):
         """키워드 정보 출력"""
@@ -199,28 +198,59 @@ class KeywordExtractor:
         for category, kw_list in self.keywords_by_category.items():
             print(f"[{category}] : {kw_list}")
 
+_EMPTY_SLOTS = np.empty(0, dtype=np.int32)
+# 실패 결과(네거티브) 캐시 항목 표시 키
+NEGATIVE_FLAG = "__negative__"
+
+
 class IndexStorage:
     """
-    H5 파일을 사용한 역인덱스 저장소
+    키워드 -> 쿼리 역인덱스 저장소
+    시작할 때 H5 파일 전체를 메모리(쿼리 ID 인터닝 + 키워드별 슬롯 배열 + 파싱된 쿼리 정보)로 올리고,
+    조회는 메모리에서만 처리합니다. 쓰기는 메모리에 즉시 반영한 뒤 저널(JSON Lines)에 기록하고,
+    H5 파일에는 flush_interval초마다 백그라운드에서 모아서 반영합니다(write-behind).
+    반영 전에 프로세스가 종료되면 다음 시작 시 저널을 다시 적용합니다.
+    포스팅은 추가만 합니다. 메모리에서는 키워드별 델타 목록에 쌓았다가 merge_every개마다(또는 flush 때)
+    본 배열에 합치고, H5에는 기존 ID를 읽지 않고 데이터셋 끝에 새 ID만 이어 씁니다.
+    쿼리 삭제(remove_query)는 해당 키워드 데이터셋만 메모리 기준으로 다시 쓰고,
+    삭제가 compact_after개 쌓이면 파일 전체를 메모리 기준으로 다시 써서 빈 공간을 회수합니다.
     """
-    def __init__(self, file_path):
+    def __init__(self, file_path, flush_interval=5.0, merge_every=64, compact_after=256):
         """
         파일 경로를 입력받아 초기화하고, 파일이 없으면 생성함
         
         Args:
             file_path (str): HDF5 파일의 경로 (확장자 포함)
+            flush_interval (float): H5 파일 반영 주기(초), 0이면 쓰기마다 즉시 반영
         """
         self.file_path = file_path
         
         # 확장자가 h5인지 확인
         if not file_path.endswith('.h5'):
             raise ValueError("파일 확장자는 반드시 .h5여야 합니다.")
+        self.journal_path = file_path + ".journal"
+        self.flush_interval = flush_interval
+        self.merge_every = merge_every
+        self.compact_after = compact_after
+        self._removed = 0
+        self._lock = threading.RLock()
+        self._pending = []
+        self._journal = None
             
         # 파일 열기 또는 생성
         self._open_file()
         
         # 기본 그룹 생성 확인
         self._ensure_groups()
+
+        self._load()
+        self._replay_journal()
+
+        self._stop = threading.Event()
+        self._flusher = None
+        if self.flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name="index-storage-flush", daemon=True)
+            self._flusher.start()
     
     def _open_file(self, mode='a'):
         """파일을 지정된 모드로 열기"""
@@ -235,11 +265,55 @@ class IndexStorage:
             self.file.create_group('queries')
         if 'keywords' not in self.file:
             self.file.create_group('keywords')
+
+    def _load(self):
+        """H5 파일의 쿼리 정보와 역인덱스를 메모리로 읽어옵니다."""
+        self._query_ids = []      # 슬롯 -> 쿼리 ID
+        self._query_slot = {}     # 쿼리 ID -> 슬롯
+        self._queries = {}        # 슬롯 -> 쿼리 정보(dict)
+        self._postings = {}       # 키워드 -> 슬롯 배열(np.int32), 병합된 부분
+        self._deltas = {}         # 키워드 -> 아직 병합하지 않은 슬롯 목록
+        self._query_keywords = {} # 슬롯 -> 연결된 키워드 집합 (중복 추가 확인용)
+        for query_id, query_group in self.file['queries'].items():
+            self._queries[self._intern(query_id)] = self._parse_attrs(query_id, query_group.attrs)
+        for encoded_key, dataset in self.file['keywords'].items():
+            keyword = dataset.attrs.get('keyword', None) or self._decode_keyword(encoded_key)
+            slots = [self._intern(qid.decode('utf-8')) for qid in dataset[:]]
+            self._postings[keyword] = np.asarray(slots, dtype=np.int32)
+            for slot in slots:
+                self._query_keywords.setdefault(slot, set()).add(keyword)
+
+    def _intern(self, query_id):
+        slot = self._query_slot.get(query_id)
+        if slot is None:
+            slot = len(self._query_ids)
+            self._query_ids.append(query_id)
+            self._query_slot[query_id] = slot
+        return slot
+
+    @staticmethod
+    def _parse_attrs(query_id, attrs):
+        query_info = {'query_id': query_id}
+        for attr_name, attr_value in attrs.items():
+            if attr_name.endswith('_json'):
+                # JSON 문자열 파싱
+                query_info[attr_name[:-5]] = json.loads(attr_value)
+            else:
+                query_info[attr_name] = attr_value
+        return query_info
     
     def close(self):
-        """H5 파일 닫기"""
-        if hasattr(self, 'file') and self.file:
+        """대기 중인 쓰기를 반영하고 H5 파일 닫기"""
+        if getattr(self, '_flusher', None) is not None:
+            self._stop.set()
+            self._flusher.join()
+            self._flusher = None
+        if hasattr(self, 'file') and self.file and self.file.id.valid:
+            self.flush()
             self.file.close()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
     
     def __enter__(self):
         return self
@@ -254,10 +328,190 @@ class IndexStorage:
     def _decode_keyword(self, encoded):
         """인코딩된 키워드를 원래 형식으로 복원"""
         return bytes.fromhex(encoded).decode('utf-8')
+
+    # ---- write-behind 저널 ----
+    def _record(self, op):
+        """메모리에 반영된 쓰기를 저널에 남기고 H5 반영 대기열에 넣습니다."""
+        if self._journal is None:
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._journal.write(json.dumps(op, ensure_ascii=False) + "\n")
+        self._journal.flush()
+        self._pending.append(op)
+        if self.flush_interval <= 0:
+            self.flush()
+
+    def _replay_journal(self):
+        """이전 실행에서 H5에 반영하지 못한 저널을 메모리와 H5에 다시 적용합니다."""
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    op = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # 기록 도중 중단된 마지막 줄
+                if op["op"] == "query":
+                    self._apply_query(op["query_id"], op["data"])
+                    self._apply_keywords(op.get("keywords", []), op["query_id"])
+                elif op["op"] == "remove":
+                    self._apply_remove(op["query_id"])
+                else:
+                    self._apply_keywords(op["keywords"], op["query_id"])
+                self._pending.append(op)
+        self.flush()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """대기 중인 쓰기를 H5 파일에 반영하고 저널을 비웁니다."""
+        with self._lock:
+            if not self._pending:
+                return
+            self.open_if_closed()
+            pending, self._pending = self._pending, []
+            appended = defaultdict(list)  # 키워드 -> 새로 연결된 쿼리 ID (저널 순서)
+            rewritten = set()             # 삭제로 다시 써야 하는 키워드
+            for op in pending:
+                if op["op"] == "query":
+                    self._write_query(op["query_id"], op["data"])
+                elif op["op"] == "remove":
+                    if op["query_id"] in self.file['queries']:
+                        del self.file['queries'][op["query_id"]]
+                    rewritten.update(op["keywords"])
+                    continue
+                for keyword in op.get("keywords", []):
+                    appended[keyword].append(op["query_id"])
+            for keyword, query_ids in appended.items():
+                if keyword not in rewritten:
+                    self._append_keyword(keyword, query_ids)
+            self._merge_deltas()
+            for keyword in rewritten:
+                self._rewrite_keyword(keyword)
+            self.file.flush()
+            if self._removed >= self.compact_after:
+                self._compact()
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            open(self.journal_path, "w").close()
+
+    def _write_query(self, query_id, query_data):
+        # 기존 쿼리 삭제 (덮어쓰기)
+        if query_id in self.file['queries']:
+            del self.file['queries'][query_id]
+        query_group = self.file['queries'].create_group(query_id)
+        for key, value in query_data.items():
+            if isinstance(value, (str, int, float, bool)):
+                query_group.attrs[key] = value
+            else:
+                # 복잡한 구조는 JSON으로 저장
+                query_group.attrs[f"{key}_json"] = json.dumps(value)
+
+    def _append_keyword(self, keyword, query_ids):
+        """키워드 데이터셋 끝에 새 쿼리 ID만 이어 씁니다 (기존 ID는 읽지 않음)."""
+        encoded_key = self._encode_keyword(keyword)
+        ids = np.array(query_ids, dtype='S100')
+        if encoded_key in self.file['keywords']:
+            dataset = self.file['keywords'][encoded_key]
+            start = dataset.shape[0]
+            dataset.resize((start + len(ids),))
+            dataset[start:] = ids
+        else:
+            dataset = self.file['keywords'].create_dataset(encoded_key, data=ids, maxshape=(None,), chunks=True)
+            dataset.attrs['keyword'] = keyword
+
+    def _rewrite_keyword(self, keyword):
+        """키워드 데이터셋을 메모리의 포스팅으로 교체합니다 (비었으면 삭제)."""
+        encoded_key = self._encode_keyword(keyword)
+        if encoded_key in self.file['keywords']:
+            del self.file['keywords'][encoded_key]
+        query_ids = self.get_queries_by_keyword(keyword)
+        if query_ids:
+            self._append_keyword(keyword, query_ids)
+
+    def _compact(self):
+        """메모리 상태로 새 H5 파일을 만들어 교체합니다 (삭제로 생긴 빈 공간 회수)."""
+        tmp_path = self.file_path + ".compact"
+        self.file.close()
+        self.file = h5py.File(tmp_path, 'w')
+        self._ensure_groups()
+        for slot, query_info in self._queries.items():
+            query_data = {key: value for key, value in query_info.items() if key != 'query_id'}
+            self._write_query(self._query_ids[slot], query_data)
+        for keyword in self.get_all_keywords():
+            query_ids = self.get_queries_by_keyword(keyword)
+            if query_ids:
+                self._append_keyword(keyword, query_ids)
+        self.file.close()
+        os.replace(tmp_path, self.file_path)
+        self._open_file()
+        self._removed = 0
+
+    # ---- 메모리 반영 ----
+    def _apply_query(self, query_id, query_data):
+        query_info = {'query_id': query_id}
+        query_info.update(json.loads(json.dumps(query_data)))
+        self._queries[self._intern(query_id)] = query_info
+
+    def _apply_keywords(self, keywords, query_id):
+        """새로 연결되는 키워드만 델타에 추가하고 그 목록을 반환합니다."""
+        slot = self._intern(query_id)
+        linked = self._query_keywords.setdefault(slot, set())
+        added = []
+        for keyword in keywords:
+            if not keyword or keyword in linked:
+                continue
+            linked.add(keyword)
+            delta = self._deltas.setdefault(keyword, [])
+            delta.append(slot)
+            if len(delta) >= self.merge_every:
+                self._merge_delta(keyword)
+            added.append(keyword)
+        return added
+
+    def _apply_remove(self, query_id):
+        """쿼리와 그 포스팅을 메모리에서 지우고 연결돼 있던 키워드 목록을 반환합니다."""
+        slot = self._query_slot.get(query_id)
+        if slot is None or slot not in self._queries:
+            return []
+        del self._queries[slot]
+        keywords = sorted(self._query_keywords.pop(slot, set()))
+        for keyword in keywords:
+            base = self._postings.get(keyword)
+            if base is not None:
+                base = base[base != slot]
+                if len(base):
+                    self._postings[keyword] = base
+                else:
+                    del self._postings[keyword]
+            delta = self._deltas.get(keyword)
+            if delta:
+                delta = [s for s in delta if s != slot]
+                if delta:
+                    self._deltas[keyword] = delta
+                else:
+                    del self._deltas[keyword]
+        self._removed += 1
+        return keywords
+
+    def _merge_delta(self, keyword):
+        # 읽기는 락 없이 하므로 병합된 배열을 먼저 넣고 델타는 그 뒤에 지움
+        # (반대 순서면 그 사이에 읽은 쪽은 예전 기반 배열만 보고 최근 쿼리를 놓침)
+        delta = self._deltas.get(keyword)
+        if delta:
+            base = self._postings.get(keyword, _EMPTY_SLOTS)
+            self._postings[keyword] = np.concatenate([base, np.asarray(delta, dtype=np.int32)])
+        self._deltas.pop(keyword, None)
+
+    def _merge_deltas(self):
+        for keyword in list(self._deltas):
+            self._merge_delta(keyword)
     
-    def add_query(self, query_id, query_data):
+    def add_query(self, query_id, query_data, keywords=()):
         """
-        쿼리 정보 저장
+        쿼리 정보 저장 (keywords가 주어지면 역인덱스 연결까지 한 번의 저널 기록으로 처리)
         
         Args:
             query_id (str): 쿼리 ID
@@ -274,23 +528,25 @@ class IndexStorage:
             bool: 성공 여부
         """
         query_id = str(query_id)
-        
-        # 기존 쿼리 삭제 (덮어쓰기)
-        if query_id in self.file['queries']:
-            del self.file['queries'][query_id]
-            
-        # 쿼리 그룹 생성
-        query_group = self.file['queries'].create_group(query_id)
-        
-        # 쿼리 정보 저장
-        for key, value in query_data.items():
-            if isinstance(value, (str, int, float, bool)):
-                query_group.attrs[key] = value
-            else:
-                # 복잡한 구조는 JSON으로 저장
-                query_group.attrs[f"{key}_json"] = json.dumps(value)
-        
-        self.file.flush()
+        with self._lock:
+            self._apply_query(query_id, query_data)
+            added = self._apply_keywords(keywords, query_id)
+            self._record({"op": "query", "query_id": query_id, "data": query_data, "keywords": added})
+        return True
+
+    def remove_query(self, query_id):
+        """
+        쿼리 정보와 역인덱스 연결을 삭제합니다 (캐시 만료/제거 시 사용).
+
+        Returns:
+            bool: 삭제 여부
+        """
+        query_id = str(query_id)
+        with self._lock:
+            if self._query_slot.get(query_id) not in self._queries:
+                return False
+            keywords = self._apply_remove(query_id)
+            self._record({"op": "remove", "query_id": query_id, "keywords": keywords})
         return True
     def open_if_closed(self, mode='a'):
         """파일이 닫혔다면 다시 여는 메서드"""
@@ -299,7 +555,6 @@ class IndexStorage:
             self._open_file(mode)
     
     def add_keyword_to_index(self, keyword, query_id):
-        self.open_if_closed()
         """
         역인덱스에 키워드-쿼리 연결 추가
         
@@ -314,32 +569,28 @@ class IndexStorage:
             return False
             
         query_id = str(query_id)
-        encoded_key = self._encode_keyword(keyword)
-        
-        # 키워드 데이터셋이 없으면 생성
-        if encoded_key not in self.file['keywords']:
-            keyword_dataset = self.file['keywords'].create_dataset(
-                encoded_key,
-                data=np.array([query_id], dtype='S100'),
-                maxshape=(None,),
-                chunks=True
-            )
-            keyword_dataset.attrs['keyword'] = keyword
-        else:
-            # 이미 있으면 쿼리 ID 추가 (중복 방지)
-            dataset = self.file['keywords'][encoded_key]
-            existing_ids = [qid.decode('utf-8') for qid in dataset[:]]
-            
-            if query_id not in existing_ids:
-                existing_ids.append(query_id)
-                dataset.resize((len(existing_ids),))
-                dataset[:] = np.array(existing_ids, dtype='S100')
-        
-        self.file.flush()
+        with self._lock:
+            added = self._apply_keywords([keyword], query_id)
+            if added:
+                self._record({"op": "keywords", "keywords": added, "query_id": query_id})
         return True
+
+    def get_query_slots_by_keyword(self, keyword):
+        """
+        키워드로 연결된 쿼리 슬롯 배열 (쿼리 ID 문자열 변환 없음)
+        락 없이 읽으므로 델타를 기반 배열보다 먼저 복사합니다. 병합 도중이면 기반 배열 끝에 이미 델타가 붙어 있으며,
+        한 키워드에 같은 슬롯은 한 번만 연결되므로 이때는 기반 배열만 반환합니다.
+        """
+        delta = self._deltas.get(keyword)
+        delta = np.asarray(list(delta), dtype=np.int32) if delta else None
+        base = self._postings.get(keyword, _EMPTY_SLOTS)
+        if delta is None:
+            return base
+        if len(base) >= len(delta) and np.array_equal(base[len(base) - len(delta):], delta):
+            return base
+        return np.concatenate([base, delta])
     
     def get_queries_by_keyword(self, keyword):
-        self.open_if_closed()
         """
         키워드로 연결된 쿼리 ID 목록 가져오기
         
@@ -349,13 +600,11 @@ class IndexStorage:
         Returns:
             list: 쿼리 ID 목록
         """
-        encoded_key = self._encode_keyword(keyword)
-        
-        if encoded_key not in self.file['keywords']:
-            return []
-            
-        dataset = self.file['keywords'][encoded_key]
-        return [qid.decode('utf-8') for qid in dataset[:]]
+        return [self._query_ids[slot] for slot in self.get_query_slots_by_keyword(keyword)]
+
+    def get_query_info_by_slot(self, slot):
+        query_info = self._queries.get(int(slot))
+        return dict(query_info) if query_info is not None else None
     
     def get_query_info(self, query_id):
         """
@@ -367,37 +616,18 @@ class IndexStorage:
         Returns:
             dict: 쿼리 정보 또는 None
         """
-        query_id = str(query_id)
-        
-        if query_id not in self.file['queries']:
+        slot = self._query_slot.get(str(query_id))
+        if slot is None:
             return None
-            
-        query_group = self.file['queries'][query_id]
-        query_info = {'query_id': query_id}
-        
-        # 속성 정보 수집
-        for attr_name, attr_value in query_group.attrs.items():
-            if attr_name.endswith('_json'):
-                # JSON 문자열 파싱
-                key = attr_name[:-5]  # '_json' 제거
-                query_info[key] = json.loads(attr_value)
-            else:
-                query_info[attr_name] = attr_value
-                
-        return query_info
+        return self.get_query_info_by_slot(slot)
     
     def get_all_queries(self):
         """저장된 모든 쿼리 ID 목록 반환"""
-        return list(self.file['queries'].keys())
+        return [self._query_ids[slot] for slot in self._queries]
     
     def get_all_keywords(self):
         """인덱싱된 모든 키워드 목록 반환"""
-        keywords = []
-        for encoded_key in self.file['keywords']:
-            dataset = self.file['keywords'][encoded_key]
-            if 'keyword' in dataset.attrs:
-                keywords.append(dataset.attrs['keyword'])
-        return keywords
+        return list(dict.fromkeys(list(self._postings) + list(self._deltas)))
 
 class QueryMatcher:
     """
@@ -434,7 +664,17 @@ class QueryMatcher:
             keywords = self.keyword_extractor.extract_keywords(text_or_keywords)
         else:
             keywords = text_or_keywords
-            
+        return self.match_keywords(keywords, min_score, max_results)
+
+    async def afind_matching_queries(self, text, min_score=0.5, max_results=3):
+        """find_matching_queries의 비동기 버전 (키워드 추출만 이벤트 루프 밖에서 수행)"""
+        if isinstance(text, list):
+            text = text[0]
+        keywords = await self.keyword_extractor.aextract_keywords(text)
+        return self.match_keywords(keywords, min_score, max_results)
+
+    def match_keywords(self, keywords, min_score=0.5, max_results=3):
+        """추출된 키워드 목록으로 메모리 역인덱스에서 쿼리를 매칭합니다."""
         if not keywords:
             return []
             
@@ -450,23 +690,27 @@ class QueryMatcher:
             # 키워드 가중치 계산
             weight = self.keyword_extractor.get_keyword_weight(keyword)
             
-            # 키워드에 매칭되는 쿼리 검색
-            query_ids = self.index_storage.get_queries_by_keyword(keyword)
+            # 키워드에 매칭되는 쿼리 검색 (메모리 역인덱스의 슬롯 배열)
+            slots = self.index_storage.get_query_slots_by_keyword(keyword)
             
             # 매칭 점수 누적
-            for query_id in query_ids:
-                query_matches[query_id] += weight
+            for slot in slots.tolist():
+                query_matches[slot] += weight
         
         if not query_matches:
             return []
             
         # 매치 결과 정리
         matches = []
-        for query_id, match_weight in query_matches.items():
+        models = model_tokens(keywords_set)
+        for slot, match_weight in query_matches.items():
             match_score = match_weight / total_weight if total_weight > 0 else 0
             
             if match_score >= min_score:
-                query_info = self.index_storage.get_query_info(query_id)
+                query_info = self.index_storage.get_query_info_by_slot(slot)
+                # 모델 토큰이 다르면 ('에어 M2'와 '프로 M4') 겹치는 키워드가 많아도 다른 질의로 봄
+                if query_info and model_tokens(query_info.get('keywords', [])) != models:
+                    continue
                 if query_info:
                     query_info['match_score'] = match_score
                     matches.append(query_info)
@@ -530,12 +774,8 @@ class KeywordQueryManager:
             'tier': tier
         }
         
-        # 쿼리 저장
-        self.index_storage.add_query(query_id, query_data)
-        
-        # 역인덱스 업데이트
-        for keyword in set(keywords):
-            self.index_storage.add_keyword_to_index(keyword, query_id)
+        # 쿼리 저장과 역인덱스 업데이트를 한 번에 기록
+        self.index_storage.add_query(query_id, query_data, keywords=list(dict.fromkeys(keywords)))
         
         return query_id
     
@@ -552,10 +792,17 @@ class KeywordQueryManager:
             list: 매치된 쿼리 정보 목록
         """
         return self.query_matcher.find_matching_queries(text, min_score, max_results)
+
+    async def afind_matching_queries(self, text, min_score=0.0, max_results=10):
+        return await self.query_matcher.afind_matching_queries(text, min_score, max_results)
     
     def get_query_info(self, query_id):
         """쿼리 ID로 쿼리 정보 조회"""
         return self.index_storage.get_query_info(query_id)
+
+    def remove_query(self, query_id):
+        """쿼리와 키워드 인덱스 연결 삭제"""
+        return self.index_storage.remove_query(query_id)
     
     def print_keyword_info(self):
         """키워드 정보 출력"""
@@ -636,8 +883,7 @@ class CacheKeywors:
     
     @staticmethod
     def extract_keywords(text):
-        okt = Okt()
-        tokens = okt.pos(text, stem=True)
+        tokens = get_morph_analyzer().pos(text, stem=True)
         
         # 동의어 처리 추가
         keywords = [word for word, pos in tokens if pos in ('Noun', 'Verb', 'Adjective')]
@@ -727,28 +973,122 @@ class CacheKeywors:
         return tier
     
 class YouTubeCacheSystem:
-    def __init__(self,data_path="./quary_to_data.h5",qary_path="./keyword_to_quary.h5"):
+    def __init__(self,data_path="./quary_to_data.h5",qary_path="./keyword_to_quary.h5",semantic=None,embed_fn=None):
         self.cache = CacheManager(data_path)
         self.cache_manager = KeywordQueryManager(qary_path)
-    def add_query(self,query_text,data,query_id=None):
+        # 의미 기반 캐시 계층 (quary_to_data.h5 옆의 .faiss 인덱스)
+        if semantic is None:
+            semantic=settings.YOUTUBE_SEMANTIC_CACHE
+        self.semantic=None
+        if semantic:
+            self.semantic=SemanticCache(
+                os.path.splitext(data_path)[0]+".faiss",
+                threshold=settings.YOUTUBE_SEMANTIC_CACHE_THRESHOLD,
+                min_overlap=settings.YOUTUBE_SEMANTIC_CACHE_MIN_OVERLAP,
+                embed_fn=embed_fn,
+            )
+        # 데이터 캐시(quary_to_data.h5)의 키(공백 제거한 쿼리) -> 키워드 인덱스의 쿼리 ID
+        # 데이터 항목이 정책에 따라 만료/제거되면 키워드 인덱스와 의미 캐시에서도 지웁니다.
+        self._index_ids={}
+        storage=self.cache_manager.index_storage
+        for query_id in storage.get_all_queries():
+            query_text=storage.get_query_info(query_id).get('query_text','')
+            self._index_ids.setdefault(query_text.replace(" ",""),{})[query_id]=query_text
+        for key in [key for key in self._index_ids if key not in self.cache]:
+            self._on_evict(key)  # 데이터가 이미 없는 인덱스 항목 정리
+        self.cache.on_evict.append(self._on_evict)
+        # 첫 요청에서 JVM/Okt 초기화를 기다리지 않도록 미리 준비
+        try:
+            get_morph_analyzer().warm()
+        except Exception as e:
+            print(f"형태소 분석기 준비 실패 (사전/모델 번호 기반 키워드만 사용): {e}")
+    def _on_evict(self,key):
+        for query_id,query_text in self._index_ids.pop(key,{}).items():
+            self.cache_manager.remove_query(query_id)
+            if self.semantic is not None:
+                self.semantic.remove(query_text)
+    def add_query(self,query_text,data,query_id=None,negative=False):
         if isinstance(data,list):
             data=data[0]
         if isinstance(query_text,list):
             query_text=query_text[0]   
-        self.cache_manager.add_query(query_text,query_id)
-        inpitdict={query_text.replace(" ",""):[data]}
-        self.cache.add_hash(inpitdict)
+        query_id=self.cache_manager.add_query(query_text,query_id)
+        self._index_ids.setdefault(query_text.replace(" ",""),{})[query_id]=query_text
+        if negative:
+            # 실패 결과는 같은 키로, 실패 표시와 짧은 TTL을 붙여 저장
+            inpitdict={query_text.replace(" ",""):[{NEGATIVE_FLAG:True,"data":data}]}
+            self.cache.add_hash(inpitdict,ttl=settings.YOUTUBE_NEGATIVE_CACHE_TTL)
+        else:
+            inpitdict={query_text.replace(" ",""):[data]}
+            self.cache.add_hash(inpitdict)
+        if self.semantic is not None:
+            try:
+                self.semantic.add(query_text,self.cache_manager.keyword_extractor.extract_keywords(query_text))
+            except Exception as e:
+                print(f"의미 캐시 저장 실패: {e}")
+    def add_negative(self,query_text,data,query_id=None):
+        """
+        추론 실패(키워드 필터링 결과 없음) 결과를 YOUTUBE_NEGATIVE_CACHE_TTL초 동안 캐시합니다.
+        같은 쿼리(공백 무시)나 의미 캐시가 적중한 쿼리는 그동안 다시 추론하지 않고 같은 실패 결과를 받습니다.
+        키워드 겹침 계층에서는 실패 결과를 돌려주지 않습니다 ('X 카메라' 실패가 'Y 카메라'로 번지지 않도록).
+        """
+        self.add_query(query_text,data,query_id,negative=True)
     def find_matching_queries(self,text,min_score=0.5, max_results=3):
         if isinstance(text,list):
             text=text[0]
+        out=self._load_query(text)
+        if out:
+            return out
+        if self.semantic is not None:
+            keywords=self.cache_manager.keyword_extractor.extract_keywords(text)
+            out=self._find_semantic(text,keywords)
+            if out:
+                return out
+        return self.find_keyword_match(text,min_score,max_results)
+    def find_keyword_match(self,text,min_score=0.5, max_results=3):
+        """키워드 가중 겹침만으로 찾는 기존 캐시 계층"""
         matches= self.cache_manager.find_matching_queries(text,min_score,max_results)
-        if matches:
-            find_dict={matches[0]['query_text'].replace(" ",""):""}
-            out=self.cache.get_value(find_dict)
+        return self._load_match(matches)
+    async def afind_matching_queries(self,text,min_score=0.5, max_results=3):
+        if isinstance(text,list):
+            text=text[0]
+        out=await asyncio.to_thread(self._load_query,text)
+        if out:
+            return out
+        keywords=await self.cache_manager.keyword_extractor.aextract_keywords(text)
+        if self.semantic is not None:
+            out=await asyncio.to_thread(self._find_semantic,text,keywords)
             if out:
-                return list(self.cache.get_dict.values())[0][0], matches[0]['query_text']
-            else:
-                return False
+                return out
+        matches=self.cache_manager.query_matcher.match_keywords(keywords,min_score,max_results)
+        return self._load_match(matches)
+    def _find_semantic(self,text,keywords):
+        try:
+            hit=self.semantic.lookup(text,keywords)
+        except Exception as e:
+            print(f"의미 캐시 조회 실패: {e}")
+            return False
+        if not hit:
+            return False
+        return self._load_query(hit[0])
+    def _load_match(self,matches):
+        # 키워드 겹침 계층: 실패 결과는 건너뛰고 점수 순으로 첫 정상 결과
+        for match in matches or []:
+            out=self._load_query(match['query_text'],negative=False)
+            if out:
+                return out
+        return False
+    def _load_query(self,query_text,negative=True):
+        # 여러 요청이 같은 인스턴스를 공유하므로 get_dict 대신 반환값 사용
+        out=self.cache.get_values([query_text.replace(" ","")])
+        if out:
+            data=list(out.values())[0][0]
+            if isinstance(data,dict) and data.get(NEGATIVE_FLAG):
+                if not negative:
+                    return False
+                print(f"실패 결과 캐시 적중 : {query_text}")
+                return data["data"], query_text
+            return data, query_text
         else:
             return False
     def get_query_info(self,query_id):
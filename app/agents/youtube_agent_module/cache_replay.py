@@ -0,0 +1,110 @@
+import argparse
+import hashlib
+import os
+import tempfile
+import numpy as np
+from .bm25 import char_bigrams
+from .cache import YouTubeCacheSystem
+
+
+def bigram_embedding(dimension=1536):
+    """
+    문자 bigram을 해시해 만든 임베딩 함수 (API 키 없이 재생할 때 쓰는 근사치)
+    OpenAI 임베딩과 유사도 분포가 다르므로 적중률은 방식 간 비교용으로만 봐야 합니다.
+    """
+    def embed(text):
+        vector = np.zeros(dimension, dtype=np.float32)
+        for token in char_bigrams(text):
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            vector[int.from_bytes(digest[:4], "little") % dimension] += 1.0
+        return vector
+    return embed
+
+
+def read_query_log(path):
+    """
+    한 줄에 쿼리 하나인 로그를 읽습니다. '그룹<TAB>쿼리' 형식이면 그룹(같은 답을 받아야 하는 쿼리 묶음)도 읽습니다.
+
+    Returns:
+        list[tuple]: (쿼리, 그룹 또는 None)
+    """
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            group, _, query = line.rpartition("\t")
+            entries.append((query.strip(), group.strip() or None))
+    return entries
+
+
+def replay_hit_rate(queries, workdir=None, embed_fn=None):
+    """
+    쿼리 로그를 순서대로 재생하며 키워드 캐시만 쓸 때와 의미 캐시를 함께 쓸 때의 적중률을 비교합니다.
+    빈 임시 캐시에서 시작하고, 두 방식 모두 놓친 쿼리만 (재생용 더미 결과로) 캐시에 추가합니다.
+    그룹이 있는 쿼리는 적중한 캐시 항목의 그룹이 다르면 오적중으로 셉니다.
+
+    Args:
+        queries (list): 재생할 쿼리 문자열 또는 (쿼리, 그룹) 목록
+        workdir (str, optional): 임시 캐시 파일 위치
+        embed_fn (callable, optional): 의미 캐시 임베딩 함수 (기본은 OpenAI 임베딩)
+
+    Returns:
+        dict: {'queries', 'keyword_hits', 'semantic_hits', 'keyword_hit_rate', 'semantic_hit_rate',
+               'keyword_false_hits', 'semantic_false_hits'}
+    """
+    entries = [entry if isinstance(entry, tuple) else (entry, None) for entry in queries]
+    workdir = workdir or tempfile.mkdtemp(prefix="cache_replay_")
+    system = YouTubeCacheSystem(
+        data_path=os.path.join(workdir, "quary_to_data.h5"),
+        qary_path=os.path.join(workdir, "keyword_to_quary.h5"),
+        semantic=True,
+        embed_fn=embed_fn,
+    )
+    groups = {}
+    keyword_hits = semantic_hits = keyword_false = semantic_false = 0
+
+    def is_false_hit(hit, group):
+        cached_group = groups.get(hit[0]["replay"]) if hit else None
+        return bool(hit) and group is not None and cached_group is not None and cached_group != group
+
+    try:
+        for query, group in entries:
+            keyword_hit = system.find_keyword_match(query)
+            hit = keyword_hit or system.find_matching_queries(query)
+            keyword_hits += bool(keyword_hit)
+            semantic_hits += bool(hit)
+            keyword_false += is_false_hit(keyword_hit, group)
+            semantic_false += is_false_hit(hit, group)
+            if not hit:
+                system.add_query(query, {"replay": query})
+                groups[query] = group
+    finally:
+        system.close()
+    total = max(len(entries), 1)
+    return {
+        "queries": len(entries),
+        "keyword_hits": keyword_hits,
+        "semantic_hits": semantic_hits,
+        "keyword_hit_rate": keyword_hits / total,
+        "semantic_hit_rate": semantic_hits / total,
+        "keyword_false_hits": keyword_false,
+        "semantic_false_hits": semantic_false,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="쿼리 로그 재생으로 캐시 적중률 비교")
+    parser.add_argument("log", help="한 줄에 쿼리 하나(또는 '그룹<TAB>쿼리')인 텍스트 파일")
+    parser.add_argument("--workdir", default=None)
+    parser.add_argument("--embedding", choices=["openai", "bigram"], default="openai",
+                        help="bigram: API 키 없이 문자 bigram 해시 임베딩으로 재생")
+    args = parser.parse_args()
+    report = replay_hit_rate(
+        read_query_log(args.log), args.workdir,
+        embed_fn=bigram_embedding() if args.embedding == "bigram" else None,
+    )
+    print(f"쿼리 {report['queries']}개")
+    print(f"키워드 캐시만 : {report['keyword_hits']}회 적중 ({report['keyword_hit_rate']:.1%}), 오적중 {report['keyword_false_hits']}회")
+    print(f"의미 캐시 포함 : {report['semantic_hits']}회 적중 ({report['semantic_hit_rate']:.1%}), 오적중 {report['semantic_false_hits']}회")
@@ -0,0 +1,21 @@
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+
+@dataclass
+class RetrievalContext:
+    """
+    YouTube 검색 요청 하나의 상태
+    Keyword_filter, Dataprocessor, 벡터스토어는 읽기 전용 공유 인덱스로만 쓰고,
+    요청마다 달라지는 값(개선된 쿼리, 키워드, 태그 점수, 검색 대상 인덱스)은 모두 이 객체에 담아
+    여러 요청이 같은 Keyword_filter를 동시에 사용해도 서로의 값을 덮어쓰지 않도록 합니다.
+    """
+    query: str
+    enhanced_query: str = ""
+    positive_keywords: List[str] = field(default_factory=list)
+    negative_keywords: List[str] = field(default_factory=list)
+    selected_keywords: List[str] = field(default_factory=list)
+    tag_scores: Optional[Any] = None  # keyword_filter 결과 (index: video_id, 'score')
+    bm25_ranking: Optional[List[int]] = None  # bm25_candidates 결과 (video_id 순위)
+    active: Optional[Any] = None  # 벡터 검색 대상 HDF5 행 인덱스
+    rag_available: bool = False
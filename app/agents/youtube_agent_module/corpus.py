@@ -0,0 +1,73 @@
+import gc
+import threading
+
+# Dataprocessor 인스턴스들이 공유하는 읽기 전용 코퍼스 속성
+CORPUS_ATTRS = (
+    "data",
+    "tot_doc_len",
+    "Index_table",
+    "keyword_set",
+    "keyword_index",
+    "summary_list",
+    "video_table",
+    "upload_time",
+    "facets",
+    "vectorstore",
+    "bm25",
+    "cue_store",
+)
+
+
+class Corpus:
+    """
+    자막 데이터, 태그 테이블, 영상 식별자 테이블, 벡터스토어 핸들을 묶은 읽기 전용 코퍼스
+    프로세스당 한 번만 로드하고 모든 Dataprocessor가 같은 객체를 참조합니다.
+    앱 임포트 시점(graph.py의 YouTubeAgent 생성)에 로드되므로, gunicorn --preload로 마스터에서 로드하면
+    fork된 uvicorn 워커들이 copy-on-write로 같은 메모리 페이지를 공유합니다.
+    """
+    def __init__(self, **fields):
+        for name in CORPUS_ATTRS:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def capture(cls, processor):
+        """로드가 끝난 Dataprocessor의 코퍼스 속성을 가져옵니다."""
+        return cls(**{name: getattr(processor, name, None) for name in CORPUS_ATTRS})
+
+    def attach(self, processor):
+        """Dataprocessor에 코퍼스 속성을 복사 없이 연결합니다."""
+        for name in CORPUS_ATTRS:
+            setattr(processor, name, getattr(self, name))
+
+
+_corpus = None
+_lock = threading.Lock()
+
+
+def get_corpus(loader):
+    """
+    공유 코퍼스를 반환합니다. 처음 호출될 때만 loader()로 로드합니다.
+
+    Args:
+        loader (callable): Corpus를 반환하는 로드 함수
+    """
+    global _corpus
+    if _corpus is None:
+        with _lock:
+            if _corpus is None:
+                _corpus = loader()
+                # 로드된 객체를 GC 추적 세대에서 제외해, fork된 워커가 GC 때문에 페이지를 복사하지 않도록 함
+                gc.collect()
+                gc.freeze()
+    return _corpus
+
+
+def is_loaded():
+    return _corpus is not None
+
+
+def reset_corpus():
+    """태깅 등으로 코퍼스 파일이 바뀐 뒤 다음 요청에서 다시 로드하도록 합니다."""
+    global _corpus
+    with _lock:
+        _corpus = None
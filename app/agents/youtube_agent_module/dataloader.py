@@ -3,7 +3,6 @@ import os
 from pandas import Series
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 import pandas as pd
-import tiktoken
 from langchain_openai import ChatOpenAI as OpenAI
 from langchain.chains import RetrievalQA
 import json
@@ -16,66 +15,57 @@ import re
 from pathlib import Path
 import sys
 import argparse
-import difflib
 import numpy as np
 import math
-import hashlib
 from langchain.callbacks.stdout import StdOutCallbackHandler
 from .utility import Node
 from .queue_manager import add_log
 from .CFAISS import WrIndexFlatL2, HDF5VectorDB
-globalist=[]
+from .video_table import VideoTable
+from . import tokenizer
+from .indexing_job import IndexingJob, IndexingTask
+from .corpus import Corpus, get_corpus
+from .fuzzy import FuzzyIndex, jamo_normalize
+from .bm25 import BM25Index, strip_srt
+from .srt import CueStore
+from .facets import FacetIndex
+from .hybrid import maximal_marginal_relevance
+from app.config import settings
 def log_wrapper(log_message):
-    globalist.append(log_message)
     add_log(log_message)  
 
 def truncate_text_by_tokens(text, max_tokens, model="gpt-4o-mini"):
-    encoding = tiktoken.encoding_for_model(model)
-    tokens = encoding.encode(text)
-    if len(tokens) > max_tokens:
-        tokens = tokens[:max_tokens]
-        return encoding.decode(tokens)
-    return text
+    return tokenizer.truncate(text, max_tokens, model)
 
 def token_bool(text, model="gpt-4o-mini",target=1500):
-    encoding = tiktoken.encoding_for_model(model)
-    tokens = encoding.encode(text)
-    length=len(tokens)
-    return length>target
+    return tokenizer.exceeds(text, target, model)
 def split_text_by_target(text, target=1400, model="gpt-4o-mini"):
-    encoding = tiktoken.encoding_for_model(model)
-    tokens = encoding.encode(text)
-    # 전체 토큰 개수
-    total_tokens = len(tokens)
-    
-    # 나눠야 하는 개수 계산
-    num_splits = math.ceil(total_tokens / target)  # 남는 토큰이 없도록 개수 조정
-    chunk_size = total_tokens // num_splits  # 균등하게 분배
-    
-    token_chunks = [tokens[i * chunk_size:(i + 1) * chunk_size] for i in range(num_splits - 1)]
-    token_chunks.append(tokens[(num_splits - 1) * chunk_size:])  # 마지막 청크는 남은 모든 토큰 포함
+    return tokenizer.split_by_target(text, target, model)
     
-    # 다시 텍스트로 변환
-    text_chunks = [encoding.decode(chunk) for chunk in token_chunks]
+# 상대 업로드 표기("1 years ago", "3개월 전")의 단위별 일수
+_RELATIVE_UNIT_DAYS = {
+    "second": 1/86400, "minute": 1/1440, "hour": 1/24, "day": 1, "week": 7, "month": 30, "year": 365,
+    "초": 1/86400, "분": 1/1440, "시간": 1/24, "일": 1, "주": 7, "개월": 30, "달": 30, "년": 365,
+}
+_RELATIVE_UPLOAD_PATTERN = re.compile(r'(\d+)\s*(second|minute|hour|day|week|month|year|초|분|시간|일|주|개월|달|년)s?\s*(?:ago|전)')
 
-    return text_chunks
-    
-def _hash_transform(txt):
+def parse_upload_date(text, reference):
     """
-    WrIndexFlatL2 객체를 입력으로 받아, `metadata + page` 조합을 사용하여 해시값 생성
+    상대 업로드 표기를 수집 시점(reference) 기준의 절대 시각으로 변환합니다.
+    해석할 수 없는 표기는 NaT를 반환합니다.
     """
-    if not isinstance(txt, str):
-        raise ValueError("입력 데이터는 문자열 이어야 합니다.")
-    unique_key = f"{txt}"
-    hashout = int(hashlib.sha256(unique_key.encode()).hexdigest(), 16) % (2**63)
-    return hashout  # ✅ 해시값을 딕셔너리 형태로 반환 (index -> hash)
-
-     
+    if isinstance(text, Series):
+        text = text.values[0]
+    if not isinstance(text, str):
+        return pd.NaT
+    match = _RELATIVE_UPLOAD_PATTERN.search(text)
+    if not match:
+        return pd.NaT
+    days = int(match.group(1)) * _RELATIVE_UNIT_DAYS[match.group(2)]
+    return pd.Timestamp(reference) - pd.Timedelta(days=days)
 
 def cal_token(text, model="gpt-4o-mini"):
-    encoding = tiktoken.encoding_for_model(model)
-    tokens = encoding.encode(text)
-    return len(tokens)
+    return tokenizer.count_tokens(text, model)
 
 def simple_filter(metadata):
     simple_metadata = {}
@@ -103,7 +93,7 @@ def compress_subtitles(text, chunk_size=500, overlap=50):  # overlap이 +/-
     return chunks
 
 def setting_tockens(text,target=1600,model="gpt-4o-mini",chunk_size=500):
-    encoding = tiktoken.encoding_for_model(model)
+    encoding = tokenizer.get_encoding(model)
     tokens = encoding.encode(text)
     chunck_overrap= int(round((target-len(tokens))/2/target*chunk_size,0))
     if -chunck_overrap > chunk_size/4:
@@ -125,12 +115,18 @@ def compress_text(subtitle_text, chunk_size=500, chunk_overlap=50):
     return text_splitter.split_text(subtitle_text)
 
 def count_tokens(text, model="gpt-4o-"):
-    # 모델에 맞는 인코딩 방식을 가져옵니다.
-    encoding = tiktoken.encoding_for_model(model)
-    # 텍스트를 토큰으로 인코딩합니다.
-    tokens = encoding.encode(text)
-    # 토큰의 개수를 반환합니다.
-    return len(tokens)
+    return tokenizer.count_tokens(text, model)
+
+def flatten_tags(value):
+    """중첩 리스트로 저장된 태그 컬럼 값을 문자열 태그 목록으로 펼칩니다."""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, (list, tuple)):
+        tags=[]
+        for item in value:
+            tags.extend(flatten_tags(item))
+        return tags
+    return []
 
 def load_file(filename):
     with open(filename, "r", encoding="utf-8") as f:
@@ -138,6 +134,95 @@ def load_file(filename):
         file = f.read().splitlines()
     return file
 
+BM25_INDEX_PATH="./app/agents/youtube_agent_module/data/bm25_index.h5"
+CUE_STORE_PATH="./app/agents/youtube_agent_module/copydata/cue_store.npz"
+INDEXING_JOURNAL_PATH="./app/agents/youtube_agent_module/copydata/indexing_progress.jsonl"
+
+
+def build_keyword_index(keywords):
+    """설정(YOUTUBE_FUZZY_JAMO)에 따라 음절 또는 자모 기준 태그 유사어 인덱스를 만듭니다."""
+    if settings.YOUTUBE_FUZZY_JAMO:
+        return FuzzyIndex(keywords, normalize=jamo_normalize, cutoff=settings.YOUTUBE_FUZZY_JAMO_CUTOFF)
+    return FuzzyIndex(keywords, cutoff=settings.YOUTUBE_FUZZY_CUTOFF)
+
+
+# get_video_data에서 매 요청 함께 전달하는 주요 제조사 라인업 (고정 블록이므로 토큰 수는 메모이즈)
+MANUFACTURER_LINEUP_CONTEXT="""
+        
+        주요 제조사 라인업<IOS
+        [애플 {
+            스마트폰:
+                아이폰 프로 시리즈: 최상위 플래그십(iPhone 15 Pro, 15 Pro Max)
+                아이폰 기본 시리즈: 준프리미엄(iPhone 15, 15 Plus)
+                아이폰 SE: 실용적인 보급형 모델(iPhone SE 3세대)
+            태블릿:
+                아이패드 프로: 최고사양 프로용 태블릿(12.9인치, 11인치)
+                아이패드 에어: 준프리미엄 태블릿
+                아이패드: 기본형 태블릿
+                아이패드 미니: 소형 태블릿
+            노트북:
+                맥북 프로: 전문가용 고성능(14인치, 16인치, M3/M3 Pro/M3 Max)
+                맥북 에어: 일반용 슬림(13인치, 15인치, M2/M3)
+                맥 미니: 데스크톱 미니PC
+                맥 스튜디오: 전문가용 고성능 데스크톱
+                맥 프로: 최상위 워크스테이션
+            모니터:
+                프로 디스플레이 XDR: 최고급 전문가용 모니터
+                스튜디오 디스플레이: 준프리미엄 모니터
+            웨어러블:
+                애플워치: 스마트워치(Series 9, Ultra 2, SE 2세대)
+                에어팟: 무선이어폰(AirPods Pro 2, AirPods 3, AirPods 2)
+                에어팟 맥스: 오버이어 헤드폰
+                비전 프로: 혼합현실 헤드셋 (2024년 출시)
+            }]
+        안드로이드    
+        [삼성{ 
+            스마트폰:
+                갤럭시 S 시리즈: 최상위 플래그십 라인(S24, S24+, S24 Ultra)
+                갤럭시 Z 시리즈: 폴더블 스마트폰(Z Fold5, Z Flip5)
+                갤럭시 A 시리즈: 중저가 라인(A54, A34 등)
+                갤럭시 M 시리즈: 실용적인 가성비 라인(M34, M14 등)
+            태블릿:
+                갤럭시 탭 S 시리즈: 프리미엄 태블릿(Tab S9, S9+, S9 Ultra)
+                갤럭시 탭 A 시리즈: 중저가 태블릿(Tab A9, A8 등)
+                갤럭시 탭 Active: 견고성 강화 비즈니스용 태블릿
+            노트북:
+                갤럭시 북4 시리즈: 프리미엄 노트북(Book4 Pro, Book4 Pro 360)
+                갤럭시 북3 시리즈: 일반 사무용/학생용 노트북
+                갤럭시 Book2 Business: 비즈니스용 노트북
+            모니터:
+                오디세이 시리즈: 게이밍 모니터(G9, G7, G5 등)
+                뷰피니티 시리즈: 전문가용 고해상도 모니터
+                스마트 모니터: 일체형 스마트 디스플레이
+            웨어러블:
+                갤럭시 워치: 스마트워치(Watch6, Watch6 Classic)
+                갤럭시 버즈: 무선이어폰(Buds3, Buds3 Pro)
+                갤럭시 링: 스마트 반지(신제품)
+            }
+        샤오미{
+            스마트폰:
+                샤오미 시리즈: 플래그십 라인(Xiaomi 14, 14 Pro, 14 Ultra)
+                레드미 노트 시리즈: 중급형(Redmi Note 13 Pro+, Note 13 Pro, Note 13)
+                레드미 시리즈: 보급형(Redmi 13C, 12C 등)
+                POCO 시리즈: 성능특화 중저가(POCO F5, X5, M5 등)
+            태블릿:
+                샤오미 패드: 프리미엄 태블릿(Pad 6, Pad 6 Pro)
+                레드미 패드: 보급형 태블릿(Redmi Pad SE)
+            노트북:
+                샤오미북: 프리미엄 노트북(RedmiBook Pro, Mi Notebook Pro)
+                레드미북: 일반 사무용/학생용 노트북(RedmiBook 15)
+            모니터:
+                Mi 모니터: 일반용 모니터
+                Mi 게이밍 모니터: 게이밍용 모니터
+                Mi 커브드 모니터: 커브드 디스플레이
+            웨어러블:
+                샤오미 워치: 스마트워치(Watch S3, Smart Band 8)
+                레드미 워치: 보급형 스마트워치(Redmi Watch 3)
+                샤오미 버즈: 무선이어폰(Buds 4 Pro, Buds 4)
+                레드미 버즈: 보급형 무선이어폰(Redmi Buds 4)
+            }]>    
+        """
+
 class Dataprocessor:
     def __init__(self, target_dir="youtube", ref_file="YTref.txt",pickle_file="./app/agents/youtube_agent_module/copydata/data.pkl",mode=None):
         dir=Path("./app/agents/youtube_agent_module/copydata")
@@ -146,12 +231,8 @@ class Dataprocessor:
             raise Exception("node id is None")
         self.mode=mode
         self.tocken_count=0
-        self.vectorstore = None
-        dimension = 1536
-        self.vectorstore = HDF5VectorDB("./app/agents/youtube_agent_module/data/vector_db.h5", dimension)
         current_dir = os.getcwd()
-        self.indexer=Indexer(mode=self.mode)
-        self.tot_doc_len=0
+        self.indexer=None
         self.k_value=30
         self.buffer=None
         self.lln = None
@@ -162,48 +243,13 @@ class Dataprocessor:
         self.pickle_file = pickle_file
         self.ytref_list = self.load_ytref( ref_file)
         self.youtube_contents = self.load_youtube_folder()
-        self.Index_table=pd.DataFrame()
-        self.keyword_set=set()
-        self.summary_list=None
-        self.heshdict={}
-        if self.mode=="tag" or self.mode=="excelerator":
-        #if self.mode=="tag":
-            print ("excelerator deactivated")    
-            self.remove_pickle()
-        if os.path.exists(self.pickle_file):
-            log_wrapper("피클 파일에서 데이터 로드 중...")
-            self.data = self.load_data_from_pickle(self.pickle_file)
-            log_wrapper("자막데이터 로드 완료")
+        self.max_video_age_days=settings.YOUTUBE_MAX_VIDEO_AGE_DAYS
+        self.recency_half_life_days=settings.YOUTUBE_RECENCY_HALF_LIFE_DAYS
+        if self.mode=="run":
+            # 서비스용 인스턴스는 프로세스 공용 코퍼스를 참조 (최초 1회만 로드)
+            get_corpus(self.load_corpus).attach(self)
         else:
-            log_wrapper("디렉토리에서 데이터 스캔 중...")
-            self.data={}
-            self.load_csv_in_folder()
-            self.load_srt_in_folder()
-            self.create_summary_dicts()
-            self.save_data_to_pickle(self.data, self.pickle_file)
-        #self.create_summary_dicts()     ###########################################                    
-        if os.path.exists("./app/agents/youtube_agent_module/copydata/tot_doc_len.pkl"):
-            self.tot_doc_len=self.load_data_from_pickle("./app/agents/youtube_agent_module/copydata/tot_doc_len.pkl")
-            log_wrapper("전체 문서 길이 로드 완료")
-        if os.path.exists("./app/agents/youtube_agent_module/copydata/Index_table.pkl"):
-            self.Index_table=pd.DataFrame(self.load_data_from_pickle("./app/agents/youtube_agent_module/copydata/Index_table.pkl"))
-            log_wrapper("문서별 태그 정보 로드 완료")
-        if os.path.exists("./app/agents/youtube_agent_module/copydata/heshdict.pkl"):
-            self.heshdict=self.load_data_from_pickle("./app/agents/youtube_agent_module/copydata/heshdict.pkl")
-            log_wrapper("해시 딕셔너리 로드 완료")
-        elif not self.Index_table.empty:
-            self.make_hesh_dict()            
-        if os.path.exists("./app/agents/youtube_agent_module/copydata/keyword_set.pkl"):
-            self.keyword_set=set(self.load_data_from_pickle("./app/agents/youtube_agent_module/copydata/keyword_set.pkl"))
-            log_wrapper("전체 태그셋 로드 완료")
-        if os.path.exists("./app/agents/youtube_agent_module/copydata/summary.pkl"):
-            self.summary_list=self.load_data_from_pickle("./app/agents/youtube_agent_module/copydata/summary.pkl")
-            log_wrapper("요약 정보 로드 완료")
-        buffer=[0]*len(self.Index_table.columns)
-        self.datelimit=pd.DataFrame(buffer,index=self.Index_table.columns,columns=["available"])
-        if os.path.exists("./app/agents/youtube_agent_module/copydata/datelimit.pkl"):
-            self.datelimit=self.load_data_from_pickle("./app/agents/youtube_agent_module/copydata/datelimit.pkl")
-            log_wrapper("업로드 일자 제한 정보 로드 완료")
+            self.load_corpus()
 
         self.qa=None
         self.videometadata=[]
@@ -255,47 +301,216 @@ class Dataprocessor:
         )
         # 커스텀 템플릿 정의 (예시)
         log_wrapper("<<::STATE::Dataprocessor INITIALIZED>>데이터 처리기 초기화 완료")
-    def set_day_limit(self):
-        index=self.Index_table.columns
-        data=[0]*len(index)
-        self.datelimit=pd.DataFrame(data,index=index,columns=["available"])
-        for index in self.Index_table.columns:
-            if index != '0':
-                seplist=index.replace(']','[').replace('[[','[').split('[')
-                days=self.data[seplist[1]][1]['업로드일'][int(seplist[-2])]
-                if isinstance(days, Series):
-                    days=days.values[0]
-                days=days.split(" ")
-                if days[1]=="years":
-                    if int(days[0])>1:
-                        self.datelimit.loc[index]=0
-                    else:
-                        self.datelimit.loc[index]=1
-                else:
-                    self.datelimit.loc[index]=1
-            else:
-                print (f"인덱스 오류 {index}")
-        self.save_data_to_pickle(self.datelimit,"./app/agents/youtube_agent_module/copydata/datelimit.pkl")
-        
+    def load_corpus(self):
+        """
+        피클(없으면 youtube 폴더)에서 코퍼스를 로드하고 식별자/업로드 시각을 보완합니다.
+        tag, excelerator 모드에서는 기존 피클을 지우고 새로 만듭니다.
+        """
+        dimension = 1536
+        self.vectorstore = HDF5VectorDB("./app/agents/youtube_agent_module/data/vector_db.h5", dimension)
+        self.tot_doc_len=0
+        self.Index_table=pd.DataFrame()
+        self.keyword_set=set()
+        self.summary_list=None
+        self.video_table=None
+        if self.mode=="tag" or self.mode=="excelerator":
+        #if self.mode=="tag":
+            print ("excelerator deactivated")    
+            self.remove_pickle(reset_journal=settings.YOUTUBE_RESET_INDEXING_JOURNAL)
+        if os.path.exists(self.pickle_file):
+            log_wrapper("피클 파일에서 데이터 로드 중...")
+            self.data = self.load_data_from_pickle(self.pickle_file)
+            log_wrapper("자막데이터 로드 완료")
+        else:
+            log_wrapper("디렉토리에서 데이터 스캔 중...")
+            self.data={}
+            self.load_csv_in_folder()
+            self.set_video_table(rebuild=True)
+            self.load_srt_in_folder()
+            self.create_summary_dicts()
+            self.save_data_to_pickle(self.data, self.pickle_file)
+        #self.create_summary_dicts()     ###########################################                    
+        if os.path.exists("./app/agents/youtube_agent_module/copydata/tot_doc_len.pkl"):
+            self.tot_doc_len=self.load_data_from_pickle("./app/agents/youtube_agent_module/copydata/tot_doc_len.pkl")
+            log_wrapper("전체 문서 길이 로드 완료")
+        if os.path.exists("./app/agents/youtube_agent_module/copydata/Index_table.pkl"):
+            self.Index_table=pd.DataFrame(self.load_data_from_pickle("./app/agents/youtube_agent_module/copydata/Index_table.pkl"))
+            log_wrapper("문서별 태그 정보 로드 완료")
+        if os.path.exists("./app/agents/youtube_agent_module/copydata/keyword_set.pkl"):
+            self.keyword_set=set(self.load_data_from_pickle("./app/agents/youtube_agent_module/copydata/keyword_set.pkl"))
+            log_wrapper("전체 태그셋 로드 완료")
+        self.keyword_index=build_keyword_index(self.keyword_set)
+        if os.path.exists("./app/agents/youtube_agent_module/copydata/summary.pkl"):
+            self.summary_list=self.load_data_from_pickle("./app/agents/youtube_agent_module/copydata/summary.pkl")
+            log_wrapper("요약 정보 로드 완료")
+        if self.video_table is None:
+            self.set_video_table()
+        self.migrate_legacy_keys()
+        self.ensure_upload_time()
+        self.set_upload_index()
+        self.facets=FacetIndex(self.Index_table)
+        if os.path.exists(BM25_INDEX_PATH):
+            self.bm25=BM25Index.load(BM25_INDEX_PATH)
+            log_wrapper("BM25 색인 로드 완료")
+        else:
+            self.build_bm25_index()
+        if os.path.exists(CUE_STORE_PATH):
+            self.cue_store=CueStore.load(CUE_STORE_PATH)
+            log_wrapper("자막 큐 저장소 로드 완료")
+        else:
+            self.build_cue_store()
+        return Corpus.capture(self)
+
+    def build_cue_store(self, path=None):
+        """영상별 자막(SRT)을 큐 배열(시작/끝 ms, 텍스트 오프셋)로 변환해 저장합니다."""
+        path=path or CUE_STORE_PATH
+        def subtitles():
+            for video_id in range(len(self.video_table)):
+                channel, idx = self.video_table.locate(video_id)
+                try:
+                    subtitle=self.data[channel][1].loc[idx, "자막"]
+                except KeyError:
+                    continue
+                if isinstance(subtitle, Series):
+                    subtitle=subtitle.values[0]
+                yield video_id, subtitle
+        self.cue_store=CueStore.build(subtitles(), len(self.video_table))
+        self.cue_store.save(path)
+        log_wrapper(f"자막 큐 저장소 생성 완료 (큐 {len(self.cue_store.start_ms)}개)")
+
+    def bm25_documents(self):
+        """video_id별 BM25 필드(제목, 태그, 설명, 자막) 텍스트를 생성합니다."""
+        for video_id in range(len(self.video_table)):
+            channel, idx = self.video_table.locate(video_id)
+            try:
+                row=self.data[channel][1].loc[idx]
+            except KeyError:
+                continue
+            if isinstance(row, pd.DataFrame):
+                row=row.iloc[0]
+            doc={name: row.get(name) if isinstance(row.get(name), str) else "" for name in ("제목", "설명", "자막")}
+            doc["자막"]=strip_srt(doc["자막"])
+            doc["태그"]=" ".join(flatten_tags(row.get("태그")))
+            yield video_id, doc
+
+    def build_bm25_index(self, path=None):
+        path=path or BM25_INDEX_PATH
+        log_wrapper("BM25 색인 생성 중...")
+        self.bm25=BM25Index.build(self.bm25_documents(), len(self.video_table), tokenizer=settings.YOUTUBE_BM25_TOKENIZER)
+        self.bm25.save(path)
+
+    def ensure_upload_time(self):
+        """
+        수집 당시 계산된 절대 업로드 시각(업로드시각) 컬럼이 없는 채널을 보완합니다.
+        기준 시각은 원본 csv(없으면 피클)의 수정 시각입니다.
+        """
+        updated=False
+        for channel, (csv_path, df) in self.data.items():
+            if "업로드시각" in df.columns:
+                continue
+            ref_path=csv_path if os.path.exists(csv_path) else self.pickle_file
+            reference=pd.Timestamp(os.path.getmtime(ref_path), unit="s") if os.path.exists(ref_path) else pd.Timestamp.now()
+            df["업로드시각"]=pd.to_datetime(df["업로드일"].apply(lambda x: parse_upload_date(x, reference)))
+            updated=True
+        if updated and os.path.exists(self.pickle_file):
+            self.save_data_to_pickle(self.data, self.pickle_file)
+            log_wrapper("절대 업로드 시각 보완 완료")
+
+    def set_upload_index(self):
+        """
+        Index_table 컬럼(video_id) 순서에 맞춘 업로드 시각 배열을 한 번 만들어 둡니다.
+        질의 시점의 최신성 필터와 감쇠 점수는 이 배열에 대한 벡터 연산으로 계산합니다.
+        """
+        self.video_table.set_upload_time(self.data)
+        ids=np.asarray(self.Index_table.columns, dtype=np.int64)
+        self.upload_time=self.video_table.upload_time[ids]
+
+    def set_video_table(self, rebuild=False, path="./app/agents/youtube_agent_module/copydata/video_table.pkl"):
+        """
+        video_id ↔ (채널, 행) 조회 테이블을 로드합니다.
+        rebuild=True(재수집)면 저장된 테이블에 새 (채널, 행)만 추가합니다. 기존 video_id는 바뀌지 않으므로
+        video_id로 저장된 벡터스토어(data/vector_db.h5)의 청크가 다른 영상을 가리키지 않습니다.
+        """
+        if os.path.exists(path):
+            self.video_table=VideoTable.from_dict(self.load_data_from_pickle(path))
+            log_wrapper("영상 식별자 테이블 로드 완료")
+            if not rebuild:
+                return
+            added=self.video_table.extend(self.data)
+            log_wrapper(f"영상 식별자 테이블에 {added}개 추가")
+        else:
+            self.video_table=VideoTable.from_data(self.data)
+        self.save_data_to_pickle(self.video_table.to_dict(), path)
+
+    def migrate_legacy_keys(self):
+        """
+        예전 문자열 식별자로 저장된 Index_table, summary, 벡터스토어를 video_id 기준으로 변환합니다.
+        """
+        columns=self.Index_table.columns
+        if len(columns) and not pd.api.types.is_integer_dtype(columns):
+            ids=[self.video_table.id_of_legacy(c) for c in columns]
+            keep=[i for i, vid in enumerate(ids) if vid is not None]
+            self.Index_table=self.Index_table.iloc[:, keep]
+            self.Index_table.columns=pd.Index([ids[i] for i in keep], dtype=np.int64)
+            self.save_data_to_pickle(self.Index_table,"./app/agents/youtube_agent_module/copydata/Index_table.pkl")
+            log_wrapper(f"Index_table 식별자 변환 완료 (제외된 컬럼 {len(columns)-len(keep)}개)")
+        if self.summary_list and isinstance(self.summary_list[0]['metadata'][0], str):
+            migrated=[]
+            for summary in self.summary_list:
+                vid=self.video_table.id_of_legacy(summary['metadata'][0])
+                if vid is None:
+                    continue
+                summary['metadata']=[vid]
+                migrated.append(summary)
+            self.summary_list=migrated
+            self.save_data_to_pickle(self.summary_list, "./app/agents/youtube_agent_module/copydata/summary.pkl")
+            log_wrapper("요약 정보 식별자 변환 완료")
+        if self.vectorstore.migrate_metadata(self.video_table.id_of_legacy):
+            log_wrapper("벡터스토어 식별자 변환 완료")
+
+    def available_mask(self, max_age_days=None, now=None):
+        """
+        업로드 후 max_age_days 이내인 영상의 마스크(Index_table 컬럼 순서)를 반환합니다.
+        업로드 시각을 알 수 없는 영상은 허용합니다.
+        """
+        if max_age_days is None:
+            max_age_days=self.max_video_age_days
+        cutoff=(pd.Timestamp.now() if now is None else pd.Timestamp(now))-pd.Timedelta(days=max_age_days)
+        return np.isnat(self.upload_time) | (self.upload_time >= cutoff.to_datetime64())
+
+    def available_columns(self, max_age_days=None, now=None):
+        return self.Index_table.columns[self.available_mask(max_age_days, now)]
+
+    def recency_decay(self, columns=None, half_life_days=None, now=None):
+        """
+        업로드 경과일에 대한 지수 감쇠 점수(0~1)를 반환합니다. 업로드 시각을 모르면 0입니다.
+        """
+        if half_life_days is None:
+            half_life_days=self.recency_half_life_days
+        upload_time=self.upload_time
+        if columns is not None:
+            upload_time=self.video_table.upload_time[np.asarray(columns, dtype=np.int64)]
+        now=(pd.Timestamp.now() if now is None else pd.Timestamp(now)).to_datetime64()
+        age_days=(now-upload_time)/np.timedelta64(1, "D")
+        decay=np.power(0.5, np.clip(age_days, 0, None)/half_life_days)
+        return np.nan_to_num(decay, nan=0.0)
+
     def load_data_from_pickle(self, filename):
         with open(filename, "rb") as f:
             data = pickle.load(f)
         return data
-    def make_hesh_dict(self):
-        tatget=self.Index_table.columns
-        heshdict={}
-        for i in range(len(tatget)):
-            heshdict[f'{_hash_transform(tatget[i])}']=tatget[i]
-        self.heshdict=heshdict
-        self.save_data_to_pickle(heshdict,"./app/agents/youtube_agent_module/copydata/heshdict.pkl")
-    def load_hesh_dict(self):
-        return self.load_data_from_pickle("./app/agents/youtube_agent_module/copydata/heshdict.pkl")
-    def remove_pickle(self,lang_path="./app/agents/youtube_agent_module/copydata/tot_doc_len.pkl",summary_path="./app/agents/youtube_agent_module/copydata/summary.pkl",index_table="./app/agents/youtube_agent_module/copydata/Index_table.pkl",keyword_set="./app/agents/youtube_agent_module/copydata/keyword_set.pkl"):
+    def remove_pickle(self,lang_path="./app/agents/youtube_agent_module/copydata/tot_doc_len.pkl",summary_path="./app/agents/youtube_agent_module/copydata/summary.pkl",index_table="./app/agents/youtube_agent_module/copydata/Index_table.pkl",keyword_set="./app/agents/youtube_agent_module/copydata/keyword_set.pkl",bm25_index=BM25_INDEX_PATH,cue_store=CUE_STORE_PATH,indexing_journal=INDEXING_JOURNAL_PATH,reset_journal=False):
+        # video_table.pkl은 지우지 않음: video_id가 바뀌면 벡터스토어 청크가 다른 영상을 가리키게 됨
+        # 인덱싱 저널은 reset_journal일 때만 지움: 중단된 태깅/요약을 이어서 처리해야 하고,
+        # 모든 작업이 끝나면 IndexingJob.run이 직접 지움
         file1 = Path(lang_path)
         file2 = Path(self.pickle_file)  # self.pickle_file이 파일 경로 문자열이라고 가정
         file3 = Path(summary_path)
         file4 = Path(index_table)
         file5 = Path(keyword_set)
+        file7 = Path(bm25_index)
+        file8 = Path(cue_store)
+        file9 = Path(indexing_journal)
         # file1 삭제
         if file1.exists():
             file1.unlink()
@@ -322,6 +537,24 @@ class Dataprocessor:
             log_wrapper(f"{file5} 삭제 완료")
         else:
             log_wrapper(f"{file5} 키워드 파일이 존재하지 않습니다.")
+        if file7.exists():
+            file7.unlink()
+            log_wrapper(f"{file7} 삭제 완료")
+        else:
+            log_wrapper(f"{file7} BM25 색인 파일이 존재하지 않습니다.")
+        if file8.exists():
+            file8.unlink()
+            log_wrapper(f"{file8} 삭제 완료")
+        else:
+            log_wrapper(f"{file8} 자막 큐 파일이 존재하지 않습니다.")
+        if not reset_journal:
+            if file9.exists():
+                log_wrapper(f"{file9} 인덱싱 저널을 유지합니다 (완료된 작업은 다시 처리하지 않음).")
+        elif file9.exists():
+            file9.unlink()
+            log_wrapper(f"{file9} 삭제 완료")
+        else:
+            log_wrapper(f"{file9} 인덱싱 저널 파일이 존재하지 않습니다.")
     
     def save_data_to_pickle(self, data, filename):
         with open(filename, "wb") as f:
@@ -375,6 +608,8 @@ class Dataprocessor:
                         
                         content["자막"]="0"
                         content["유튜버"]=root.split('/')[-2]
+                        reference=pd.Timestamp(os.path.getmtime(file_path), unit="s")
+                        content["업로드시각"]=pd.to_datetime(content["업로드일"].apply(lambda x: parse_upload_date(x, reference)))
                         content["태그"]=["Initialize Value"]*len(content)
                         if self.mode=="excelerator":
                             content["자막요약"]=["Initialize Value"]*len(content)
@@ -389,95 +624,69 @@ class Dataprocessor:
                 else:
                     pass
 
-    def load_srt_in_folder(self):
+    def load_srt_in_folder(self, workers=8, journal_path=INDEXING_JOURNAL_PATH):
         """
-        youtube 폴더 내의 모든 파일을 재귀적으로 순회하면서,
-        텍스트 파일(.csv, .srt)만 로드하고, 로드한 파일의 경로와 내용을 리스트로 반환합니다.
+        youtube 폴더 내의 모든 .srt 파일을 읽어 자막을 저장하고, IndexingJob으로 태그/요약을 생성합니다.
+        완료된 결과는 journal_path에 기록되어 중단 후 재실행 시 이어서 처리합니다.
         """
         self.save_data_to_pickle(self.tot_doc_len,"./app/agents/youtube_agent_module/copydata/tot_doc_len.pkl")
-        loaded_files = []
-        full_tocken=0
-        totn=0
-        maxlen=self.tot_doc_len
-        totaltag=set()
+        tasks = []
         for root, dirs, files in os.walk(self.target_dir):
+            channel = root.split('/')[-1]
             for file in files:
+                # .srt 파일만 로드
+                if not file.endswith(".srt"):
+                    continue
                 file_path = os.path.join(root, file)
-                # .csv와 .srt 파일만 로드 (txt는 제외)
-                if file.endswith((".srt")):
-                    try:
-                        with open(file_path, "r", encoding="utf-8") as f:
-                            content = f.read()
-                        self.data[root.split('/')[-1]][1].loc[int(file_path.split('/')[-1].split('.')[-2]),"자막"]=content
-                        csvindex=int(self.data[root.split('/')[-1]][1].loc[int(file_path.split('/')[-1].split('.')[-2]),"인덱스"])
-                        fileindex=int(file_path.split('/')[-1].split('.')[-2])
-                        log_wrapper(f"저장 인덱스 : {csvindex}")
-                        log_wrapper(f"파일 번호 : {fileindex}")
-                        if fileindex!=csvindex:
-                            log_wrapper("인덱스 불일치")
-                            self.data[root.split('/')[-1]][1].loc[int(file_path.split('/')[-1].split('.')[-2]),"인덱스"]=f"인덱스 오류 csv : {csvindex}, 파일 : {fileindex}"
-                        buff2=re.sub(r'[-:\d>]', '', content)
-                        buff3=buff2.replace(" ,"," ").replace(", ","")
-                        subscript=buff3.replace("\n\n\n","\n").replace("\n \n","\n")
-                        checker=self.indexer.add_script(f'자막: [{subscript}], 영상 설명 : [{self.data[root.split("/")[-1]][1].loc[int(file_path.split("/")[-1].split(".")[-2]),"설명"].replace("/","").replace("/n","")}]')
+                try:
+                    with open(file_path, "r", encoding="utf-8") as f:
+                        content = f.read()
+                    fileindex = int(file.split('.')[-2])
+                    df = self.data[channel][1]
+                    df.loc[fileindex, "자막"] = content
+                    csvindex = int(df.loc[fileindex, "인덱스"])
+                    if fileindex != csvindex:
+                        log_wrapper(f"인덱스 불일치 csv : {csvindex}, 파일 : {fileindex}")
+                        df.loc[fileindex, "인덱스"] = f"인덱스 오류 csv : {csvindex}, 파일 : {fileindex}"
+                    buff2 = re.sub(r'[-:\d>]', '', content)
+                    buff3 = buff2.replace(" ,", " ").replace(", ", "")
+                    subscript = buff3.replace("\n\n\n", "\n").replace("\n \n", "\n")
+                    description = df.loc[fileindex, "설명"].replace("/", "").replace("/n", "")
+                    tasks.append(IndexingTask(channel, fileindex, f'자막: [{subscript}], 영상 설명 : [{description}]'))
+                except Exception as e:
+                    log_wrapper(f"자막 로드 실패 {file_path}: {e}")
 
-                        if checker:
-                            if self.mode=="excelerator":
-                                text,_=self.indexer.response_one_with_memory(totaltag)
-                                tag = re.findall(r'\[\[TAGS:(.*?)\]\]', text)
-                                tag = re.findall(r'\(\((.*?)\)\)', tag[0])
-                                descriptions = re.findall(r'\[\[DESCRIPTION:(.*?)\]\]', text)
-                                code = re.findall(r'\[\[CODE:(.*?)\]\]', text)
-                                if isinstance(tag, list):
-                                    for d in tag:
-                                        totaltag.add(d)
+        totaltag = set()
 
-                            else:
-                                text,_=self.indexer.response_one()
-                            
-                        else:
-                            while self.indexer.lock:
-                               waittime,_=self.indexer.chektimer()
-                               full_tocken+=self.indexer.token
-                               self.save_data_to_pickle(self.data, self.pickle_file)
-                               log_wrapper(f'백업 성공 :{totn}')
-                               log_wrapper(f'현재토큰:{self.indexer.token}//누적토큰:{full_tocken}// 처리량: {totn}//총량:{maxlen}')
-                               log_wrapper(f"Full TPM 대기시간 {waittime}초")
-                               time.sleep(waittime)
-                               self.indexer.check_TPM()
-                            log_wrapper("Full TPM 대기시간 종료, 작업 재개")
-                            checker=self.indexer.add_script(content)
-                            if self.mode=="excelerator":
-                                text,_=self.indexer.response_one_with_memory(totaltag)
-                                tag = re.findall(r'\[\[TAGS:(.*?)\]\]', text)
-                                tag = re.findall(r'\(\((.*?)\)\)', tag[0])
-                                descriptions = re.findall(r'\[\[DESCRIPTION:(.*?)\]\]', text)
-                                code = re.findall(r'\[\[CODE:(.*?)\]\]', text)
-                                if isinstance(tag, list):
-                                    for d in tag:
-                                        totaltag.add(d)
-                            else:
-                                text,_=self.indexer.response_one()
-                                log_wrapper(f'자막 인덱싱 성공 시점 :{totn}, 현재 토큰 수{self.indexer.token}')
-                                log_wrapper(f"태그 {text}")
-                                
-                                if not text:
+        def context_fn():
+            # excelerator 모드는 지금까지 생성된 태그를 컨텍스트로 제공해 태그 명칭을 일관되게 유지
+            return f"[작성태그]:{list(totaltag)}" if self.mode == "excelerator" else ""
 
-                                    raise Exception("자막 인덱싱 실패")
-                        totn+=1
-                        if self.mode!="excelerator":   
-                            tag=re.findall(r'\[\[(.*?)\]\]', text)
-                        try:
-                            self.data[root.split('/')[-1]][1].at[int(file_path.split('/')[-1].split('.')[-2]),"태그"]=[tag]
-                            self.data[root.split('/')[-1]][1].at[int(file_path.split('/')[-1].split('.')[-2]),"자막요약"]=[descriptions]
-                            self.data[root.split('/')[-1]][1].at[int(file_path.split('/')[-1].split('.')[-2]),"코드"]=[code]
-                            log_wrapper(f"태그 {self.data[root.split('/')[-1]][1].at[int(file_path.split('/')[-1].split('.')[-2]), '태그']},코드:{code},누적토큰:{full_tocken}// 처리량: {totn}//총량:{maxlen}")
-                        except Exception as e:
-                            self.data[root.split('/')[-1]][1].loc[int(file_path.split('/')[-1].split('.')[-2]),"태그"]=["Failed set the Tag You Idiot"]
-                    except Exception as e:
-                        pass
+        def on_result(task, text):
+            df = self.data[task.channel][1]
+            try:
+                if self.mode == "excelerator":
+                    tag = re.findall(r'\[\[TAGS:(.*?)\]\]', text)
+                    tag = re.findall(r'\(\((.*?)\)\)', tag[0])
+                    descriptions = re.findall(r'\[\[DESCRIPTION:(.*?)\]\]', text)
+                    code = re.findall(r'\[\[CODE:(.*?)\]\]', text)
+                    totaltag.update(tag)
+                    df.at[task.row, "태그"] = [tag]
+                    df.at[task.row, "자막요약"] = [descriptions]
+                    df.at[task.row, "코드"] = [code]
                 else:
-                    pass
+                    tag = re.findall(r'\[\[(.*?)\]\]', text)
+                    df.at[task.row, "태그"] = [tag]
+            except Exception as e:
+                log_wrapper(f"태그 저장 실패 {task.key}: {e}")
+                df.loc[task.row, "태그"] = ["Failed set the Tag"]
+
+        if self.indexer is None:
+            self.indexer = Indexer(mode=self.mode)
+        job = IndexingJob(self.indexer, journal_path, workers=workers)
+        results = job.run(tasks, context_fn=context_fn, on_result=on_result)
+        log_wrapper(f"자막 인덱싱 완료 {len(results)}/{len(tasks)}")
+        self.save_data_to_pickle(self.data, self.pickle_file)
     def create_summary_dicts(self):
         """
         self.data에 저장된 각 영상의 원본 DataFrame을 순회하여,
@@ -527,9 +736,12 @@ class Dataprocessor:
                     spchunk=spchunk[0]
                     check=not isinstance(spchunk, str)  
                 spchunk=[spchunk]
+                video_id=self.video_table.id_of(channel, idx)
+                if video_id is None:
+                    continue
                 for embedding_text in spchunk:
                     summary = {
-                    "metadata": [f"self.data[{channel}][1][태그][{idx}]"],
+                    "metadata": [video_id],
                     "page": [part],
                     "vectors": embedding_text,  # 추후 필요 시 표시용 요약문으로 사용
                     }
@@ -559,12 +771,16 @@ class Dataprocessor:
                 # 루프에 걸린 시간 측정 및 남은 시간이 있으면 sleep
         self.save_data_to_pickle(summary_list, "./app/agents/youtube_agent_module/copydata/summary.pkl")
         self.summary_list = summary_list
-    def set_active(self,metadata_list):
-        buff = pd.DataFrame(self.summary_list).copy()
-        filtered_rows = buff[buff['metadata'].apply(lambda x: x[0]).isin(metadata_list) ]
+    def active_indices(self,metadata_list):
+        """metadata_list(video_id)에 속한 청크의 벡터스토어 행 인덱스 (공유 상태 변경 없음)"""
+        buff = pd.DataFrame(self.summary_list)
+        filtered_rows = buff[buff['metadata'].str[0].isin(metadata_list) ]
         page=filtered_rows['page'].tolist()
         meta=filtered_rows['metadata'].tolist()
-        self.vectorstore.extract_custom_from_p_I(meta,page)
+        return self.vectorstore.match_indices(meta,page)
+
+    def set_active(self,metadata_list):
+        self.vectorstore.active = self.active_indices(metadata_list).tolist()
         
     def get_combined_context(self, query,custom_context):
         retrieved_docs = self.retriever.invoke(query)
@@ -581,6 +797,7 @@ class Dataprocessor:
         dimension = 1536
         vectorstore = HDF5VectorDB("./app/agents/youtube_agent_module/data/vector_db.h5", dimension)
         summary=self.summary_list.copy()
+        token_counts=tokenizer.count_tokens_batch([poped['vectors'] for poped in summary])
         lenthD=len(summary)
         lenthO=lenthD
         docs=WrIndexFlatL2(dimension)
@@ -592,7 +809,7 @@ class Dataprocessor:
                     if len(summary)==0:
                         break
                     poped=summary.pop(0)
-                    nowtoken+=cal_token(poped['vectors'])
+                    nowtoken+=token_counts.pop(0)
                     
                     docs.add_with_embedding(poped)
                     lenthD-=1
@@ -614,7 +831,7 @@ class Dataprocessor:
                     if len(summary)==0:
                         break
                     poped=summary.pop(0)
-                    nowtoken+=cal_token(poped['vectors'])
+                    nowtoken+=token_counts.pop(0)
                     
                     docs.add_with_embedding(poped)
                     lenthD-=1
@@ -658,98 +875,54 @@ class Dataprocessor:
         )
         log_wrapper("QA 체인 생성 완료")
         self.qa=qa
-    def get_video_data(self,query,mode="database"):
-
-
+    def get_video_data(self,query,mode="database",use_qa=None,rerank=None,top_n=10,active=None):
+        """
+        active(active_indices 결과, 생략 시 set_active로 정한 공유 범위) 범위에서 query와 관련된 청크 상위 top_n개를 찾습니다.
+        기본은 LLM 호출 없이 벡터 검색 후 (선택적으로) MMR 재정렬만 수행하고,
+        use_qa=True(또는 YOUTUBE_RETRIEVAL_MODE=qa)일 때만 RetrievalQA 체인을 호출합니다.
 
+        Returns:
+            tuple: (video_id 목록, Document 목록)
+        """
+        if use_qa is None:
+            use_qa=settings.YOUTUBE_RETRIEVAL_MODE=="qa"
+        if use_qa:
+            out=self.get_video_data_qa(query)[0:top_n]
+        else:
+            out=self.retrieve_documents(query,rerank=rerank,top_n=top_n,active=active)
+        meta=[]
+        for k in out:
+            meta.append(k.metadata['index'])
+        return meta, out
 
-        #self.get_keywords(query)
-        custom_context="""
-        
-        주요 제조사 라인업<IOS
-        [애플 {
-            스마트폰:
-                아이폰 프로 시리즈: 최상위 플래그십(iPhone 15 Pro, 15 Pro Max)
-                아이폰 기본 시리즈: 준프리미엄(iPhone 15, 15 Plus)
-                아이폰 SE: 실용적인 보급형 모델(iPhone SE 3세대)
-            태블릿:
-                아이패드 프로: 최고사양 프로용 태블릿(12.9인치, 11인치)
-                아이패드 에어: 준프리미엄 태블릿
-                아이패드: 기본형 태블릿
-                아이패드 미니: 소형 태블릿
-            노트북:
-                맥북 프로: 전문가용 고성능(14인치, 16인치, M3/M3 Pro/M3 Max)
-                맥북 에어: 일반용 슬림(13인치, 15인치, M2/M3)
-                맥 미니: 데스크톱 미니PC
-                맥 스튜디오: 전문가용 고성능 데스크톱
-                맥 프로: 최상위 워크스테이션
-            모니터:
-                프로 디스플레이 XDR: 최고급 전문가용 모니터
-                스튜디오 디스플레이: 준프리미엄 모니터
-            웨어러블:
-                애플워치: 스마트워치(Series 9, Ultra 2, SE 2세대)
-                에어팟: 무선이어폰(AirPods Pro 2, AirPods 3, AirPods 2)
-                에어팟 맥스: 오버이어 헤드폰
-                비전 프로: 혼합현실 헤드셋 (2024년 출시)
-            }]
-        안드로이드    
-        [삼성{ 
-            스마트폰:
-                갤럭시 S 시리즈: 최상위 플래그십 라인(S24, S24+, S24 Ultra)
-                갤럭시 Z 시리즈: 폴더블 스마트폰(Z Fold5, Z Flip5)
-                갤럭시 A 시리즈: 중저가 라인(A54, A34 등)
-                갤럭시 M 시리즈: 실용적인 가성비 라인(M34, M14 등)
-            태블릿:
-                갤럭시 탭 S 시리즈: 프리미엄 태블릿(Tab S9, S9+, S9 Ultra)
-                갤럭시 탭 A 시리즈: 중저가 태블릿(Tab A9, A8 등)
-                갤럭시 탭 Active: 견고성 강화 비즈니스용 태블릿
-            노트북:
-                갤럭시 북4 시리즈: 프리미엄 노트북(Book4 Pro, Book4 Pro 360)
-                갤럭시 북3 시리즈: 일반 사무용/학생용 노트북
-                갤럭시 Book2 Business: 비즈니스용 노트북
-            모니터:
-                오디세이 시리즈: 게이밍 모니터(G9, G7, G5 등)
-                뷰피니티 시리즈: 전문가용 고해상도 모니터
-                스마트 모니터: 일체형 스마트 디스플레이
-            웨어러블:
-                갤럭시 워치: 스마트워치(Watch6, Watch6 Classic)
-                갤럭시 버즈: 무선이어폰(Buds3, Buds3 Pro)
-                갤럭시 링: 스마트 반지(신제품)
-            }
-        샤오미{
-            스마트폰:
-                샤오미 시리즈: 플래그십 라인(Xiaomi 14, 14 Pro, 14 Ultra)
-                레드미 노트 시리즈: 중급형(Redmi Note 13 Pro+, Note 13 Pro, Note 13)
-                레드미 시리즈: 보급형(Redmi 13C, 12C 등)
-                POCO 시리즈: 성능특화 중저가(POCO F5, X5, M5 등)
-            태블릿:
-                샤오미 패드: 프리미엄 태블릿(Pad 6, Pad 6 Pro)
-                레드미 패드: 보급형 태블릿(Redmi Pad SE)
-            노트북:
-                샤오미북: 프리미엄 노트북(RedmiBook Pro, Mi Notebook Pro)
-                레드미북: 일반 사무용/학생용 노트북(RedmiBook 15)
-            모니터:
-                Mi 모니터: 일반용 모니터
-                Mi 게이밍 모니터: 게이밍용 모니터
-                Mi 커브드 모니터: 커브드 디스플레이
-            웨어러블:
-                샤오미 워치: 스마트워치(Watch S3, Smart Band 8)
-                레드미 워치: 보급형 스마트워치(Redmi Watch 3)
-                샤오미 버즈: 무선이어폰(Buds 4 Pro, Buds 4)
-                레드미 버즈: 보급형 무선이어폰(Redmi Buds 4)
-            }]>    
+    def retrieve_documents(self,query,rerank=None,top_n=10,active=None):
+        """
+        retriever와 같은 벡터 검색을 직접 호출하고, rerank='mmr'이면 중복을 줄이도록 재정렬합니다.
+        active(요청별 검색 대상 행 인덱스)를 넘기면 벡터스토어의 공유 active를 읽지 않습니다.
         """
+        rerank=settings.YOUTUBE_RETRIEVAL_RERANK if rerank is None else rerank
+        active=self.vectorstore.active if active is None else active
+        if len(active)==0:
+            raise ValueError("검색할 데이터가 없습니다. 조건을 구체화 하거나 데이터를 추가하세요.")
+        query_vector=WrIndexFlatL2(self.vectorstore.dimension).get_openai_embedding(query)
+        docs,_,_=self.vectorstore.search(query_vector, self.k_value, active=active)
+        docs=docs or []
+        if rerank=="mmr" and docs:
+            order=maximal_marginal_relevance(query_vector,[doc.metadata["vectors"] for doc in docs],k=top_n,lambda_mult=settings.YOUTUBE_MMR_LAMBDA)
+            return [docs[i] for i in order]
+        return docs[0:top_n]
 
-        if token_bool(custom_context, model="gpt-4o-mini",target=120000):
+    def get_video_data_qa(self,query):
+        """제조사 라인업 컨텍스트와 함께 RetrievalQA 체인을 호출합니다 (생성된 답변은 쓰지 않고 source_documents만 반환)."""
+        if self.qa is None:
+            self.create_qa_chain_from_store()
+        custom_context=MANUFACTURER_LINEUP_CONTEXT
+        if tokenizer.static_token_count(custom_context, "gpt-4o-mini")>120000:
             custom_context=setting_tockens(custom_context,target=115000,model="gpt-4o-mini",chunk_size=500)
             custom_context="".join(custom_context)
         
         answer = self.qa.invoke({ "question": f" 유저 요청 : {query} \n 추가 정보 : {custom_context}","query": query  },callbacks=[StdOutCallbackHandler()])
-        out=answer["source_documents"][0:10]
-        meta=[]
-        for k in out:
-            meta.append(k.metadata['index'])
-        return meta, out
+        return answer["source_documents"]
         #if mode=="video":
         #    answer = self.qa_video.invoke({ "question": f" 유저 요청 : {query} \n 추가 정보 : {combined_context}","query": query  })
         #    # 테스트용 로깅
@@ -780,67 +953,54 @@ class Dataprocessor:
 
     def get_original_row(self, metadata):
         """
-        벡터스토어에서 반환된 메타데이터(문자열 또는 dict)를 기반으로 원본 DataFrame에서 해당 행을 찾습니다.
+        벡터스토어에서 반환된 메타데이터(video_id 또는 {"index": video_id})를 기반으로 원본 DataFrame에서 해당 행을 찾습니다.
         
-        :param metadata: {"인덱스": idx, "유튜버": channel} 형태의 메타데이터 (문자열일 경우 JSON으로 변환)
         :return: 해당 행 (pandas Series) 또는 None (찾을 수 없을 경우)
         """
-        # metadata가 문자열이면 dict로 변환합니다.
-        if isinstance(metadata, str):
-            try:
-                metadata = json.loads(metadata)
-            except json.JSONDecodeError as e:
-                log_wrapper(f"메타데이터 변환 실패: {e}")
-                return None, None
-        buff=str(metadata['index']).replace("]","[").split('[')
-        clean_list = [item for item in buff if item != ""]
-        channel = clean_list[1]
-        idx = clean_list[-1]
-        page = clean_list[2]
-        if channel in self.data:
-            df = self.data[channel][1]
-            try:
-                row = df.loc[int(idx)-1].copy()
-                row.loc["인덱스"]=int(idx)-1
-                return row
-            except KeyError:
-                log_wrapper(f"인덱스 {idx}가 채널 {channel}의 DataFrame에 없습니다.")
-                return None, None
-        else:
-            log_wrapper(f"채널 {channel}이 존재하지 않습니다.")
-            return None, None
+        if isinstance(metadata, dict):
+            metadata = metadata['index']
+        try:
+            channel, idx = self.video_table.locate(metadata)
+        except (IndexError, TypeError, ValueError):
+            log_wrapper(f"영상 식별자 {metadata}가 존재하지 않습니다.")
+            return None
+        try:
+            row = self.data[channel][1].loc[idx].copy()
+            row.loc["인덱스"]=idx
+            return row
+        except KeyError:
+            log_wrapper(f"인덱스 {idx}가 채널 {channel}의 DataFrame에 없습니다.")
+            return None
     def setup_tag_table(self):
         self.keyword_set=set()
-        self.Index_table=pd.DataFrame()
-        for d in self.data:
-            for rows in self.data[d][1]['태그']:
-                if rows:
-                    if isinstance(rows, list):
-                        rows = [rowso for rowso in rows if not (isinstance(rowso, float) and np.isnan(rowso))]
-                        if len(rows)==1 and isinstance(rows[0], list):
-                            rows=rows[0]
-                        self.keyword_set.update(rows)
-        collen=0
-        for d in self.data:
-            collen+=int(len(self.data[d][1]))
-        cloumnsV=[]
-        for d in self.data:
-            self.data[d][1]['match']="0"
-            for inx in self.data[d][1]['인덱스']:
-                self.data[d][1]['match'].loc[inx]=f"self.data[{d}][1][태그][{int(inx) if not np.isnan(inx) else inx}]"
-            cloumnsV.append(self.data[d][1]['match'])
-        
-        cloumnsV=pd.concat(cloumnsV)
-        basematrix = pd.DataFrame(index=list(self.keyword_set).copy(), columns=cloumnsV)
-        basematrix.fillna(0, inplace=True)
-        for d in basematrix.columns[:-1]:
-            if d != "0" and d:
-                youtuber=d.replace('[',']').replace(']]',']').split(']')[1]
-                index=d.replace('[',']').replace(']]',']').split(']')[-2]
-                tag=self.data[youtuber][1]['태그'].loc[int(index)]
-                for rows in tag:
-                    basematrix[d].loc[rows]=1
-        self.Index_table=basematrix
+        video_tags=[]
+        for video_id in range(len(self.video_table)):
+            channel, idx = self.video_table.locate(video_id)
+            try:
+                rows=self.data[channel][1]['태그'].loc[idx]
+            except KeyError:
+                rows=None  # 재수집으로 사라진 영상: video_id는 유지하고 태그는 비움
+            if isinstance(rows, Series):
+                rows=rows.values[0]
+            if isinstance(rows, list):
+                rows = [rowso for rowso in rows if not (isinstance(rowso, float) and np.isnan(rowso))]
+                if len(rows)==1 and isinstance(rows[0], list):
+                    rows=rows[0]
+            else:
+                rows=[]
+            rows=[tag for tag in rows if isinstance(tag, str)]
+            self.keyword_set.update(rows)
+            video_tags.append(rows)
+        keywords=list(self.keyword_set)
+        keyword_row={keyword: i for i, keyword in enumerate(keywords)}
+        matrix=np.zeros((len(keywords), len(video_tags)), dtype=np.int64)
+        for video_id, tags in enumerate(video_tags):
+            for tag in tags:
+                matrix[keyword_row[tag], video_id]=1
+        self.Index_table=pd.DataFrame(matrix, index=keywords, columns=pd.RangeIndex(len(video_tags)))
+        self.keyword_index=build_keyword_index(keywords)
+        self.set_upload_index()
+        self.facets=FacetIndex(self.Index_table)
         self.save_data_to_pickle(self.Index_table,"./app/agents/youtube_agent_module/copydata/Index_table.pkl")
         self.save_data_to_pickle(list(self.keyword_set),"./app/agents/youtube_agent_module/copydata/keyword_set.pkl")
         
@@ -848,7 +1008,7 @@ class Dataprocessor:
     def tset_keyword_search(self,keyword,kV=20):
         outs=set()
         for d in keyword:
-            similar_words = difflib.get_close_matches(d, self.keyword_set, n=3, cutoff=0.85)
+            similar_words = self.keyword_index.get_close_matches(d, n=3)
             if similar_words:
                 for i in similar_words:
                     outs.add(i)
@@ -985,6 +1145,13 @@ class Indexer:
         else:
             log_wrapper("스크립트가 없습니다.")
             return False, False
+    def respond(self, script, context=""):
+        """
+        공유 상태(script 큐, node.context) 없이 한 건을 처리합니다. IndexingJob 워커에서 동시에 호출됩니다.
+        TPM 제어는 호출 측의 토큰 버킷이 담당합니다.
+        """
+        out, token, _, _ = self.node.controller.get_answer(self.node.llm, self.node.prompt, script, context)
+        return out, token
     def response_one(self):
         if self.lock:
             log_wrapper("TPM 초과로 대기중입니다.//response_one")
@@ -1046,16 +1213,12 @@ class DataExcelerator:
     def __init__(self):
         self.DataProcessor=Dataprocessor(mode="excelerator")
         #self.DataProcessor.setup_tag_table()
-        #self.DataProcessor.make_hesh_dict()
-        #self.DataProcessor.set_day_limit()
         self.DataProcessor.create_vector_store_active(persist_directory="./app/agents/youtube_agent_module/data/vector_db.h5")
         log_wrapper("활성 상태")
 class Datatagger:
     def __init__(self):
         self.DataProcessor=Dataprocessor(mode="tag")
         self.DataProcessor.setup_tag_table()
-        self.DataProcessor.make_hesh_dict()
-        self.DataProcessor.set_day_limit()
         self.DataProcessor.create_vector_store_active(persist_directory="./app/agents/youtube_agent_module/data/vector_db.h5")
         log_wrapper("`활성 상태")
         
@@ -1075,7 +1238,6 @@ def get_searchdata(keyword_list,query):
     for index, row in tag.iterrows():
         searchV.append(index)
     R.DataProcessor.set_active(searchV)
-    R.DataProcessor.create_qa_chain_from_store(persist_directory="./app/agents/youtube_agent_module/data/vector_db.h5")
     result=R.DataProcessor.get_video_data(query,mode="database")
     return(result)
     
@@ -0,0 +1,55 @@
+import numpy as np
+
+# 제조사 패싯: 태그에 match 문자열이 포함된 영상 집합을 마스크로 미리 계산하고,
+# 선택 키워드에 triggers가 있으면 태그 점수 계산 범위를 해당 마스크로 좁힙니다.
+# 둘 이상 해당하면 뒤에 정의된 패싯이 우선합니다.
+FACETS = {
+    "galaxy": {"match": ("갤럭시", "삼성"), "triggers": ("Galaxy", "갤럭시")},
+    "apple": {"match": ("애플", "아이"), "triggers": ("Apple", "애플", "아이패드")},
+}
+
+
+class FacetIndex:
+    """
+    Index_table(태그 x video_id)을 bool 행렬로 바꾸고 패싯별 영상 마스크를 로드 시점에 만들어 둡니다.
+    질의 시에는 DataFrame 복사 없이 마스크의 AND/OR와 행 합으로 태그 점수를 계산합니다.
+    마스크와 점수 배열은 Index_table 컬럼 순서를 따릅니다.
+    """
+    def __init__(self, index_table, facets=None):
+        self.facets = FACETS if facets is None else facets
+        self.columns = np.asarray(index_table.columns)
+        self.row = {tag: i for i, tag in enumerate(index_table.index)}
+        self.matrix = index_table.to_numpy() == 1
+        self.masks = {"tagged": self.matrix.any(axis=0)}
+        for name, facet in self.facets.items():
+            tags = [tag for tag in self.row if any(m in tag for m in facet["match"])]
+            self.masks[name] = self.any(tags)
+
+    def any(self, tags):
+        """tags 중 하나라도 붙은 영상 마스크"""
+        rows = [self.row[tag] for tag in tags if tag in self.row]
+        if not rows:
+            return np.zeros(len(self.columns), dtype=bool)
+        return self.matrix[rows].any(axis=0)
+
+    def count(self, tags, weights=None):
+        """영상별로 tags가 붙은 횟수(weights로 태그별 가중치 지정)"""
+        weights = weights or {}
+        rows = [self.row[tag] for tag in tags if tag in self.row]
+        if not rows:
+            return np.zeros(len(self.columns), dtype=np.int64)
+        w = np.array([weights.get(tag, 1) for tag in tags if tag in self.row], dtype=np.int64)
+        return w @ self.matrix[rows].astype(np.int64)
+
+    def triggered(self, selected):
+        """선택 키워드가 가리키는 패싯 이름, 없으면 None"""
+        name = None
+        for facet_name, facet in self.facets.items():
+            if any(trigger in selected for trigger in facet["triggers"]):
+                name = facet_name
+        return name
+
+    def scope(self, selected):
+        """태그 점수를 계산할 영상 마스크 (제조사 패싯이 없으면 태그가 하나라도 있는 영상)"""
+        name = self.triggered(selected)
+        return self.masks[name if name else "tagged"]
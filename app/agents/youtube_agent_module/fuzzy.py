@@ -0,0 +1,85 @@
+import heapq
+import unicodedata
+from collections import Counter
+from difflib import SequenceMatcher, get_close_matches
+import numpy as np
+
+
+def jamo_normalize(text):
+    """
+    한글 음절을 자모로 분해하고(NFD) 공백 제거, 소문자화합니다.
+    '아이 패드'/'아이패드', '갤럭시탭'/'갤럭시 탭'처럼 띄어쓰기·받침 차이에 덜 민감한 비교용 문자열입니다.
+    """
+    return unicodedata.normalize("NFD", text).replace(" ", "").lower()
+
+
+class FuzzyIndex:
+    """
+    태그 어휘에 대한 문자 유니그램 역색인
+    difflib.get_close_matches와 같은 결과를 반환하되, 문자 멀티셋 교집합으로 계산한 quick_ratio 상한으로
+    후보를 먼저 걸러 SequenceMatcher 비교 횟수를 줄입니다.
+    normalize(예: jamo_normalize)를 주면 정규화한 문자열끼리 비교하므로 cutoff도 그 문자열 기준으로 정해야 합니다.
+    """
+    def __init__(self, vocabulary, normalize=None, cutoff=0.6):
+        self.normalize = normalize
+        self.cutoff = cutoff
+        self.words = list(vocabulary)
+        self.keys = [normalize(w) if normalize else w for w in self.words]
+        self.lengths = np.fromiter((len(k) for k in self.keys), dtype=np.float64, count=len(self.keys))
+        postings = {}
+        for word_id, key in enumerate(self.keys):
+            for char, count in Counter(key).items():
+                postings.setdefault(char, ([], []))
+                postings[char][0].append(word_id)
+                postings[char][1].append(count)
+        self.postings = {
+            char: (np.asarray(ids, dtype=np.int64), np.asarray(counts, dtype=np.int64))
+            for char, (ids, counts) in postings.items()
+        }
+
+    def __len__(self):
+        return len(self.words)
+
+    def candidates(self, key, cutoff):
+        """real_quick_ratio, quick_ratio 상한이 cutoff 이상인 단어 id"""
+        lb = len(key)
+        total = self.lengths + lb
+        ids, weights = [], []
+        for char, count in Counter(key).items():
+            posting = self.postings.get(char)
+            if posting is None:
+                continue
+            ids.append(posting[0])
+            weights.append(np.minimum(posting[1], count))
+        if not ids:
+            return np.empty(0, dtype=np.int64)
+        matches = np.bincount(np.concatenate(ids), weights=np.concatenate(weights), minlength=len(self.words))
+        # difflib._calculate_ratio와 같은 식으로 계산해 경계값 판정을 일치시킴
+        real_quick = 2.0 * np.minimum(self.lengths, lb) / total
+        quick = 2.0 * matches / total
+        return np.nonzero((real_quick >= cutoff) & (quick >= cutoff))[0]
+
+    def get_close_matches(self, word, n=3, cutoff=None):
+        """
+        difflib.get_close_matches(word, vocabulary, n, cutoff)와 같은 의미의 검색
+        cutoff를 생략하면 인덱스를 만들 때 정한 값을 씁니다.
+        """
+        if cutoff is None:
+            cutoff = self.cutoff
+        if not n > 0:
+            raise ValueError("n must be > 0: %r" % (n,))
+        if not 0.0 <= cutoff <= 1.0:
+            raise ValueError("cutoff must be in [0.0, 1.0]: %r" % (cutoff,))
+        key = self.normalize(word) if self.normalize else word
+        if not key or cutoff <= 0.0:
+            # 공통 문자가 없어도 통과하는 경계 조건은 전체 비교로 처리
+            matches = get_close_matches(key, self.keys, n=n, cutoff=cutoff)
+            return [self.words[self.keys.index(m)] for m in matches]
+        s = SequenceMatcher()
+        s.set_seq2(key)
+        result = []
+        for word_id in self.candidates(key, cutoff):
+            s.set_seq1(self.keys[word_id])
+            if s.ratio() >= cutoff:
+                result.append((s.ratio(), self.words[word_id]))
+        return [x for score, x in heapq.nlargest(n, result)]
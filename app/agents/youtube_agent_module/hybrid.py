@@ -0,0 +1,53 @@
+from collections import defaultdict
+import numpy as np
+
+
+def reciprocal_rank_fusion(rankings, weights=None, k=60):
+    """
+    여러 순위 목록을 가중 RRF(Reciprocal Rank Fusion)로 합칩니다.
+    score(d) = Σ weight_r / (k + rank_r(d)),  rank는 1부터 시작
+
+    Args:
+        rankings (dict): {이름: [video_id, ...]} (앞쪽일수록 상위)
+        weights (dict, optional): {이름: 가중치}, 없으면 1.0
+        k (int): 상위 순위 간 점수 차이를 완화하는 상수
+
+    Returns:
+        list: 점수 내림차순 [(video_id, score), ...]
+    """
+    weights = weights or {}
+    scores = defaultdict(float)
+    for name, ranking in rankings.items():
+        weight = weights.get(name, 1.0)
+        if not weight:
+            continue
+        for rank, video_id in enumerate(ranking, start=1):
+            scores[video_id] += weight / (k + rank)
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+def maximal_marginal_relevance(query_vector, vectors, k=10, lambda_mult=0.5):
+    """
+    MMR로 질의와 가까우면서 서로 겹치지 않는 벡터를 고릅니다 (LLM 호출 없음).
+    score(i) = λ·cos(q, v_i) - (1-λ)·max_{j∈선택} cos(v_i, v_j)
+
+    Returns:
+        list: 선택된 vectors의 위치 (선택 순서)
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if len(vectors) == 0:
+        return []
+    vectors = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+    query = np.asarray(query_vector, dtype=np.float32).reshape(-1)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+    relevance = vectors @ query
+    redundancy = np.full(len(vectors), -np.inf, dtype=np.float32)
+    selected = []
+    for _ in range(min(k, len(vectors))):
+        penalty = np.where(np.isinf(redundancy), 0.0, redundancy)
+        score = lambda_mult * relevance - (1 - lambda_mult) * penalty
+        score[selected] = -np.inf
+        best = int(np.argmax(score))
+        selected.append(best)
+        redundancy = np.maximum(redundancy, vectors @ vectors[best])
+    return selected
@@ -0,0 +1,248 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from .queue_manager import add_log
+from . import tokenizer
+
+
+def log_wrapper(log_message):
+    add_log(log_message)
+
+
+# 모델별 분당 토큰 한도 (Indexer.set_TPM과 동일)
+MODEL_TPM = {
+    "gpt-4o-mini": 200000,
+    "chatgpt-4o-latest": 30000,
+}
+
+
+class TokenBucket:
+    """
+    분당 토큰 한도를 지키는 비동기 토큰 버킷
+    요청 전 예상 토큰을 차감하고, 응답 후 실제 사용량과의 차이를 정산합니다.
+    """
+    def __init__(self, tokens_per_minute, capacity=None):
+        self.rate = tokens_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else tokens_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount):
+        amount = min(amount, self.capacity)
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def settle(self, reserved, used):
+        """예상 차감량(reserved)과 실제 사용량(used)의 차이를 반영합니다 (음수 잔량 허용)."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + reserved - used)
+
+
+def get_bucket(model):
+    """
+    모델별 토큰 버킷을 만듭니다.
+    asyncio.Lock은 처음 사용한 이벤트 루프에 묶이므로 버킷은 작업(asyncio.run)마다 새로 만들고 워커끼리만 공유합니다.
+    """
+    return TokenBucket(MODEL_TPM.get(model, 30000))
+
+
+@dataclass
+class IndexingTask:
+    channel: str
+    row: int
+    script: str
+
+    @property
+    def key(self):
+        return f"{self.channel}/{self.row}"
+
+    def fingerprint(self, indexer):
+        """모드(프롬프트)/모델/입력이 같을 때만 저널 결과를 재사용하기 위한 해시"""
+        source = f"{indexer.model}\0{indexer.prompt}\0{self.script}"
+        return hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+
+
+class ProgressJournal:
+    """
+    완료된 작업 결과를 JSON Lines로 기록하는 진행 저널
+    중단 후 다시 실행하면 기록된 작업은 LLM 호출 없이 결과를 재사용합니다.
+    결과마다 fingerprint(모드 프롬프트/모델/자막 해시)를 함께 기록하므로, 모드를 바꾸거나 자막이 바뀐 작업은 다시 처리합니다.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.done = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # 기록 도중 중단된 마지막 줄
+                    self.done[record["key"]] = record
+        self.file = None
+
+    def __contains__(self, key):
+        return key in self.done
+
+    def lookup(self, key, fingerprint):
+        """같은 fingerprint로 완료된 결과 텍스트 (없으면 None)"""
+        record = self.done.get(key)
+        if record is None or record.get("fingerprint") != fingerprint:
+            return None
+        return record["text"]
+
+    def record(self, key, text, tokens, fingerprint=None):
+        if self.file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.file = open(self.path, "a", encoding="utf-8")
+        record = {"key": key, "text": text, "tokens": tokens, "fingerprint": fingerprint}
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.done[key] = record
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def remove(self):
+        """모든 작업이 끝난 뒤 저널 파일을 지웁니다 (다음 재수집이 오래된 결과를 재사용하지 않도록)."""
+        self.close()
+        self.done = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+@dataclass
+class JobStats:
+    total: int
+    done: int = 0
+    failed: int = 0
+    tokens: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    def report(self):
+        minutes = max(time.monotonic() - self.started, 1e-6) / 60
+        log_wrapper(
+            f"인덱싱 진행 {self.done}/{self.total} (실패 {self.failed}) "
+            f"처리량 {self.done / minutes:.1f} videos/min, {self.tokens / minutes:.0f} tokens/min"
+        )
+
+
+class IndexingJob:
+    """
+    Indexer를 이용한 자막 태깅/요약 배치 작업
+    비동기 워커 풀이 모델별 토큰 버킷을 공유하며, 실패한 요청은 지수 백오프로 재시도합니다.
+    """
+    def __init__(self, indexer, journal_path, workers=8, max_retries=5, base_delay=2.0,
+                 expected_completion_tokens=600, report_interval=30):
+        self.indexer = indexer
+        self.journal = ProgressJournal(journal_path)
+        self.workers = workers
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.expected_completion_tokens = expected_completion_tokens
+        self.report_interval = report_interval
+        self.bucket = None
+
+    def run(self, tasks, context_fn=None, on_result=None):
+        """
+        동기 코드에서 배치 작업을 실행합니다.
+        모든 작업이 성공하면 저널을 지우고, 실패가 남으면 다음 실행에서 이어서 처리하도록 남겨 둡니다.
+
+        Args:
+            tasks (list[IndexingTask]): 처리할 작업
+            context_fn (callable, optional): 요청 직전에 호출되어 시스템 컨텍스트를 반환 (excelerator의 누적 태그 등)
+            on_result (callable, optional): on_result(task, text)로 결과를 즉시 반영
+
+        Returns:
+            dict: task.key -> 응답 텍스트 (실패한 작업은 제외)
+        """
+        try:
+            results = asyncio.run(self.arun(tasks, context_fn, on_result))
+        finally:
+            self.journal.close()
+        if len(results) == len(tasks):
+            self.journal.remove()
+        return results
+
+    async def arun(self, tasks, context_fn=None, on_result=None):
+        self.bucket = get_bucket(self.indexer.model)
+        results = {}
+        pending = []
+        for task in tasks:
+            text = self.journal.lookup(task.key, task.fingerprint(self.indexer))
+            if text is not None:
+                results[task.key] = text
+                if on_result:
+                    on_result(task, text)
+            else:
+                pending.append(task)
+        log_wrapper(f"인덱싱 작업 시작: 전체 {len(tasks)}, 재사용 {len(results)}, 대기 {len(pending)}")
+        stats = JobStats(total=len(pending))
+        queue = asyncio.Queue()
+        for task in pending:
+            queue.put_nowait(task)
+
+        async def worker():
+            while True:
+                try:
+                    task = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                text = await self._process(task, context_fn, stats)
+                if text is not None:
+                    results[task.key] = text
+                    if on_result:
+                        on_result(task, text)
+
+        async def reporter():
+            while True:
+                await asyncio.sleep(self.report_interval)
+                stats.report()
+
+        report_task = asyncio.create_task(reporter())
+        try:
+            await asyncio.gather(*(worker() for _ in range(max(1, min(self.workers, len(pending))))))
+        finally:
+            report_task.cancel()
+        stats.report()
+        return results
+
+    async def _process(self, task, context_fn, stats):
+        for attempt in range(self.max_retries + 1):
+            context = context_fn() if context_fn else ""
+            reserved = tokenizer.count_tokens(self.indexer.prompt + context + task.script) + self.expected_completion_tokens
+            await self.bucket.acquire(reserved)
+            try:
+                text, used = await asyncio.to_thread(self.indexer.respond, task.script, context)
+            except Exception as e:
+                self.bucket.settle(reserved, 0)
+                delay = self.base_delay * (2 ** attempt) + random.uniform(0, self.base_delay)
+                log_wrapper(f"인덱싱 실패 {task.key} ({attempt + 1}/{self.max_retries + 1}): {e}, {delay:.1f}초 후 재시도")
+                await asyncio.sleep(delay)
+                continue
+            self.bucket.settle(reserved, used)
+            self.journal.record(task.key, text, used, task.fingerprint(self.indexer))
+            stats.done += 1
+            stats.tokens += used
+            return text
+        stats.failed += 1
+        log_wrapper(f"인덱싱 포기 {task.key}")
+        return None
@@ -0,0 +1,176 @@
+import re
+import unicodedata
+from collections import deque
+
+_LATIN = re.compile(r'[0-9a-z]')
+_MODEL_CODE = re.compile(r'(?<![0-9a-z])[a-z]*\d+[0-9a-z]*(?![0-9a-z])')
+_WORD = re.compile(r'[0-9a-z가-힣]+')
+# 같은 제품 계열 안에서 모델을 가르는 단어 ('아이패드 에어'/'아이패드 프로')
+MODEL_QUALIFIERS = frozenset([
+    "프로", "에어", "울트라", "플러스", "맥스", "미니", "라이트", "엣지", "폴드", "플립",
+    "pro", "air", "ultra", "plus", "max", "mini", "lite", "fe", "edge", "fold", "flip",
+])
+
+
+def normalize_text(text):
+    """
+    소문자/NFC 정규화 후 공백을 제거한 문자열과, 각 글자가 어절 시작인지 여부 목록을 반환합니다.
+    '아이 패드'와 '아이패드', '갤럭시 탭'과 '갤럭시탭'이 같은 문자열이 됩니다.
+    """
+    text = unicodedata.normalize("NFC", text).lower()
+    chars, word_start = [], []
+    previous_space = True
+    for char in text:
+        if char.isspace():
+            previous_space = True
+            continue
+        chars.append(char)
+        word_start.append(previous_space)
+        previous_space = False
+    return "".join(chars), word_start
+
+
+def extract_model_codes(text):
+    """질의에 나온 모델 번호/코드 ('S24', '15', 'M2' 등 숫자를 포함한 영문/숫자 단어, 소문자)"""
+    return list(dict.fromkeys(_MODEL_CODE.findall(unicodedata.normalize("NFC", text).lower())))
+
+
+def model_tokens(keywords):
+    """
+    키워드 중 모델을 구분하는 토큰 (숫자를 포함하거나 MODEL_QUALIFIERS에 속하는 단어, 소문자)
+    '갤럭시 S24 울트라'와 '아이폰 15 프로'처럼 제조사/제품군 키워드가 같거나 비어도 모델이 다른 질의를 가르는 데 씁니다.
+    """
+    tokens = set()
+    for keyword in keywords:
+        key = str(keyword).lower()
+        if any(char.isdigit() for char in key) or key in MODEL_QUALIFIERS:
+            tokens.add(key)
+    return tokens
+
+
+class AhoCorasick:
+    """여러 패턴을 한 번의 선형 탐색으로 찾는 Aho–Corasick 오토마톤"""
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for pattern_id, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                nxt = self.goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][char] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = nxt
+            self.output[state].append(pattern_id)
+        pending = deque(self.goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, nxt in self.goto[state].items():
+                pending.append(nxt)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nxt] = self.goto[fallback].get(char, 0)
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+    def finditer(self, text):
+        """(시작 위치, 끝 위치(미포함), 패턴 번호)를 끝 위치 순으로 반환합니다."""
+        state = 0
+        for end, char in enumerate(text, start=1):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for pattern_id in self.output[state]:
+                yield end - len(self.patterns[pattern_id]), end, pattern_id
+
+
+class LexiconMatcher:
+    """
+    고정 키워드 사전(카테고리, 티어)에 대한 사전 기반 키워드 추출기
+    정규화된 질의에서 사전 단어를 한 번에 찾고(겹치면 먼저 시작하고 긴 단어 우선),
+    카테고리/티어는 미리 만든 dict/set 조회로 돌려줍니다.
+    한 글자 단어는 어절 시작에서만, 영문/숫자 단어는 앞뒤가 영문/숫자가 아닐 때만 인정합니다 ('프로그램'의 '램' 제외).
+    """
+    def __init__(self, categories, tiers):
+        """
+        Args:
+            categories (dict): {카테고리명: [키워드, ...]} (앞선 카테고리가 우선)
+            tiers (dict): {티어명: [키워드, ...]}
+        """
+        self.category_of = {}
+        for name, words in categories.items():
+            for word in words:
+                self.category_of.setdefault(word, name)
+        self.categories = list(categories)
+        self.tier_members = {name: set(words) for name, words in tiers.items()}
+        canonical = {}
+        for word in list(self.category_of) + [w for words in tiers.values() for w in words]:
+            key, _ = normalize_text(word)
+            if key:
+                canonical.setdefault(key, word)
+        self.keys = list(canonical)
+        self.words = [canonical[key] for key in self.keys]
+        self.automaton = AhoCorasick(self.keys)
+
+    def _accept(self, text, word_start, start, end):
+        key = text[start:end]
+        if len(key) == 1 and not word_start[start]:
+            return False
+        if _LATIN.match(key[0]) and start > 0 and _LATIN.match(text[start - 1]):
+            return False
+        if _LATIN.match(key[-1]) and end < len(text) and _LATIN.match(text[end]):
+            return False
+        return True
+
+    def extract(self, text):
+        """질의에 나온 사전 키워드 목록 (등장 순서, 중복 제거)"""
+        return self.extract_with_residue(text)[0]
+
+    def extract_with_residue(self, text):
+        """
+        사전 키워드 목록과, 사전 단어가 덮지 못한 나머지 단어 목록을 함께 반환합니다.
+        나머지는 정규화 문자열에서 덮이지 않은 구간을 어절 시작 위치로 나눈 것입니다
+        ('아이패드 에어 M2' -> (['아이패드'], ['에어', 'm2'])). 나머지가 없으면 질의 전체가 사전 단어입니다.
+        """
+        normalized, word_start = normalize_text(text)
+        matches = sorted(
+            (start, -(end - start), end, pattern_id)
+            for start, end, pattern_id in self.automaton.finditer(normalized)
+            if self._accept(normalized, word_start, start, end)
+        )
+        found, covered_until = [], 0
+        covered = [False] * len(normalized)
+        for start, _, end, pattern_id in matches:
+            if start < covered_until:
+                continue
+            covered_until = end
+            covered[start:end] = [True] * (end - start)
+            found.append(self.words[pattern_id])
+        residue, current = [], []
+        for i, char in enumerate(normalized):
+            if covered[i] or word_start[i]:
+                if current:
+                    residue.append("".join(current))
+                current = []
+            if not covered[i]:
+                current.append(char)
+        if current:
+            residue.append("".join(current))
+        residue = [word for piece in residue for word in _WORD.findall(piece)]
+        return list(dict.fromkeys(found)), residue
+
+    def match_category(self, keywords):
+        category = {name: [] for name in self.categories}
+        for kw in keywords:
+            name = self.category_of.get(kw)
+            if name:
+                category[name].append(kw)
+        return category
+
+    def match_tier(self, keywords):
+        return {name: [kw for kw in keywords if kw in members] for name, members in self.tier_members.items()}
@@ -0,0 +1,170 @@
+import asyncio
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from app.config import settings
+from .queue_manager import add_log
+
+
+def log_wrapper(log_message):
+    add_log(log_message)
+
+
+def _new_okt():
+    from konlpy.tag import Okt
+    okt = Okt()
+    okt.pos("형태소 분석기 워밍업", stem=True)  # 첫 pos() 호출의 JVM 초기화 비용을 미리 치름
+    return okt
+
+
+# ---- 워커 프로세스 쪽 ----
+_worker_okt = None
+
+
+def _worker_init():
+    global _worker_okt
+    _worker_okt = _new_okt()
+
+
+def _worker_pos(text, stem):
+    return [tuple(token) for token in _worker_okt.pos(text, stem=stem)]
+
+
+class MorphAnalyzer:
+    """
+    프로세스 공용 Okt 형태소 분석기
+    Okt 인스턴스를 pool_size개 미리 만들어(워밍업 포함) 돌려 쓰고, pos(text, stem) 결과를 LRU로 메모합니다.
+    JPype 호출은 인스턴스마다 직렬화되므로 여러 스레드가 동시에 쓰면 풀에서 비어 있는 인스턴스를 기다립니다.
+    use_process=True면 분석을 별도 워커 프로세스에서 수행해 이벤트 루프/GIL을 막지 않습니다.
+    """
+    def __init__(self, pool_size=2, cache_size=4096, use_process=False):
+        self.pool_size = max(int(pool_size), 1)
+        self.cache_size = cache_size
+        self.use_process = use_process
+        self._pool = queue.Queue()
+        self._created = 0
+        self._create_lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._executor = None
+        self.hits = 0
+        self.misses = 0
+
+    def warm(self):
+        """Okt 인스턴스(또는 워커 프로세스)를 미리 만들어 둡니다."""
+        if self.use_process:
+            self._get_executor().submit(_worker_pos, "", True).result()
+            return
+        instances = [self._acquire() for _ in range(self.pool_size)]
+        for okt in instances:
+            self._pool.put(okt)
+        log_wrapper(f"Okt 형태소 분석기 {self.pool_size}개 준비 완료")
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._create_lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.pool_size, initializer=_worker_init)
+        return self._executor
+
+    def _acquire(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self._create_lock:
+            create = self._created < self.pool_size
+            if create:
+                self._created += 1
+        if create:
+            try:
+                return _new_okt()
+            except Exception:
+                # 생성 실패(JVM 없음 등) 시 자리를 돌려놓아야 이후 호출이 빈 풀에서 영원히 기다리지 않음
+                with self._create_lock:
+                    self._created -= 1
+                raise
+        return self._pool.get()
+
+    def _analyze(self, method, text, stem):
+        okt = self._acquire()
+        try:
+            return [tuple(token) if isinstance(token, (list, tuple)) else token
+                    for token in getattr(okt, method)(text, stem=stem)]
+        finally:
+            self._pool.put(okt)
+
+    def _cache_get(self, key):
+        with self._cache_lock:
+            tokens = self._cache.get(key)
+            if tokens is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return tokens
+
+    def _cache_put(self, key, tokens):
+        if not self.cache_size:
+            return
+        with self._cache_lock:
+            self._cache[key] = tokens
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def pos(self, text, stem=True):
+        """Okt.pos(text, stem)와 같은 (형태소, 품사) 목록 (메모된 결과는 복사본으로 반환)"""
+        key = (text, stem)
+        tokens = self._cache_get(key)
+        if tokens is None:
+            if self.use_process:
+                tokens = self._get_executor().submit(_worker_pos, text, stem).result()
+            else:
+                tokens = self._analyze("pos", text, stem)
+            tokens = tuple(tokens)
+            self._cache_put(key, tokens)
+        return list(tokens)
+
+    async def apos(self, text, stem=True):
+        """이벤트 루프를 막지 않는 pos (워커 프로세스 또는 스레드에서 실행)"""
+        key = (text, stem)
+        tokens = self._cache_get(key)
+        if tokens is not None:
+            return list(tokens)
+        if self.use_process:
+            loop = asyncio.get_running_loop()
+            tokens = await loop.run_in_executor(self._get_executor(), _worker_pos, text, stem)
+        else:
+            tokens = await asyncio.to_thread(self._analyze, "pos", text, stem)
+        tokens = tuple(tokens)
+        self._cache_put(key, tokens)
+        return list(tokens)
+
+    def morphs(self, text, stem=True):
+        """Okt.morphs (색인 구축용, 메모하지 않음)"""
+        return self._analyze("morphs", text, stem)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+_analyzer = None
+_lock = threading.Lock()
+
+
+def get_morph_analyzer():
+    """프로세스 공용 MorphAnalyzer (설정값으로 최초 1회 생성)"""
+    global _analyzer
+    if _analyzer is None:
+        with _lock:
+            if _analyzer is None:
+                _analyzer = MorphAnalyzer(
+                    pool_size=settings.YOUTUBE_OKT_POOL_SIZE,
+                    cache_size=settings.YOUTUBE_OKT_CACHE_SIZE,
+                    use_process=settings.YOUTUBE_OKT_PROCESS,
+                )
+    return _analyzer
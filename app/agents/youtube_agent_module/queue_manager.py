@@ -1,34 +1,131 @@
 import queue
-from typing import List, Dict, Any
+import re
+import asyncio
+import contextvars
+import itertools
+from collections import deque
+from dataclasses import dataclass, field, asdict
+from typing import List, Dict, Any, Optional, Callable
 import threading
 import time
-# 글로벌 변수로 큐 선언
-_global_queue = None
+from app.config import settings
+from app.utils.logger import logger
+
+_STATE_PATTERN = re.compile(r'<<::STATE::(.*?)>>')
+
+# 이벤트를 발생시킨 요청(웹소켓 client_id). asyncio 태스크와 asyncio.to_thread 스레드로 이어집니다.
+_session_id = contextvars.ContextVar("progress_session_id", default=None)
+
+
+def set_progress_session(session_id):
+    """현재 컨텍스트에서 발행되는 이벤트에 session_id를 붙입니다 (reset_progress_session용 토큰 반환)."""
+    return _session_id.set(session_id)
+
+
+def reset_progress_session(token):
+    _session_id.reset(token)
+
+
+@dataclass
+class ProgressEvent:
+    """진행 상황 이벤트 (<<::STATE::단계>> 표기는 stage로 분리)"""
+    seq: int
+    message: str
+    stage: Optional[str] = None
+    source: Optional[str] = None
+    session_id: Optional[str] = None
+    created: float = field(default_factory=time.time)
+
+    def to_dict(self):
+        return asdict(self)
+
+
+class ProgressBus:
+    """
+    크기가 정해진 진행 상황 이벤트 버스
+    발행은 막히지 않으며(put_nowait), 가득 차면 가장 오래된 이벤트를 버리고 dropped를 늘립니다.
+    소비자는 blocking get으로 기다리므로 비어 있을 때 폴링/sleep이 없습니다.
+    """
+    def __init__(self, maxsize=1000):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def publish(self, message, source=None):
+        message = str(message)
+        match = _STATE_PATTERN.search(message)
+        event = ProgressEvent(
+            seq=next(self._seq),
+            message=_STATE_PATTERN.sub("", message).strip() if match else message,
+            stage=match.group(1).strip() if match else None,
+            source=source,
+            session_id=_session_id.get(),
+        )
+        with self._lock:
+            while True:
+                try:
+                    self.queue.put_nowait(event)
+                    return event
+                except queue.Full:
+                    try:
+                        self.queue.get_nowait()
+                        self.queue.task_done()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+
+    def get(self, timeout=None):
+        """이벤트가 올 때까지 기다립니다 (timeout이 지나면 None)."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_bus():
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                _bus = ProgressBus(maxsize=settings.PROGRESS_BUS_SIZE)
+    return _bus
+
+
+def get_queue():
+    """이전 호환용: 이벤트 버스의 (크기 제한) 큐"""
+    return get_bus().queue
+
+
+def add_log(message, source=None):
+    """진행 상황 이벤트 발행 (출력은 LogConsumer 스레드에서 처리)"""
+    return get_bus().publish(message, source)
+
+
 def log_wrapper(log_message):
-    _global_queue.append(log_message)
     add_log(log_message)
-def get_queue():
-    global _global_queue
-    if _global_queue is None:
-        _global_queue = queue.Queue()
-    return _global_queue
-
-def add_log(message):
-    print(f"로그 추가: {message}")
-    get_queue().put(message)
-    
-    
+
+
+_STOP = object()
+
+
 class LogConsumer:
     """
     상시 구동형 로그 소비자 클래스
-    로그 큐에서 메시지를 꺼내 처리하고 최근 로그를 유지합니다.
+    이벤트 버스에서 blocking get으로 이벤트를 꺼내 상태를 갱신하고, 최근 로그(최대 max_logs개)를 유지하며,
+    등록된 구독자(callable)에게 이벤트를 전달합니다.
     """
     def __init__(self, max_logs=100):
-        # 최근 로그 저장용 리스트
-        self.recent_logs: List[str] = []
+        # 최근 로그 (크기 고정)
+        self.recent_logs = deque(maxlen=max_logs)
         # 최대 로그 개수
         self.max_logs = max_logs
-        self.thread=threading.Thread(target=self.Que_main_loop)
+        self.bus = get_bus()
+        self.thread = threading.Thread(target=self.Que_main_loop, name="progress-consumer", daemon=True)
         # 에이전트 상태 정보
         self.state: Dict[str, Any] = {
             "status": "idle",
@@ -36,104 +133,165 @@ class LogConsumer:
             "error_count": 0,
             "processed_logs": 0
         }
-        # 스레드 관련 변수
+        self._subscribers: List[Callable[[ProgressEvent], None]] = []
+        self._session_subscribers: Dict[str, List[Callable[[ProgressEvent], None]]] = {}
+        self._subscribers_lock = threading.Lock()
         self._stop_event = threading.Event()
-        self.consumer_thread = None
         # 싱글톤 인스턴스 등록
         LogConsumer._instance = self
-    def process_state_info(self, log_message: str) -> None:
+
+    def subscribe(self, callback, session_id=None):
         """
-        로그 메시지에서 <<::STATE::문자열>> 형태의 상태 정보를 추출하고 
-        상태를 직접 업데이트합니다.
-        
-        Args:
-            log_message: 로그 메시지 문자열
+        이벤트마다 callback(event)을 소비자 스레드에서 호출합니다 (빨리 반환해야 함).
+        session_id를 주면 그 세션에서 발생한 이벤트만 전달합니다.
         """
-        import re
-        # 정규식 패턴을 사용하여 <<::STATE::문자열>> 형식 찾기
-        pattern = r'<<::STATE::(.*?)>>'
-        match = re.search(pattern, log_message)
-        if match:
-            # 그룹 1(첫 번째 괄호 안의 내용)이 실제 상태 정보
-            state_info = match.group(1)
-            # 상태 정보 업데이트
-            self.state["status"] = state_info
-            self.state["last_update"] = time.time()
-    def log_processing(self, log_message: str) -> None:
-                # 상태 정보 처리
-        self.process_state_info(log_message)
-        print(log_message)
-        # 최근 로그 목록에 추가
-        self.recent_logs.append(log_message)
-        
-        # 최대 개수 유지
-        if len(self.recent_logs) > self.max_logs:
-            self.recent_logs.pop(0)  # 가장 오래된 로그 제거
-        
-        # 처리 완료 표시
-        get_queue().task_done()
-        
+        with self._subscribers_lock:
+            if session_id is None:
+                self._subscribers.append(callback)
+            else:
+                self._session_subscribers.setdefault(session_id, []).append(callback)
+        return callback
+
+    def unsubscribe(self, callback, session_id=None):
+        with self._subscribers_lock:
+            callbacks = self._subscribers if session_id is None else self._session_subscribers.get(session_id, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+            if session_id is not None and not callbacks:
+                self._session_subscribers.pop(session_id, None)
+
+    def process_state_info(self, event: ProgressEvent) -> None:
+        """이벤트의 단계(<<::STATE::문자열>>)로 상태를 갱신합니다."""
+        if event.stage is not None:
+            self.state["status"] = event.stage
+            self.state["last_update"] = event.created
+
+    def log_processing(self, event: ProgressEvent) -> None:
+        # 상태 정보 처리
+        self.process_state_info(event)
+        logger.debug(f"[{event.stage}] {event.message}" if event.stage else event.message)
+        # 최근 로그 목록에 추가 (deque가 최대 개수 유지)
+        self.recent_logs.append(event.to_dict())
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers)
+            if event.session_id is not None:
+                subscribers += self._session_subscribers.get(event.session_id, [])
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                self.state["error_count"] += 1
+                logger.error(f"진행 상황 구독자 처리 중 오류 발생: {e}")
         # 처리된 로그 카운트 증가
         self.state["processed_logs"] += 1
+
     def run(self):
         if not self.thread.is_alive():
-            self.FLAG = True
             self.thread.start()
             return True
         return False
-        
 
     def Que_main_loop(self):
         """
-        로그 소비자의 메인 루프. 
-        큐에서 로그를 꺼내 처리하고, 큐가 비었을 경우 일정 시간 대기합니다.
+        로그 소비자의 메인 루프.
+        이벤트가 올 때까지 기다렸다가 처리하고, 종료 표시(_STOP)를 받으면 끝납니다.
         """
-        self.FLAG = True
-        
-        while self.FLAG:
-            messages_processed = 0
-            
-            # 큐에 메시지가 있는 동안 계속 처리
-            while not get_queue().empty():
-                try:
-                    # 큐에서 로그 메시지 가져오기
-                    log_message = get_queue().get(block=False)
-                    self.log_processing(log_message)
-                    messages_processed += 1
-                except queue.Empty:
-                    # 큐가 비었을 경우 루프 종료
-                    break
-                except Exception as e:
-                    # 오류 발생 시 카운트 증가
-                    self.state["error_count"] += 1
-                    print(f"로그 처리 중 오류 발생(inner loop: print): {e}")
-                    self.log_wrapper(f"로그 처리 중 오류 발생(inner loop: wrapper): {e}")
-            # 메시지가 처리되지 않았을 경우에만 대기
-            if messages_processed == 0:
-                time.sleep(2)  # 2초 대기
+        while True:
+            # 종료 요청 후에는 (가득 찬 큐에서 종료 표시가 밀려났을 수 있으므로) 기다리지 않음
+            event = self.bus.get(timeout=0 if self._stop_event.is_set() else None)
+            if event is None:
+                return
+            try:
+                if event is _STOP:
+                    return
+                self.log_processing(event)
+            except Exception as e:
+                # 오류 발생 시 카운트 증가
+                self.state["error_count"] += 1
+                logger.error(f"로그 처리 중 오류 발생: {e}")
+            finally:
+                self.bus.queue.task_done()
+
     def stop(self):
         """
         로그 소비자를 안전하게 종료합니다.
-        FLAG 변수를 변경하여 run 메서드의 루프가 종료되도록 합니다.
+        종료 표시를 큐에 넣어 그 전에 들어온 이벤트까지 처리한 뒤 루프가 끝나도록 합니다.
         """
         if self.thread.is_alive():
-            self.FLAG = False
             self.state["status"] = "shutdown"
-            print("로그 소비자 종료 요청됨. 다음 사이클에서 종료됩니다.")
+            self._stop_event.set()
+            self.bus.queue.put(_STOP)
             self.thread.join()
-            while not get_queue().empty():
-                try:
-                    # 큐에서 로그 메시지 가져오기
-                    log_message = get_queue().get(block=False)
-                    self.log_processing(log_message)
-                    #messages_processed += 1
-                except queue.Empty:
-                    # 큐가 비었을 경우 루프 종료
-                    break
-                except Exception as e:
-                    # 오류 발생 시 카운트 증가
-                    self.state["error_count"] += 1
-                    print(f"로그 처리 중 오류 발생(outter : print): {e}")
-            # 메시지가 처리되지 않았을 경우에만 대기
             return True
-        return False
\ No newline at end of file
+        return False
+
+
+_consumer = None
+_consumer_lock = threading.Lock()
+
+
+def get_log_consumer(max_logs=200):
+    """프로세스 공용 LogConsumer (최초 호출 시, 또는 이전 인스턴스가 종료됐으면 새로 생성/시작)"""
+    global _consumer
+    consumer = _consumer
+    if consumer is None or consumer._stop_event.is_set():
+        with _consumer_lock:
+            if _consumer is None or _consumer._stop_event.is_set():
+                _consumer = LogConsumer(max_logs=max_logs)
+                _consumer.run()
+            consumer = _consumer
+    return consumer
+
+
+def stop_log_consumer():
+    """
+    프로세스 공용 LogConsumer를 종료합니다 (앱 종료 시 한 번 호출).
+    모든 세션이 같은 소비자를 쓰므로 에이전트/요청 단위 정리에서는 호출하지 않습니다.
+    """
+    global _consumer
+    with _consumer_lock:
+        consumer, _consumer = _consumer, None
+    return consumer.stop() if consumer is not None else False
+
+
+class ProgressSubscription:
+    """
+    한 세션의 진행 상황 이벤트를 이벤트 루프 쪽 asyncio.Queue로 받는 구독
+    소비자 스레드에서 call_soon_threadsafe로 넘기며, 큐가 가득 차면 가장 오래된 이벤트를 버립니다.
+    stages_only=True면 <<::STATE::...>> 단계 이벤트만 받습니다.
+
+        async with ProgressSubscription(client_id) as progress:
+            event = await progress.get()
+    """
+    def __init__(self, session_id, maxsize=100, stages_only=True, consumer=None):
+        self.session_id = session_id
+        self.stages_only = stages_only
+        self.consumer = consumer or get_log_consumer()
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.consumer.subscribe(self._forward, session_id=session_id)
+
+    def _forward(self, event):
+        if self.stages_only and event.stage is None:
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # 이벤트 루프가 이미 닫힘
+
+    def _put(self, event):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.consumer.unsubscribe(self._forward, session_id=self.session_id)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
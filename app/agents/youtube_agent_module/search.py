@@ -1,42 +1,36 @@
 #!/usr/bin/env python3
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-import tiktoken
 import json
+import asyncio
 import time
 
 import re
-import difflib
 import pandas as pd
+import numpy as np
 import random
 from .queue_manager import add_log
 from .dataloader import DataLoader
-from .utility import Node
+from .utility import Node, run_coroutine
+from .CFAISS import WrIndexFlatL2
+from .hybrid import reciprocal_rank_fusion
+from .context import RetrievalContext
+from . import tokenizer
+from . import srt
+from app.config import settings
 #app.agents.youtube_agent_module
-globalist=[]
 
 def log_wrapper(log_message):
-    globalist.append(log_message)
 
     add_log(log_message) 
      
 def truncate_text_by_tokens(text, max_tokens, model="gpt-4o-mini"):
-    encoding = tiktoken.encoding_for_model(model)
-    tokens = encoding.encode(text)
-    if len(tokens) > max_tokens:
-        tokens = tokens[:max_tokens]
-        return encoding.decode(tokens)
-    return text
+    return tokenizer.truncate(text, max_tokens, model)
 
 def token_bool(text, model="gpt-4o-mini",target=1500):
-    encoding = tiktoken.encoding_for_model(model)
-    tokens = encoding.encode(text)
-    length=len(tokens)
-    return length>target
+    return tokenizer.exceeds(text, target, model)
 
 def cal_token(text, model="gpt-4o-mini"):
-    encoding = tiktoken.encoding_for_model(model)
-    tokens = encoding.encode(text)
-    return len(tokens)
+    return tokenizer.count_tokens(text, model)
 
 def simple_filter(metadata):
     simple_metadata = {}
@@ -64,7 +58,7 @@ def compress_subtitles(text, chunk_size=500, overlap=50):  # overlap이 +/-
     return chunks 
 
 def setting_tockens(text,target=1600,model="gpt-4o-mini",chunk_size=500):
-    encoding = tiktoken.encoding_for_model(model)
+    encoding = tokenizer.get_encoding(model)
     tokens = encoding.encode(text)
     chunck_overrap= int(round((target-len(tokens))/2/target*chunk_size,0))
     if -chunck_overrap > chunk_size/4:
@@ -86,12 +80,7 @@ def compress_text(subtitle_text, chunk_size=500, chunk_overlap=50):
     return text_splitter.split_text(subtitle_text)
 
 def count_tokens(text, model="gpt-4o-"):
-    # 모델에 맞는 인코딩 방식을 가져옵니다.
-    encoding = tiktoken.encoding_for_model(model)
-    # 텍스트를 토큰으로 인코딩합니다.
-    tokens = encoding.encode(text)
-    # 토큰의 개수를 반환합니다.
-    return len(tokens)
+    return tokenizer.count_tokens(text, model)
 
 def load_file(filename):
     with open(filename, "r", encoding="utf-8") as f:
@@ -120,9 +109,7 @@ class keyword_finder:
             ----------------------------예시2 요청 : 배틀그라운드 모바일, 콜 오브 듀티 모바일 처럼 FPS 게임 렉 없이 즐기기 좋은 태블릿 없을까?------------------------------------------
             [[FPS 게임]], [[배틀그라운드 모바일]], [[콜 오브 듀티 모바일]], [[하이앤드]], [[고성능]], [[태블릿]].....]]
         """
-        self.negative_prompt = """
-            너는 이 데이터 저장소의 배테랑 검색 도우미야 특히 필요없는 자료를 제외하는데 최고의 전문가야 너는 조용한 성격에 필요한 문구만 조용히 적어내리는 성격이지
-            너의 임무는 입력 키워드를 보고 상반되는 키워드를 아래 원칙에 맞게 적어주는 거야. 
+        negative_rules = """
             0. 너가 적어줄 키워드는 "전체 키워드 목록" 내의 키워드 중에서만 선택해야 한다.
             1. 입력된 키워드 및 명백한 하위 분류는 제외하지 않는다. (입력[[갤럭시]]-> 갤럭시, 갤럭시S, 갤럭시노트, 갤럭시탭 등은 제외 불가)
             2. 입력 키워드에서 명시된 제조사가 있다면 다른 제조사는 제외한다. (입력[[삼성]]-> 애플, LG, 샤오미 등은 제외)
@@ -138,13 +125,32 @@ class keyword_finder:
             7. 답변은 다음 양식을 따른다 [[키워드1]], [[키워드2]], [[키워드3]], ...]]
             8. 아래는 예시이므로 참고(예시이기 때문에 실제 키워드 리스트에 없는것이 있을 수 있음 하지만 실제 작업중에는 반드시 키워드 목록을 참고할것)
             키워드가 부정적이다 아니다가 중요한게 아니라 그 키워드를 포함된 자료를  보지 않기 위함임을 명심해야 한다.
+        """
+        # 포함 키워드 출력([[키워드]] 목록)을 입력으로 받는 순차 경로(get_keywords_sametime)용
+        self.negative_prompt = """
+            너는 이 데이터 저장소의 배테랑 검색 도우미야 특히 필요없는 자료를 제외하는데 최고의 전문가야 너는 조용한 성격에 필요한 문구만 조용히 적어내리는 성격이지
+            너의 임무는 입력 키워드를 보고 상반되는 키워드를 아래 원칙에 맞게 적어주는 거야. 
+        """ + negative_rules + """
             ----------------------------예시1 [[삼성]], [[고성능]] [[하이앤드]], [[태블릿]] 키워드 입력 시------------------------------------------
             [[샤오미]], [[보급형]], [[[가성비]]], [[중국산]], [[애플]], [[모바일]], [[랩탑]], [[PC]], [[그래픽카드]], [[RTX 5090]].....]]
             ----------------------------예시2 [[애플]], [[아이패드]] 키워드 입력 시------------------------------------------
             [[샤오미]], [[삼성]], [[갤럭시]], [[중국산]], [[아이폰]], [[맥북]], [[랩탑]], [[PC]], [[갤럭시탭S7]], [[갤럭시탭S8울트라]], [[RTX 5090]].....]]
         """
+        # 사용자 요청 원문을 입력으로 받는 동시 호출 경로(aget_keywords)용: 포함 키워드 추출과 동시에 실행되므로 키워드 대신 요청을 받음
+        self.negative_query_prompt = """
+            너는 이 데이터 저장소의 배테랑 검색 도우미야 특히 필요없는 자료를 제외하는데 최고의 전문가야 너는 조용한 성격에 필요한 문구만 조용히 적어내리는 성격이지
+            너에게는 키워드가 아니라 사용자의 요청 문장이 그대로 입력된다.
+            너의 임무는 먼저 요청에서 사용자가 원하는 제품군, 제조사, 모델명, 장면/상황을 파악하고, 그것과 상반되는 키워드를 아래 원칙에 맞게 적어주는 거야.
+            아래 원칙에서 "입력 키워드"는 사용자 요청에서 네가 파악한 키워드를 뜻한다. 요청에 직접 언급된 제품/제조사/모델은 절대 제외하지 않는다.
+        """ + negative_rules + """
+            ----------------------------예시1 요청 : 삼성 고성능 하이엔드 태블릿 추천해줘------------------------------------------
+            [[샤오미]], [[보급형]], [[[가성비]]], [[중국산]], [[애플]], [[모바일]], [[랩탑]], [[PC]], [[그래픽카드]], [[RTX 5090]].....]]
+            ----------------------------예시2 요청 : 그림 그리기 좋은 아이패드 뭐가 있어?------------------------------------------
+            [[샤오미]], [[삼성]], [[갤럭시]], [[중국산]], [[아이폰]], [[맥북]], [[랩탑]], [[PC]], [[갤럭시탭S7]], [[갤럭시탭S8울트라]], [[RTX 5090]].....]]
+        """
         self.context=f"데이터 저장소의 자료들의 키워드 전체 키워드:{self.keywords} "
         self.llm_n = Node(self.negative_prompt,context=self.keywords , gptmodel="gpt-4o")
+        self.llm_nq = Node(self.negative_query_prompt,context=self.keywords , gptmodel="gpt-4o")
         self.llm_p = Node(self.positive_prompt,context=self.keywords ,gptmodel="gpt-4o-mini")
         self.recent_keywords_n = None
         self.recent_keywords_p = None
@@ -164,21 +170,26 @@ class keyword_finder:
         self.filtter_keywords()
         return self.recent_keywords_n, self.recent_keywords_p
     def filtter_keywords(self):
+        self.recent_keywords_p, self.recent_keywords_n = self.split_keywords(self.recent_keywords_p, self.recent_keywords_n)
+
+    @staticmethod
+    def split_keywords(positive, negative):
+        """키워드를 어절 단위로 나누고 포함 키워드와 겹치는 제외 키워드를 뺍니다."""
         p_buffer=[]
         n_buffer=[]
-        for keyword in self.recent_keywords_p:
+        for keyword in positive:
             for k in keyword.split(" "):
                 p_buffer.append(k)
-        for keyword in self.recent_keywords_n:
+        for keyword in negative:
             for k in keyword.split(" "):
                 n_buffer.append(k)
         n_buffer=list(set(n_buffer)-set(p_buffer))
-        self.recent_keywords_p=p_buffer
-        self.recent_keywords_n=n_buffer
-        log_wrapper(f"positive_keywords:{self.recent_keywords_p}")
-        log_wrapper(f"negative_keywords:{self.recent_keywords_n}")
+        log_wrapper(f"positive_keywords:{p_buffer}")
+        log_wrapper(f"negative_keywords:{n_buffer}")
+        return p_buffer, n_buffer
     
-    def enhance_query(self,query):
+    def _build_enhancer(self,query):
+        """쿼리 개선용 Node와 개발자 요청 문구를 만듭니다."""
         system_message=f"""
             roles:system
             당신은 벡터 검색(RAG) 시스템에 들어갈 자연어 쿼리를 개선하는 전문가입니다. 저희 RAG에는 영상의 자막과 설명이 저장되어 있습니다.
@@ -375,148 +386,184 @@ class keyword_finder:
             개발자 요청 : 나는 개발자로써 첨언을 할게 유저들은 사용법을 잘 모르니까 좀더 쿼리를 구체화 해서 좋은 답변을 받을 수 있도록 도와줘 부탁할게 그리고 뒤에는 작은 모델들도 많으니 동작을 잘 할 수있도록 하는 너의 역활이 매우 중요하단다
             그리고 이건 최중요 사항인데 "절대 응답에 어떠한 부가설명이나 문구 이모지를 포함하지마 무조건 쿼리만을 응답해"
         """
+        return rellm, developer_query
+
+    def enhance_query(self,query):
+        rellm, developer_query = self._build_enhancer(query)
         query=rellm.get_response(developer_query)
         log_wrapper(query)
         return query
+
+    async def aenhance_query(self,query):
+        rellm, developer_query = self._build_enhancer(query)
+        query=await rellm.aget_response(developer_query)
+        log_wrapper(query)
+        return query
+
+    async def aget_keywords(self, query):
+        """
+        쿼리 개선, 포함 키워드, 제외 키워드 추출을 동시에 실행합니다.
+        세 호출 모두 원본 쿼리만 입력으로 받으므로 서로 기다리지 않습니다 (제외 키워드는 요청 문장용 프롬프트(llm_nq) 사용).
+        인스턴스 상태(recent_keywords_*)를 쓰지 않으므로 여러 요청에서 동시에 호출할 수 있습니다.
+
+        Returns:
+            tuple: (개선된 쿼리, 제외 키워드, 포함 키워드)
+        """
+        enhanced, positive, negative = await asyncio.gather(
+            self.aenhance_query(query),
+            self.llm_p.aget_response(query),
+            self.llm_nq.aget_response(query),
+        )
+        positive, negative = self.split_keywords(
+            re.findall(r'\[\[(.*?)\]\]', positive),
+            re.findall(r'\[\[(.*?)\]\]', negative),
+        )
+        return enhanced, negative, positive
 class Keyword_filter():
     def __init__(self):
         self.dataloader=DataLoader()
         keywordset=list(self.dataloader.DataProcessor.keyword_set)
         self.keywordset="["+"], [".join(list( keywordset))+"]"
-        self.keylist=list( keywordset)
         self.finder=keyword_finder(self.keywordset)
-        self.enhanced_query=""
-        self.filtter_list={}
-        self.recent_selected_keywords=[]
-        self.RAG_available=False
-        
+        self.recency_weight=settings.YOUTUBE_RECENCY_WEIGHT
+        # 요청별 상태는 RetrievalContext에 담고, 이 객체는 여러 요청이 공유하는 읽기 전용 인덱스로만 사용
+
     def enhance_query(self,query):
-        self.enhanced_query = self.finder.enhance_query(query)
-        return self.enhanced_query
-    
-    def get_keywords_sametime(self):
-        return self.finder.get_keywords_sametime(self.enhanced_query)
+        """쿼리 개선만 수행해 새 RetrievalContext로 반환합니다."""
+        return RetrievalContext(query=query, enhanced_query=self.finder.enhance_query(query))
+
+    def get_keywords_sametime(self, ctx: RetrievalContext):
+        neg, pos = self.finder.get_keywords_sametime(ctx.enhanced_query)
+        ctx.negative_keywords, ctx.positive_keywords = list(neg), list(pos)
+        return neg, pos
+
+    def prepare_keywords(self,query):
+        """쿼리 개선과 키워드 추출을 한 번에 (동시 호출로) 수행하고 요청 컨텍스트를 반환합니다."""
+        enhanced, neg, pos = run_coroutine(self.finder.aget_keywords(query))
+        return RetrievalContext(query=query, enhanced_query=enhanced, positive_keywords=pos, negative_keywords=neg)
     
-    def keyword_filter(self,k=50):
+    def keyword_filter(self, ctx: RetrievalContext, k=50):
         outs=set()
-        for d in self.finder.recent_keywords_p:
-            similar_words = difflib.get_close_matches(d, self.dataloader.DataProcessor.keyword_set, n=5, cutoff=0.85)
+        for d in ctx.positive_keywords:
+            similar_words = self.dataloader.DataProcessor.keyword_index.get_close_matches(d, n=5)
             if similar_words:
                 for i in similar_words:
                     outs.add(i)
         negset=set()
-        for d in self.finder.recent_keywords_n:
-            similar_words = difflib.get_close_matches(d, self.dataloader.DataProcessor.keyword_set, n=5, cutoff=0.85)
+        for d in ctx.negative_keywords:
+            similar_words = self.dataloader.DataProcessor.keyword_index.get_close_matches(d, n=5)
             if similar_words:
                 for i in similar_words:
                     negset.add(i)
-        self.recent_selected_keywords=list(outs)
+        ctx.selected_keywords=list(outs)
         result=self._keyword_score(list(outs),list(negset),k)
-        self.filtter_list[self.enhanced_query]=result
-        self.RAG_available=True
+        ctx.tag_scores=result
+        ctx.rag_available=True
         return result, outs
         
     def _keyword_score(self,selected,remove,k):
-        data = [0] * len(self.dataloader.DataProcessor.Index_table.columns)
-        galaxy_keywords = [k for k in self.keylist if "갤럭시" in k]
-        samdung_keywords = [k for k in self.keylist if "삼성" in k]
-        appple_keywords= [k for k in self.keylist if "애플" in k]
-        i_product_keywords = [k for k in self.keylist if "아이" in k]
-        dayinform=self.dataloader.DataProcessor.datelimit.copy()
-        ref_table=[]
-        pre_table=self.dataloader.DataProcessor.Index_table.copy()
-        available_columns = dayinform[dayinform['available'] == 1].index
-        pre_table = pre_table[available_columns]
-        if  galaxy_keywords in selected or samdung_keywords in selected or 'Galaxy' in selected or '갤럭시' in selected:
-            galaxy_keywords.extend(samdung_keywords)
-            selected_rows = pre_table.loc[ pre_table.index.isin(galaxy_keywords) ]
-            cols_to_keep = selected_rows.eq(1).any(axis=0)
-            ref_table = pre_table.loc[:, cols_to_keep]
-        if appple_keywords in selected or i_product_keywords in selected or 'Apple' in selected or '애플' in selected or  '아이패드' in selected:
-            appple_keywords.extend(i_product_keywords)
-            selected_rows = pre_table.loc[ pre_table.index.isin(appple_keywords) ]
-            cols_to_keep = selected_rows.eq(1).any(axis=0)
-            ref_table = pre_table.loc[:, cols_to_keep]
-        if len(ref_table)<1:
-            cols_to_keep = pre_table.eq(1).any(axis=0)
-            ref_table = pre_table.loc[:, cols_to_keep]
-        data = [0] * len(ref_table.columns)
-        stakscore=pd.DataFrame(data, columns=['score'],index=ref_table.columns)
-        for d in selected:
-            if d:
-                stakscore['score']+=ref_table.loc[d].astype(int).values.tolist()
-                if d  == '태블릿':
-                    for i in range(5):
-                        stakscore['score']+=ref_table.loc[d].astype(int).values.tolist()
-        stakscore = stakscore.sort_values(by='score', ascending=False)
-        resultscore=stakscore[:k]
-
-        dayinform=self.dataloader.DataProcessor.datelimit.copy()
-
-        pre_table=self.dataloader.DataProcessor.Index_table.copy()
-        available_columns = dayinform[dayinform['available'] == 1].index
-        ref_table = pre_table[available_columns]
-        if  galaxy_keywords in selected or samdung_keywords in selected or 'Galaxy' in selected or '갤럭시' in selected:
-            ref_table=[]
-            galaxy_keywords.extend(samdung_keywords)
-            selected_rows = pre_table.loc[ pre_table.index.isin(galaxy_keywords) ]
-            cols_to_keep = selected_rows.eq(1).any(axis=0)
-            ref_table = pre_table.loc[:, cols_to_keep]
-        if appple_keywords in selected or i_product_keywords in selected or 'Apple' in selected or '애플' in selected:
-            ref_table=[]
-            appple_keywords.extend(i_product_keywords)
-            selected_rows = pre_table.loc[ pre_table.index.isin(appple_keywords) ]
-            cols_to_keep = selected_rows.eq(1).any(axis=0)
-            ref_table = pre_table.loc[:, cols_to_keep]
-        data = [0] * len(ref_table.columns)
-        removeindex=pd.DataFrame(data, columns=['score'],index=ref_table.columns)
-        for d in remove:
-            if d:
-                removeindex['score']+=ref_table.loc[d].astype(int).values.tolist()
-        removeindex[removeindex['score']>=int(1)]=int(1)
-        removeindex=removeindex[removeindex['score']==int(1)]
-        resultscore_filtered = resultscore[~resultscore.index.isin(removeindex.index)]
-        resultscore_filtered=resultscore_filtered[resultscore_filtered['score']>=int(1)]
+        """
+        선택 키워드의 태그 점수로 상위 k개 영상을 고르고 제외 키워드가 붙은 영상을 뺍니다.
+        제조사 범위, 최신성 조건, 제외 대상은 모두 로드 시점에 만든 FacetIndex 마스크의 AND/OR로 계산합니다.
+        """
+        processor=self.dataloader.DataProcessor
+        facets=processor.facets
+        candidates=np.nonzero(processor.available_mask() & facets.scope(selected))[0]
+        # '태블릿'은 6배 가중 (기존 점수 규칙 유지)
+        counts=facets.count([d for d in selected if d], weights={'태블릿': 6})
+        columns=facets.columns[candidates]
+        # 태그 점수가 같은 영상끼리는 최신 영상이 앞서도록 1 미만의 감쇠 점수를 더함
+        score=counts[candidates]+self.recency_weight*processor.recency_decay(columns)
+        top=np.argsort(-score, kind="stable")[:k]
+        removed=facets.any([d for d in remove if d])[candidates[top]]
+        keep=top[~removed & (score[top]>=1)]
+        resultscore_filtered=pd.DataFrame({'score': score[keep]}, index=pd.Index(columns[keep]))
         
         log_wrapper(f"최종 필터 : {resultscore_filtered}")
         return resultscore_filtered
-    def RAG_search(self):
-        searchV=[]
-        keyword_findert=self.filtter_list[self.enhanced_query]
-        for index, row in keyword_findert.iterrows():
-            searchV.append(index)
-        self.dataloader.DataProcessor.set_active(searchV)
-        self.dataloader.DataProcessor.create_qa_chain_from_store(persist_directory="data/vector_db.h5")
-        self.RAG_available=False
-        index,result=self.dataloader.DataProcessor.get_video_data(self.enhanced_query,mode="database")
-        return index,result
+    def bm25_candidates(self, ctx: RetrievalContext, k=None, exclude=()):
+        """
+        개선된 쿼리로 BM25 색인에서 찾은 최신성 조건을 만족하는 영상 id
+        태그 매칭이 놓친 영상도 벡터 검색 후보에 포함하기 위해 사용합니다.
+        기본 k로 찾은 결과는 ctx.bm25_ranking에 담아 같은 요청에서 다시 검색하지 않습니다.
+        """
+        if k is None and ctx.bm25_ranking is not None:
+            return [video_id for video_id in ctx.bm25_ranking if video_id not in exclude]
+        use_default=k is None
+        k=settings.YOUTUBE_BM25_CANDIDATES if k is None else k
+        bm25=self.dataloader.DataProcessor.bm25
+        if not k or bm25 is None:
+            ranking=[]
+        else:
+            available=self.dataloader.DataProcessor.available_columns()
+            ranking=[video_id for video_id, _ in bm25.search(ctx.enhanced_query, k=k, candidates=available)]
+        if use_default:
+            ctx.bm25_ranking=ranking
+        return [video_id for video_id in ranking if video_id not in exclude]
+
+    def hybrid_search(self, ctx: RetrievalContext, k=None):
+        """
+        태그 점수, BM25, 벡터 검색 순위를 가중 RRF로 합쳐 video_id 순위를 반환합니다.
+        LLM 호출 없이 벡터 검색은 태그/BM25 후보 안에서만 수행합니다.
+        검색 대상 인덱스는 ctx.active에 담아 넘기므로 벡터스토어의 공유 active는 바꾸지 않습니다.
+
+        Returns:
+            list: 점수 내림차순 [(video_id, score), ...] (최대 k개)
+        """
+        k=settings.YOUTUBE_HYBRID_TOP_K if k is None else k
+        processor=self.dataloader.DataProcessor
+        tag_ranking=[int(index) for index in ctx.tag_scores.index]
+        bm25_ranking=self.bm25_candidates(ctx)
+        candidates=list(dict.fromkeys(tag_ranking+bm25_ranking))
+        if not candidates:
+            return []
+        ctx.active=processor.active_indices(candidates)
+        query_vector=WrIndexFlatL2(processor.vectorstore.dimension).get_openai_embedding(ctx.enhanced_query)
+        vector_ranking=processor.vectorstore.search_video_ids(query_vector, k=processor.k_value, active=ctx.active)
+        fused=reciprocal_rank_fusion(
+            {"tag": tag_ranking, "bm25": bm25_ranking, "vector": vector_ranking},
+            weights={
+                "tag": settings.YOUTUBE_RRF_WEIGHT_TAG,
+                "bm25": settings.YOUTUBE_RRF_WEIGHT_BM25,
+                "vector": settings.YOUTUBE_RRF_WEIGHT_VECTOR,
+            },
+            k=settings.YOUTUBE_RRF_K,
+        )
+        log_wrapper(f"하이브리드 순위 : {fused[:k]}")
+        return fused[:k]
+
+    def RAG_search(self, ctx: RetrievalContext):
+        ctx.rag_available=False
+        fused=self.hybrid_search(ctx)
+        index=[video_id for video_id, _ in fused]
+        scores=[score for _, score in fused]
+        return index,scores
     
 class RAGOUT():
-    def __new__(cls, filtter: Keyword_filter,outs):
-        if not filtter.RAG_available:
+    def __new__(cls, filtter: Keyword_filter, ctx: RetrievalContext):
+        if not ctx.rag_available:
             return None  # 객체 생성 자체를 하지 않음 ❌
         return super().__new__(cls)  # 정상적인 경우에만 객체 생성 ✅
     
-    def __init__(self, filtter:Keyword_filter,outs):
+    def __init__(self, filtter:Keyword_filter, ctx: RetrievalContext):
         self.marker=False
         self.filtter = filtter 
+        self.ctx = ctx
         
-        self.enhanced_query=filtter.enhanced_query
+        self.enhanced_query=ctx.enhanced_query
         
-        self.RAG_out, self.result = self.filtter.RAG_search()  # 튜플 언패킹
-        data=[0]*len(self.RAG_out)
-        #filtter.dataloader.DataProcessor.data['테크몽'][1]['링크'][32]
-        sorted_result =  pd.DataFrame(data, columns=['score'],index=self.RAG_out)
+        self.RAG_out, self.result = self.filtter.RAG_search(ctx)  # (video_id 순위, RRF 점수)
         self.data = self.filtter.dataloader.DataProcessor.data 
+        self.video_table = self.filtter.dataloader.DataProcessor.video_table
+        self.cue_store = self.filtter.dataloader.DataProcessor.cue_store
         self.fomatted_data={}
-        for index in self.RAG_out:
-            sorted_result.loc[index]=int(outs[outs.index==index].values[0][0])
-        self.sorted_result=sorted_result.sort_values(by='score', ascending=False)
+        self.sorted_result=pd.DataFrame({'score': self.result}, index=self.RAG_out)
         self.cummunucation_buffer=[]
         self.index=0
         self.video_extraction={}
-        self.rerank= self.sorted_result.index[self.index]
-        self.get(self.index)
+        self.rerank=None
+        if not self.sorted_result.empty:  # 후보가 없으면 print_with_output에서 실패 응답 처리
+            self.get(self.index)
         self.output={}
         self.second_procesed=False
 
@@ -554,49 +601,70 @@ class RAGOUT():
         return self.fomatted_data
     
     def get_ranked_data(self):
-        self.rerank=self.sorted_result.index[self.index].replace(']','[').replace('[[','[').split('[')
+        self.rerank=int(self.sorted_result.index[self.index])
         self.format_data()
         return self.rerank   
     
-    def format_data(self):
-        self.fomatted_data['data']={}
-        self.fomatted_data['srt']={}
-        self.fomatted_data['data']['링크']=self.data[self.rerank[1]][1]['링크'][int(self.rerank[-2])]
-        self.fomatted_data['data']['태그']=self.data[self.rerank[1]][1]['태그'][int(self.rerank[-2])]
-        self.fomatted_data['data']['조회수']=self.data[self.rerank[1]][1]['조회수'][int(self.rerank[-2])]
-        self.fomatted_data['data']['제목']=self.data[self.rerank[1]][1]['제목'][int(self.rerank[-2])]
-        self.fomatted_data['data']['유튜버']=self.data[self.rerank[1]][1]['유튜버'][int(self.rerank[-2])]
-        self.fomatted_data['data']['업로드일']=self.data[self.rerank[1]][1]['업로드일'][int(self.rerank[-2])]
-        self.fomatted_data['data']['설명']=self.data[self.rerank[1]][1]['설명'][int(self.rerank[-2])]
+    def format_video(self, video_id):
+        """video_id에 해당하는 영상의 메타데이터와 자막을 새 dict로 반환합니다."""
+        formatted={'data':{}, 'srt':{}, 'video_id':int(video_id)}
+        channel, row = self.video_table.locate(video_id)
+        df = self.data[channel][1]
+        formatted['data']['링크']=df['링크'][row]
+        formatted['data']['태그']=df['태그'][row]
+        formatted['data']['조회수']=df['조회수'][row]
+        formatted['data']['제목']=df['제목'][row]
+        formatted['data']['유튜버']=df['유튜버'][row]
+        formatted['data']['업로드일']=df['업로드일'][row]
+        formatted['data']['설명']=df['설명'][row]
         try:
-            self.fomatted_data['data']['자막요약']=self.data[self.rerank[1]][1]['자막요약'][int(self.rerank[-2])]
-            self.fomatted_data['data']['코드']=self.data[self.rerank[1]][1]['코드'][int(self.rerank[-2])]
+            formatted['data']['자막요약']=df['자막요약'][row]
+            formatted['data']['코드']=df['코드'][row]
         except:
-            self.fomatted_data['data']['자막요약']=""
-            self.fomatted_data['data']['코드']=""
-        self.fomatted_data['자막']=self.data[self.rerank[1]][1]['자막'][int(self.rerank[-2])]
+            formatted['data']['자막요약']=""
+            formatted['data']['코드']=""
+        formatted['자막']=df['자막'][row]
+        return formatted
+
+    def format_data(self):
+        # Video_extractor가 같은 dict를 참조하므로 제자리에서 갱신
+        self.fomatted_data.clear()
+        self.fomatted_data.update(self.format_video(self.rerank))
     def make_clip(self):
         if self.second_procesed:
             base_link=self.fomatted_data['data']['링크']
+            start_seconds=self.video_extraction.get('start_seconds')
             link_text=self.video_extraction['seconds']
-            outlink=""
-            if link_text and isinstance(link_text, list):
-                link_text_f=re.sub(r'[^0-9s]', '', link_text[0])
-                outlink=base_link+"&t="+link_text_f
-            elif isinstance(link_text, str):
-                link_text_f=re.sub(r'[^0-9s]', '', link_text)
+            if isinstance(link_text, list):
+                link_text=link_text[0] if link_text else ""
+            link_text_f=re.sub(r'[^0-9]', '', link_text) if isinstance(link_text, str) else ""
+            if start_seconds is not None:
+                outlink=base_link+f"&t={start_seconds}s"
+            elif link_text_f:
+                outlink=base_link+"&t="+self.snap_seconds(link_text_f)+"s"
             else:
+                # 초 값을 읽을 수 없으면 시작 위치 없이 영상 링크만 ("&t=s" 같은 잘못된 링크 방지)
                 outlink=base_link
             self.video_extraction['clip']=outlink        
             return outlink
         else:
             return None
+    def snap_seconds(self, seconds):
+        """LLM이 준 초 값을 그 시각을 포함하는 자막 큐의 시작 시각으로 보정합니다."""
+        video_id=self.fomatted_data.get('video_id')
+        if not seconds or self.cue_store is None or video_id is None:
+            return seconds
+        index=self.cue_store.cue_at_seconds(video_id, int(seconds))
+        if index is None:
+            return seconds
+        return str(self.cue_store.start_seconds(video_id, index))
     def get_second(self,OUTPUT):
         self.video_extraction['timestamps']=OUTPUT['timestamps']
         self.video_extraction['timestampsdiscriptions']=OUTPUT['timestampsdiscriptions']
         self.video_extraction['seconds']=OUTPUT['seconds']
         self.video_extraction['descriptions']=OUTPUT['descriptions']
         self.video_extraction['codes']=OUTPUT['codes']
+        self.video_extraction['start_seconds']=OUTPUT.get('start_seconds')
         if self.second_procesed:
             return self.outputsort()
             
@@ -749,37 +817,165 @@ class Video_extractor():
                                 5) 해당 코드가 누락되거나 출력되지 않을 시 시스템에 치명적인 오류가 발생할 수 있으니 주의한다.
         """
 
+        # 자막을 큐 번호가 붙은 관련 구간만 전달할 때 사용하는 프롬프트 (시간은 큐 번호로 역산)
+        self.window_prompt = """
+                                너의 역할:
+                                - 사용자의 요청과 보유한 [자막자료],[설명자료]를 확인해서 다음의 내용을 출력한다
+                                - [자막자료]는 영상 자막 중 요청과 관련된 구간만 발췌한 것이며 각 줄은 "[큐번호] 시작시간 자막" 형식이다
+                                1) 영상에서 주요 하이라이트 부분의 큐번호를 5개 이상 찾는다 포멧은 다음과 같다 [[CUE:12]]
+                                1-1) 각 큐번호는 10단어 이하로 간단한 설명이 필요하다 포멧은 다음과 같다 [[CUEDESCRIPTION:12:여기에 설명 텍스트]]
+                                2) 1번중 가장 중요하다고 생각하는 부분 하나의 큐번호를 [[BEST:12]] 포멧으로 출력한다.
+                                2-1) 가장 중요함의 기준은 사용자의 요청을 달성하는데 중요한 정보의 제공을 의미한다.
+                                3) 설명자료에서 주요 내용 요약본
+                                4) 자막의 전체 내용 요약본
+                                세부규칙:
+                                - 위의 역할을 수행함에 있어 아래의 규칙을 절대적으로 지켜야 한다
+                                1) 사용자의 요청을 달성하는데 도움이 되는 방향의 자료를 수집해야한다.
+                                1-1) 사용자의 요청에서 어떤 "제품" 인지 유심히 보고 영상의 중요성을 결정한다.(예시1 요청->애플 2024 "아이패드 에어" 11 M2 리뷰 인 경우 애플 "비전프로", 애플 "아이패드 프로", 삼성 "갤럭시 탭" 등은 중요도가 없다.)
+                                    상기의 예시 외에도 각 제조사별 제품군에 대해 동일한 규칙을 적용한다.
+                                2) 큐번호는 반드시 [자막자료]에 있는 번호만 사용한다.
+                                3) 모든 자료는 [[]] 안에 배치해서 구분한다 예시 [[CUE:12]],[[CUEDESCRIPTION:12:여기에 설명 텍스트]] ,[[BEST:12]],[[DESCRIPTION:여기에 설명 텍스트]], [[DESCRIPTION:자막자료 요약내용]]
+                                4) 요청한 내용 외에 일체 다른 텍스트는 출력하지 않는다.
+                                5) 만약 요청한 내용을 달성할 수 없다고 판단되면 [[DESCRIPTION:연관 구간이 없습니다.]]와 주의사항의 "모든" 확인코드와 함께 출력한다.
+                                주의사항
+                                1) 너의 역할: 이하의 내용이 보인다면 출력의 끝에 [[CODE:역할확인]]을 출력한다.
+                                2) 세부 규칙: 이하의 1~5의 내용이 보인다면 출력의 끝에 [[CODE:세부규칙확인]]을 출력한다.
+                                3) [자막자료],[설명자료]가 확인 가능하다면 출력의 끝에 [[CODE:추가자료확인]]을 출력한다.
+        """
+        self.window_size=12
+        self.max_windows=4
         
         self.responset={}
         self.succeed=[]
         self.result=False
         self.OUTPUT ={}
 
+    def build_context(self, extra="", formatted=None):
+        """
+        현재 영상의 프롬프트와 컨텍스트를 만듭니다.
+        자막을 큐 단위로 해석할 수 있으면 질의와 관련된 구간만 큐 번호와 함께 전달하고,
+        해석할 수 없으면 기존처럼 자막 전체를 전달합니다.
+
+        Returns:
+            tuple: (프롬프트, 컨텍스트, 큐 목록 또는 None)
+        """
+        formatted=formatted or self.input
+        data=formatted['data']
+        store=self.RGAout.cue_store
+        if store is not None and store.cue_count(formatted.get('video_id', -1)):
+            cues=store.cues(formatted['video_id'])
+        else:
+            cues=srt.parse_srt(formatted['자막'])
+        if cues:
+            spans=srt.select_windows(cues, self.query, window=self.window_size, max_windows=self.max_windows)
+            subtitle=srt.render_windows(cues, spans)
+            prompt=self.window_prompt
+        else:
+            subtitle=formatted['자막']
+            prompt=self.short_cut_prompt
+            cues=None
+        context = {f"[자막자료]:\n{subtitle}\n\n"\
+                    f"[설명자료]:\n{data['설명']}"\
+                    f"{extra}"}
+        return prompt, context, cues
+
+    def parse_response(self, respons, cues=None):
+        """
+        LLM 응답을 OUTPUT 형식(timestamps, timestampsdiscriptions, seconds, descriptions, codes)의 새 dict로 정리합니다.
+        큐 목록이 있으면 시간은 응답의 큐 번호로 큐 테이블에서 가져오며, 없는 번호는 버립니다.
+        """
+        descriptions = re.findall(r'\[\[DESCRIPTION:(.*?)\]\]', respons)
+        codes = re.findall(r'\[\[CODE:(.*?)\]\]', respons)
+        start_seconds=None
+        if cues is None:
+            timestamps = re.findall(r'\[\[TIMESTAMP:(.*?)\]\]', respons)
+            seconds = re.findall(r'\[\[SECONDS:(.*?)\]\]', respons)
+            timestampsdiscriptions = re.findall(r'\[\[TIMESTAMPDESCRIPTION:(.*?)\]\]', respons)
+        else:
+            def cue_of(number):
+                number=int(number)
+                return cues[number] if 0 <= number < len(cues) else None
+            highlights=[cue_of(n) for n in re.findall(r'\[\[CUE:(\d+)\]\]', respons)]
+            timestamps=[srt.format_timestamp(cue.start_ms) for cue in highlights if cue]
+            timestampsdiscriptions=[]
+            for number, text in re.findall(r'\[\[CUEDESCRIPTION:(\d+):(.*?)\]\]', respons):
+                cue=cue_of(number)
+                if cue:
+                    timestampsdiscriptions.append(f"{srt.format_timestamp(cue.start_ms)}:{text}")
+            best=[cue for cue in (cue_of(n) for n in re.findall(r'\[\[BEST:(\d+)\]\]', respons)) if cue]
+            seconds=[str(cue.start_ms // 1000) for cue in best]
+            start_seconds=best[0].start_ms // 1000 if best else None
+        return {
+            'timestamps': timestamps,
+            'timestampsdiscriptions': timestampsdiscriptions,
+            'seconds': seconds,
+            'descriptions': descriptions,
+            'codes': codes,
+            'start_seconds': start_seconds,
+        }
+
+    async def aevaluate(self, formatted):
+        """한 영상을 독립된 프롬프트로 평가합니다 (대화 버퍼 미사용)."""
+        prompt, context, cues = self.build_context(formatted=formatted)
+        llm=Node(prompt,gptmodel='gpt-4o-mini')
+        llm.change_context(context)
+        respons=await llm.aget_response(self.query)
+        return self.parse_response(respons, cues)
+
+    async def aevaluate_top(self, k):
+        """
+        상위 k개 영상을 동시에 평가하고, 순위가 가장 높은 유효 응답(SECONDS 포함)을 고릅니다.
+        상위 영상의 결과가 정해지면 남은 요청은 취소합니다.
+
+        Returns:
+            tuple: (순위, OUTPUT, 유효 여부). 유효한 응답이 없으면 평가에 성공한 가장 높은 순위의 OUTPUT과 그 순위
+                (모두 실패하면 (0, None, False))
+        """
+        ranked=list(self.RGAout.sorted_result.index[:k])
+        tasks=[asyncio.create_task(self.aevaluate(self.RGAout.format_video(video_id))) for video_id in ranked]
+        first=None
+        first_rank=0
+        try:
+            for rank, task in enumerate(tasks):
+                try:
+                    output=await task
+                except Exception as e:
+                    log_wrapper(f"{rank}순위 영상 평가 실패 : {e}")
+                    continue
+                if first is None:
+                    first, first_rank=output, rank
+                if output['seconds']:
+                    return rank, output, True
+            return first_rank, first, False
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def parallel_process(self, k=3):
+        """
+        short_process의 병렬 버전: 1순위 영상이 실패했을 때 순차 재시도 대신 상위 k개를 동시에 평가합니다.
+        """
+        log_wrapper(f'유저 쿼리 : {self.query}, 상위 {k}개 영상 동시 평가')
+        rank, output, found = run_coroutine(self.aevaluate_top(k))
+        # OUTPUT의 시간/설명이 다른 영상의 메타데이터와 섞이지 않도록 OUTPUT을 만든 순위의 영상을 선택
+        self.RGAout.get(rank)
+        self.OUTPUT=output or self.parse_response("")
+        self.RGAout.second_procesed=found
+        log_wrapper(f'선택된 영상 순위 : {rank} (유효 응답 {found}), 답변 : {self.OUTPUT}')
+        self.RGAout.get_second(self.OUTPUT)
+        return self.RGAout.outputsort()
+
     def short_process(self):
-        data=self.input['data']
-        input_srt=self.input['자막']
-        context = {f"[자막자료]:\n{input_srt}\n\n"\
-                    f"[설명자료]:\n{data['설명']}"}
-        llm=Node(self.short_cut_prompt,gptmodel='gpt-4o-mini')
+        prompt, context, cues = self.build_context()
+        llm=Node(prompt,gptmodel='gpt-4o-mini')
         llm.change_context(context)
         log_wrapper(f'유저 쿼리 : {self.query}')
         self.RGAout.cummunucation_buffer.append(f'첫번째 유저 요청 : {self.query}')
         log_wrapper(f'첫번째 유저 요청 : {self.query}')
         respons=llm.get_response(self.query)
-        #pattern = r'\[\[(.*?)\]\]'
-        #matches = re.findall(pattern, respons)
-        timestamps = re.findall(r'\[\[TIMESTAMP:(.*?)\]\]', respons)
-        seconds = re.findall(r'\[\[SECONDS:(.*?)\]\]', respons)
-        descriptions = re.findall(r'\[\[DESCRIPTION:(.*?)\]\]', respons)
-        codes = re.findall(r'\[\[CODE:(.*?)\]\]', respons)
-        timestampsdiscriptions = re.findall(r'\[\[TIMESTAMPDESCRIPTION:(.*?)\]\]', respons)
         self.RGAout.cummunucation_buffer.append(f'첫번째 너의 답변 : {respons}')
         log_wrapper(f'첫번째 너의 답변 : {respons}')
-        self.OUTPUT['timestamps'] = timestamps
-        self.OUTPUT['timestampsdiscriptions'] = timestampsdiscriptions
-        self.OUTPUT['seconds'] = seconds
-        self.OUTPUT['descriptions'] = descriptions
-        self.OUTPUT['codes'] = codes
+        self.OUTPUT=self.parse_response(respons, cues)
         if len(self.OUTPUT['seconds'])<1 and not self.OUTPUT['descriptions']=='연관 구간이 없습니다.':
             self.RGAout.second_procesed=False
             out=self.retry_event_loop()
@@ -789,27 +985,14 @@ class Video_extractor():
         self.RGAout.get_second(self.OUTPUT)
         return self.RGAout.outputsort()
     def memory_process(self):
-        data=self.input['data']
-        input_srt=self.input['자막']
-        context = {f"[자막자료]:\n{input_srt}\n\n"\
-                    f"[설명자료]:\n{data['설명']}"\
-                     f"[지난대화]:\n{self.RGAout.cummunucation_buffer}"}  
-        llm=Node(self.short_cut_prompt,gptmodel='gpt-4o-mini')
+        prompt, context, cues = self.build_context(f"[지난대화]:\n{self.RGAout.cummunucation_buffer}")
+        llm=Node(prompt,gptmodel='gpt-4o-mini')
         llm.change_context(context)
         log_wrapper(f'유저 쿼리 : {self.RGAout.cummunucation_buffer[-1]}') 
         respons=llm.get_response(self.RGAout.cummunucation_buffer[-1])
         self.RGAout.cummunucation_buffer.append(f"{self.RGAout.index} 번째 너의 대답 : {respons}")
         log_wrapper(f"{self.RGAout.index} 번째 너의 대답 : {respons}")
-        timestamps = re.findall(r'\[\[TIMESTAMP:(.*?)\]\]', respons)
-        seconds = re.findall(r'\[\[SECONDS:(.*?)\]\]', respons)
-        descriptions = re.findall(r'\[\[DESCRIPTION:(.*?)\]\]', respons)
-        codes = re.findall(r'\[\[CODE:(.*?)\]\]', respons)
-        timestampsdiscriptions = re.findall(r'\[\[TIMESTAMPDESCRIPTION:(.*?)\]\]', respons)
-        self.OUTPUT['timestamps'] = timestamps
-        self.OUTPUT['timestampsdiscriptions'] = timestampsdiscriptions
-        self.OUTPUT['seconds'] = seconds
-        self.OUTPUT['descriptions'] = descriptions
-        self.OUTPUT['codes'] = codes
+        self.OUTPUT=self.parse_response(respons, cues)
         if not self.OUTPUT['seconds'] and not self.OUTPUT['descriptions']=='연관 구간이 없습니다.':
             self.RGAout.second_procesed=False
         else:
@@ -931,21 +1114,28 @@ def print_with_output(filtter,query):
     # 환경변수(.env 파일) 로드: OPENAI_API_KEY 등이 설정되어 있어야 합니다.
     log_wrapper("<<::STATE::START INFERENCE>>")
     start_time=time.time()
-    filtter.enhance_query(query)
-    neg,pos=filtter.get_keywords_sametime()
-    outs,_=filtter.keyword_filter()
+    ctx=filtter.prepare_keywords(query)
+    outs,_=filtter.keyword_filter(ctx)
     log_wrapper(f"<<::STATE::KEYWORD FILTTERED>>키워드 필터링 결과 : {outs}")
     if outs.empty:
-        log_wrapper("추천 영상이 없습니다.")
-        log_wrapper("재시도 로직 필요함")
-        return retrun_fail_result() 
+        # 태그가 하나도 맞지 않아도 BM25 후보가 있으면 BM25/벡터 순위만으로 검색 (hybrid_search의 RRF에서 태그 순위는 빈 목록)
+        if not filtter.bm25_candidates(ctx):
+            log_wrapper("추천 영상이 없습니다. (태그/BM25 후보 없음)")
+            return retrun_fail_result()
+        log_wrapper("태그 필터링 결과가 없어 BM25/벡터 후보로 검색합니다.")
     log_wrapper(f"<<::STATE:: RETRIEVAL START>>")
-    RAG_out=RAGOUT(filtter,outs)
+    RAG_out=RAGOUT(filtter,ctx)
     log_wrapper(f"<<::STATE:: RETRIEVAL FNISH>>")
+    if RAG_out is None or RAG_out.sorted_result.empty:
+        log_wrapper("추천 영상이 없습니다. (검색 결과 없음)")
+        return retrun_fail_result()
     log_wrapper(f"RAG 출력 : {RAG_out.sorted_result}")
     extractor=Video_extractor(RAG_out)
     log_wrapper(f"<<::STATE::CLIP EXTRACTION START>>")
-    out=extractor.short_process()
+    if settings.YOUTUBE_PARALLEL_EXTRACTION_K > 1:
+        out=extractor.parallel_process(settings.YOUTUBE_PARALLEL_EXTRACTION_K)
+    else:
+        out=extractor.short_process()
     log_wrapper(f"<<::STATE::CLIP EXTRACTION FINISH>>")
     spend_time=time.time()-start_time
 
@@ -974,17 +1164,15 @@ if __name__ == "__main__":
     # 환경변수(.env 파일) 로드: OPENAI_API_KEY 등이 설정되어 있어야 합니다.
     start_time=time.time()
     filtter=Keyword_filter()
-    #filtter.dataloader.DataProcessor.set_day_limit()
-    #filtter.dataloader.DataProcessor.make_hesh_dict()
     query="갤럭시 탭 s10 리뷰"
-    filtter.enhance_query(query)
-    neg,pos=filtter.get_keywords_sametime()
-    outs,_=filtter.keyword_filter()
+    ctx=filtter.enhance_query(query)
+    neg,pos=filtter.get_keywords_sametime(ctx)
+    outs,_=filtter.keyword_filter(ctx)
     if outs.empty:
         log_wrapper("추천 영상이 없습니다.")
         log_wrapper("재시도 로직 필요함")
     #RAG_out,result=filtter.RAG_search()
-    RAG_out=RAGOUT(filtter)
+    RAG_out=RAGOUT(filtter,ctx)
     log_wrapper(f"RAG 출력 : {RAG_out.sorted_result}")
 
     extractor=Video_extractor(RAG_out)
@@ -0,0 +1,108 @@
+import json
+import os
+import threading
+import faiss
+import numpy as np
+from .CFAISS import WrIndexFlatL2
+from .queue_manager import add_log
+from .lexicon import model_tokens
+
+
+def log_wrapper(log_message):
+    add_log(log_message)
+
+
+def keyword_overlap(a, b):
+    """두 키워드 집합의 겹침 계수 |A∩B| / min(|A|, |B|) (둘 다 비어 있으면 1)"""
+    a, b = set(a), set(b)
+    if not a and not b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+class SemanticCache:
+    """
+    캐시된 쿼리의 임베딩을 FAISS 내적 인덱스(정규화 벡터 -> 코사인 유사도)에 보관하는 의미 기반 캐시 계층
+    유사도가 threshold 이상이고 추출 키워드의 겹침 계수가 min_overlap 이상이며 모델 토큰(모델 번호, 프로/에어 등)이
+    같은 가장 가까운 쿼리를 찾습니다. 임베딩은 '아이패드 에어 M2'/'아이패드 프로 M4'처럼 모델만 다른 질의도 가깝게 보기 때문입니다.
+    인덱스는 index_path에, 쿼리 원문과 키워드는 index_path + '.json'에 저장합니다.
+    """
+    def __init__(self, index_path, dimension=1536, threshold=0.92, min_overlap=0.5, top_k=5, embed_fn=None):
+        self.index_path = index_path
+        self.meta_path = index_path + ".json"
+        self.dimension = dimension
+        self.threshold = threshold
+        self.min_overlap = min_overlap
+        self.top_k = top_k
+        self.embed_fn = embed_fn or WrIndexFlatL2(dimension).get_openai_embedding
+        self._lock = threading.Lock()
+        if os.path.exists(self.index_path) and os.path.exists(self.meta_path):
+            self.index = faiss.read_index(self.index_path)
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        else:
+            self.index = faiss.IndexFlatIP(dimension)
+            self.entries = []  # [{'query_text': str, 'keywords': list}] (인덱스 행 순서)
+        self._texts = {entry["query_text"] for entry in self.entries}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def embed(self, text):
+        vector = np.asarray(self.embed_fn(text), dtype=np.float32).reshape(1, -1)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def lookup(self, text, keywords, vector=None):
+        """
+        Returns:
+            tuple: (캐시된 쿼리 원문, 코사인 유사도) 또는 None
+        """
+        if not self.entries:
+            return None
+        vector = self.embed(text) if vector is None else vector
+        with self._lock:
+            scores, rows = self.index.search(vector, min(self.top_k, len(self.entries)))
+            candidates = [(float(score), self.entries[row]) for score, row in zip(scores[0], rows[0]) if row != -1]
+        models = model_tokens(keywords)
+        for score, entry in candidates:
+            if score < self.threshold:
+                break
+            if model_tokens(entry["keywords"]) != models:
+                continue
+            if keyword_overlap(keywords, entry["keywords"]) >= self.min_overlap:
+                log_wrapper(f"의미 캐시 적중 (유사도 {score:.3f}) : {entry['query_text']}")
+                return entry["query_text"], score
+        return None
+
+    def add(self, text, keywords, vector=None):
+        """쿼리 임베딩을 추가하고 파일에 저장합니다 (같은 원문은 한 번만)."""
+        if text in self._texts:
+            return False
+        vector = self.embed(text) if vector is None else vector
+        with self._lock:
+            self.index.add(vector)
+            self.entries.append({"query_text": text, "keywords": list(keywords)})
+            self._texts.add(text)
+            self.save()
+        return True
+
+    def remove(self, text):
+        """쿼리 원문의 임베딩을 인덱스에서 지우고 저장합니다 (응답 캐시에서 만료/제거된 경우)."""
+        if text not in self._texts:
+            return False
+        with self._lock:
+            row = next(i for i, entry in enumerate(self.entries) if entry["query_text"] == text)
+            self.index.remove_ids(np.array([row], dtype=np.int64))  # 뒤쪽 행 번호가 하나씩 당겨짐
+            del self.entries[row]
+            self._texts.discard(text)
+            self.save()
+        return True
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        faiss.write_index(self.index, self.index_path)
+        with open(self.meta_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False)
@@ -0,0 +1,194 @@
+import re
+from collections import Counter, namedtuple
+import numpy as np
+from .bm25 import char_bigrams
+
+Cue = namedtuple("Cue", ["index", "start_ms", "end_ms", "text"])
+
+_TIMING = re.compile(
+    r'(\d{1,2}):(\d{2}):(\d{2})[,.](\d{1,3})\s*-->\s*(\d{1,2}):(\d{2}):(\d{2})[,.](\d{1,3})'
+)
+
+
+def _to_ms(h, m, s, ms):
+    return ((int(h) * 60 + int(m)) * 60 + int(s)) * 1000 + int(ms.ljust(3, "0"))
+
+
+def parse_srt(text):
+    """
+    SRT 문자열을 Cue(index, start_ms, end_ms, text) 목록으로 변환합니다.
+    index는 0부터 시작하는 큐 번호이며, 번호/시간 형식이 깨진 블록은 건너뜁니다.
+    """
+    if not isinstance(text, str):
+        return []
+    cues = []
+    for block in re.split(r'\n\s*\n', text.replace("\r\n", "\n")):
+        lines = block.strip().split("\n")
+        for i, line in enumerate(lines):
+            match = _TIMING.search(line)
+            if match:
+                body = " ".join(l.strip() for l in lines[i + 1:] if l.strip())
+                if body:
+                    groups = match.groups()
+                    cues.append(Cue(len(cues), _to_ms(*groups[:4]), _to_ms(*groups[4:]), body))
+                break
+    return cues
+
+
+def format_timestamp(ms):
+    """밀리초를 HH:MM:SS로 표기합니다."""
+    seconds = int(ms) // 1000
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def score_windows(cues, query, window=12, tokenize=char_bigrams):
+    """
+    연속한 window개 큐 구간마다 질의와의 BM25 유사 점수를 계산합니다.
+
+    Returns:
+        np.ndarray: 길이 max(len(cues) - window + 1, 1), i번째 값은 cues[i:i+window]의 점수
+    """
+    terms = list(set(tokenize(query)))
+    if not cues or not terms:
+        return np.zeros(max(len(cues) - window + 1, 1))
+    term_index = {t: j for j, t in enumerate(terms)}
+    tf = np.zeros((len(cues), len(terms)), dtype=np.float32)
+    for i, cue in enumerate(cues):
+        for token, count in Counter(tokenize(cue.text)).items():
+            j = term_index.get(token)
+            if j is not None:
+                tf[i, j] = count
+    df = (tf > 0).sum(axis=0)
+    idf = np.log(1 + (len(cues) - df + 0.5) / (df + 0.5))
+    window = min(window, len(cues))
+    cumulative = np.vstack([np.zeros((1, len(terms)), dtype=np.float32), np.cumsum(tf, axis=0)])
+    window_tf = cumulative[window:] - cumulative[:-window]
+    return (idf * window_tf / (window_tf + 1.2)).sum(axis=1)
+
+
+def select_windows(cues, query, window=12, max_windows=4):
+    """
+    점수가 높은 순으로 서로 겹치지 않는 큐 구간을 최대 max_windows개 고릅니다.
+
+    Returns:
+        list: 시간순으로 정렬된 (시작 큐 번호, 끝 큐 번호(미포함)) 목록
+    """
+    if not cues:
+        return []
+    window = min(window, len(cues))
+    scores = score_windows(cues, query, window)
+    taken = np.zeros(len(cues), dtype=bool)
+    spans = []
+    for start in np.argsort(-scores, kind="stable"):
+        if len(spans) >= max_windows or scores[start] <= 0 and spans:
+            break
+        if taken[start:start + window].any():
+            continue
+        taken[start:start + window] = True
+        spans.append((int(start), int(start) + window))
+    return sorted(spans)
+
+
+def render_windows(cues, spans):
+    """선택된 구간을 '[큐번호] HH:MM:SS 자막' 줄로 표기합니다. 구간 사이는 '...'로 구분합니다."""
+    blocks = []
+    for start, end in spans:
+        blocks.append("\n".join(
+            f"[{cue.index}] {format_timestamp(cue.start_ms)} {cue.text}" for cue in cues[start:end]
+        ))
+    return "\n...\n".join(blocks)
+
+
+class CueStore:
+    """
+    전체 영상의 자막 큐를 video_id 순서로 이어 붙인 컬럼형 저장소
+    video_ptr[v]:video_ptr[v+1]이 video v의 큐 범위이며, 큐 텍스트는 하나의 문자열(text)에서
+    text_ptr 오프셋으로 잘라 씁니다. 시간/텍스트 위치 조회는 이진 탐색입니다.
+    """
+    def __init__(self, video_ptr, start_ms, end_ms, text_ptr, text):
+        self.video_ptr = np.asarray(video_ptr, dtype=np.int64)
+        self.start_ms = np.asarray(start_ms, dtype=np.int64)
+        self.end_ms = np.asarray(end_ms, dtype=np.int64)
+        self.text_ptr = np.asarray(text_ptr, dtype=np.int64)
+        self.text = str(text)
+
+    @classmethod
+    def build(cls, subtitles, n_videos):
+        """
+        Args:
+            subtitles (iterable): (video_id, SRT 문자열) 쌍
+            n_videos (int): video_id 공간의 크기
+        """
+        per_video = {}
+        for video_id, subtitle in subtitles:
+            per_video[int(video_id)] = parse_srt(subtitle)
+        video_ptr = np.zeros(n_videos + 1, dtype=np.int64)
+        start_ms, end_ms, text_ptr, texts = [], [], [0], []
+        offset = 0
+        for video_id in range(n_videos):
+            for cue in per_video.get(video_id, []):
+                start_ms.append(cue.start_ms)
+                end_ms.append(cue.end_ms)
+                texts.append(cue.text)
+                offset += len(cue.text)
+                text_ptr.append(offset)
+            video_ptr[video_id + 1] = len(start_ms)
+        return cls(video_ptr, start_ms, end_ms, text_ptr, "".join(texts))
+
+    def save(self, path):
+        np.savez(path, video_ptr=self.video_ptr, start_ms=self.start_ms, end_ms=self.end_ms,
+                 text_ptr=self.text_ptr, text=np.array(self.text))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            return cls(f["video_ptr"], f["start_ms"], f["end_ms"], f["text_ptr"], f["text"].item())
+
+    def __len__(self):
+        return len(self.video_ptr) - 1
+
+    def _range(self, video_id):
+        video_id = int(video_id)
+        if not 0 <= video_id < len(self):
+            return 0, 0
+        return int(self.video_ptr[video_id]), int(self.video_ptr[video_id + 1])
+
+    def cue_count(self, video_id):
+        start, end = self._range(video_id)
+        return end - start
+
+    def cue(self, video_id, index):
+        """영상 내 index번째 큐"""
+        start, end = self._range(video_id)
+        i = start + int(index)
+        if not start <= i < end:
+            raise IndexError(f"video {video_id}에 {index}번 큐가 없습니다.")
+        return Cue(int(index), int(self.start_ms[i]), int(self.end_ms[i]),
+                   self.text[self.text_ptr[i]:self.text_ptr[i + 1]])
+
+    def cues(self, video_id):
+        """영상의 전체 큐 목록 (parse_srt와 같은 형식)"""
+        return [self.cue(video_id, i) for i in range(self.cue_count(video_id))]
+
+    def cue_at(self, video_id, ms):
+        """시각 ms를 포함하는(마지막으로 시작한) 큐 번호, 첫 큐 이전이거나 큐가 없으면 None"""
+        start, end = self._range(video_id)
+        i = int(np.searchsorted(self.start_ms[start:end], int(ms), side="right")) - 1
+        return i if i >= 0 else None
+
+    def cue_at_seconds(self, video_id, seconds):
+        return self.cue_at(video_id, float(seconds) * 1000)
+
+    def find_text(self, video_id, span):
+        """영상 자막에서 span 문자열이 처음 시작하는 큐 번호, 없으면 None"""
+        start, end = self._range(video_id)
+        if start == end or not span:
+            return None
+        base, limit = int(self.text_ptr[start]), int(self.text_ptr[end])
+        position = self.text.find(span, base, limit)
+        if position < 0:
+            return None
+        return int(np.searchsorted(self.text_ptr[start:end + 1], position, side="right")) - 1
+
+    def start_seconds(self, video_id, index):
+        return self.cue(video_id, index).start_ms // 1000
@@ -0,0 +1,73 @@
+import math
+from functools import lru_cache
+import tiktoken
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model=DEFAULT_MODEL):
+    """
+    모델별 tiktoken 인코더를 프로세스 단위로 한 번만 생성해 재사용합니다.
+    모델명을 알 수 없으면 gpt-4o 계열 인코딩(o200k_base)을 사용합니다.
+    """
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def encode(text, model=DEFAULT_MODEL):
+    return get_encoding(model).encode(text)
+
+
+def encode_batch(texts, model=DEFAULT_MODEL, num_threads=8):
+    """여러 텍스트를 한 번에 인코딩합니다 (tiktoken 내부 스레드 사용)."""
+    return get_encoding(model).encode_batch(list(texts), num_threads=num_threads)
+
+
+def count_tokens(text, model=DEFAULT_MODEL):
+    return len(get_encoding(model).encode(text))
+
+
+def count_tokens_batch(texts, model=DEFAULT_MODEL, num_threads=8):
+    return [len(tokens) for tokens in encode_batch(texts, model, num_threads)]
+
+
+@lru_cache(maxsize=256)
+def static_token_count(text, model=DEFAULT_MODEL):
+    """
+    프롬프트 템플릿, 제조사 라인업처럼 매 요청 동일한 블록의 토큰 수를 메모이즈합니다.
+    """
+    return count_tokens(text, model)
+
+
+def exceeds(text, target, model=DEFAULT_MODEL):
+    """
+    text의 토큰 수가 target을 넘는지 확인합니다.
+    토큰 하나는 최소 1바이트이므로 UTF-8 길이가 target 이하이면 인코딩 없이 False입니다.
+    """
+    if len(text.encode("utf-8")) <= target:
+        return False
+    return count_tokens(text, model) > target
+
+
+def truncate(text, max_tokens, model=DEFAULT_MODEL):
+    if not exceeds(text, max_tokens, model):
+        return text
+    encoding = get_encoding(model)
+    return encoding.decode(encoding.encode(text)[:max_tokens])
+
+
+def split_by_target(text, target=1400, model=DEFAULT_MODEL):
+    """
+    text를 토큰 수가 균등한 target 이하 크기의 청크들로 나눕니다.
+    """
+    encoding = get_encoding(model)
+    tokens = encoding.encode(text)
+    total_tokens = len(tokens)
+    num_splits = max(math.ceil(total_tokens / target), 1)
+    chunk_size = total_tokens // num_splits
+    token_chunks = [tokens[i * chunk_size:(i + 1) * chunk_size] for i in range(num_splits - 1)]
+    token_chunks.append(tokens[(num_splits - 1) * chunk_size:])  # 마지막 청크는 남은 모든 토큰 포함
+    return [encoding.decode(chunk) for chunk in token_chunks]
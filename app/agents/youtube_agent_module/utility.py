@@ -1,4 +1,6 @@
 import os
+import asyncio
+import threading
 import warnings
 from openai import OpenAI
 from dotenv import load_dotenv
@@ -10,9 +12,7 @@ from langchain_community.callbacks import get_openai_callback
 from pprint import pprint
 warnings.filterwarnings("ignore")
 from .queue_manager import add_log
-globalist=[]
 def log_wrapper(log_message):
-    globalist.append(log_message)
     add_log(log_message)  
 
 
@@ -98,10 +98,36 @@ class APIcontroller:
             response = chain.invoke({'context': context, 'input': query},return_only_outputs=False)
         return response,cb.total_tokens,cb.prompt_tokens,cb.completion_tokens
 
+    async def aget_answer(self,llm,prompt:ChatPromptTemplate ,query: str,context="") -> str:
+        """
+        get_answer의 비동기 버전입니다. 여러 호출을 asyncio.gather로 동시에 실행할 때 사용합니다.
+        """
+        if llm == 'endnode':
+            return query
+        chain = prompt | llm | StrOutputParser()
+        with get_openai_callback() as cb:
+            response = await chain.ainvoke({'context': context, 'input': query})
+        return response,cb.total_tokens,cb.prompt_tokens,cb.completion_tokens
+
 
 
 apicon=APIcontroller()
 
+_loop=None
+_loop_lock=threading.Lock()
+
+def run_coroutine(coro):
+    """
+    동기 코드(에이전트 워커 스레드)에서 코루틴을 실행하고 결과를 기다립니다.
+    비동기 LLM 클라이언트의 커넥션 풀이 닫힌 루프에 묶이지 않도록 전용 이벤트 루프 하나를 계속 재사용합니다.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop=asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-async-loop", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _loop).result()
+
 class Node:
     def __init__(self, prompt,model='openai',context="",gptmodel=None):
         self.controller = apicon
@@ -129,6 +155,11 @@ class Node:
             return query
         out,_,_,_=self.controller.get_answer(self.llm,self.prompt,query,self.context)
         return out
+    async def aget_response(self,query):
+        if self.llm == 'endnode':
+            return query
+        out,_,_,_=await self.controller.aget_answer(self.llm,self.prompt,query,self.context)
+        return out
     def get_response_with_token(self,query):
         if self.llm == 'endnode':
             return query
@@ -0,0 +1,143 @@
+import re
+import numpy as np
+import pandas as pd
+
+# 벡터스토어 청크 키 = video_id << CHUNK_BITS | page
+CHUNK_BITS = 16
+_LEGACY_KEY_PATTERN = re.compile(r'^self\.data\[(.*)\]\[1\]\[태그\]\[(.*)\]$')
+
+
+def chunk_key(video_id, page):
+    """
+    (video_id, page) 조합을 벡터스토어 hash_table에 쓰는 정수 키로 변환합니다.
+    스칼라와 배열 모두 입력 가능합니다.
+    """
+    return (np.asarray(video_id, dtype=np.int64) << CHUNK_BITS) | np.asarray(page, dtype=np.int64)
+
+
+def parse_legacy_key(key):
+    """
+    예전 문자열 식별자 `self.data[채널][1][태그][행]`을 (채널, 행)으로 분해합니다.
+    형식이 맞지 않으면 None을 반환합니다.
+    """
+    if isinstance(key, bytes):
+        key = key.decode("utf-8")
+    match = _LEGACY_KEY_PATTERN.match(str(key))
+    if not match:
+        return None
+    try:
+        return match.group(1), int(float(match.group(2)))
+    except ValueError:
+        return None
+
+
+class VideoTable:
+    """
+    정수 video_id로 영상의 채널/행을 찾는 컬럼형 조회 테이블
+    video_id는 배열 위치이며, 채널은 channels 목록의 코드로 저장합니다.
+    벡터스토어/BM25/자막 큐가 video_id로 저장되므로 한 번 부여한 (채널, 행) → video_id는 바꾸지 않고,
+    재수집 때는 extend로 새 (채널, 행)에만 뒤쪽 번호를 붙입니다.
+    """
+    def __init__(self, channels=None, channel_idx=None, row=None):
+        self.channels = list(channels) if channels is not None else []
+        self.channel_idx = np.asarray(channel_idx if channel_idx is not None else [], dtype=np.int32)
+        self.row = np.asarray(row if row is not None else [], dtype=np.int64)
+        self.upload_time = np.full(len(self.row), np.datetime64("NaT"), dtype="datetime64[ns]")
+        self._channel_code = {channel: code for code, channel in enumerate(self.channels)}
+        self._lookup = {
+            (int(code), int(r)): vid for vid, (code, r) in enumerate(zip(self.channel_idx, self.row))
+        }
+
+    @classmethod
+    def from_data(cls, data):
+        """
+        Dataprocessor.data({채널: [csv경로, DataFrame]})의 행 라벨 순서대로 video_id를 부여합니다.
+        정수로 해석할 수 없는 행 라벨은 건너뜁니다.
+        """
+        table = cls()
+        table.extend(data)
+        return table
+
+    def extend(self, data):
+        """
+        data에 있지만 테이블에 없는 (채널, 행)에만 새 video_id를 이어 붙입니다.
+        기존 video_id는 그대로이며, data에서 사라진 영상의 번호도 재사용하지 않습니다.
+
+        Returns:
+            int: 새로 추가된 영상 수
+        """
+        channel_idx = []
+        rows = []
+        for channel in data.keys():
+            code = self._channel_code.get(channel)
+            if code is None:
+                code = len(self.channels)
+                self.channels.append(channel)
+                self._channel_code[channel] = code
+            for label in data[channel][1].index:
+                try:
+                    if pd.isna(label):
+                        continue
+                    row = int(label)
+                except (TypeError, ValueError):
+                    continue
+                if (code, row) in self._lookup:
+                    continue
+                self._lookup[(code, row)] = len(self.row) + len(rows)
+                channel_idx.append(code)
+                rows.append(row)
+        if rows:
+            self.channel_idx = np.concatenate([self.channel_idx, np.asarray(channel_idx, dtype=np.int32)])
+            self.row = np.concatenate([self.row, np.asarray(rows, dtype=np.int64)])
+            self.upload_time = np.concatenate([
+                self.upload_time, np.full(len(rows), np.datetime64("NaT"), dtype="datetime64[ns]")
+            ])
+        return len(rows)
+
+    def __len__(self):
+        return len(self.row)
+
+    def id_of(self, channel, row):
+        """(채널, 행)에 해당하는 video_id, 없으면 None"""
+        code = self._channel_code.get(channel)
+        if code is None:
+            return None
+        return self._lookup.get((code, int(row)))
+
+    def id_of_legacy(self, key):
+        """예전 문자열 식별자를 video_id로 변환, 실패하면 None"""
+        parsed = parse_legacy_key(key)
+        if parsed is None:
+            return None
+        return self.id_of(*parsed)
+
+    def locate(self, video_id):
+        """video_id → (채널, 행)"""
+        video_id = int(video_id)
+        return self.channels[self.channel_idx[video_id]], int(self.row[video_id])
+
+    def channel_of(self, video_id):
+        return self.channels[self.channel_idx[int(video_id)]]
+
+    def row_of(self, video_id):
+        return int(self.row[int(video_id)])
+
+    def set_upload_time(self, data):
+        """채널별 업로드시각 컬럼을 video_id 순서의 datetime64 배열로 모읍니다."""
+        upload_time = np.full(len(self.row), np.datetime64("NaT"), dtype="datetime64[ns]")
+        for code, channel in enumerate(self.channels):
+            if channel not in data or "업로드시각" not in data[channel][1].columns:
+                continue
+            ids = np.nonzero(self.channel_idx == code)[0]
+            column = data[channel][1]["업로드시각"]
+            column = column[~column.index.duplicated()]
+            values = pd.to_datetime(column.reindex(self.row[ids]), errors="coerce")
+            upload_time[ids] = values.to_numpy(dtype="datetime64[ns]")
+        self.upload_time = upload_time
+
+    def to_dict(self):
+        return {"channels": self.channels, "channel_idx": self.channel_idx, "row": self.row}
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(state["channels"], state["channel_idx"], state["row"])
@@ -1,4 +1,5 @@
 import os
+import json
 from dotenv import load_dotenv
 
 # .env 파일 로드
@@ -17,6 +18,61 @@ UPSTAGE_API_KEY = os.getenv("UPSTAGE_API_KEY", "")
 REVIEW_DB_PATH = os.getenv("REVIEW_DB_PATH", "app/agents/tablet_reviews_db")
 SPEC_DB_PATH = os.getenv("SPEC_DB_PATH", "app/agents/spec_documents/product_details.csv")
 
+# YouTube 검색 설정
+YOUTUBE_MAX_VIDEO_AGE_DAYS = int(os.getenv("YOUTUBE_MAX_VIDEO_AGE_DAYS", "730"))
+YOUTUBE_RECENCY_HALF_LIFE_DAYS = float(os.getenv("YOUTUBE_RECENCY_HALF_LIFE_DAYS", "180"))
+YOUTUBE_RECENCY_WEIGHT = float(os.getenv("YOUTUBE_RECENCY_WEIGHT", "0.5"))
+YOUTUBE_BM25_TOKENIZER = os.getenv("YOUTUBE_BM25_TOKENIZER", "bigram")  # bigram 또는 okt
+YOUTUBE_BM25_CANDIDATES = int(os.getenv("YOUTUBE_BM25_CANDIDATES", "30"))  # 벡터 검색 전 BM25 후보 수 (0이면 사용 안 함)
+# 태그 유사어 검색: 자모 분해 비교 사용 여부와 기준값 (자모 문자열은 더 길어 음절 기준과 비율이 달라지므로 따로 둠)
+YOUTUBE_FUZZY_CUTOFF = float(os.getenv("YOUTUBE_FUZZY_CUTOFF", "0.85"))
+YOUTUBE_FUZZY_JAMO = os.getenv("YOUTUBE_FUZZY_JAMO", "false").lower() == "true"
+YOUTUBE_FUZZY_JAMO_CUTOFF = float(os.getenv("YOUTUBE_FUZZY_JAMO_CUTOFF", "0.85"))
+# 하이브리드 랭킹(RRF) 설정: 태그 점수, BM25, 벡터 순위의 가중치
+YOUTUBE_RRF_K = int(os.getenv("YOUTUBE_RRF_K", "60"))
+YOUTUBE_RRF_WEIGHT_TAG = float(os.getenv("YOUTUBE_RRF_WEIGHT_TAG", "1.0"))
+YOUTUBE_RRF_WEIGHT_BM25 = float(os.getenv("YOUTUBE_RRF_WEIGHT_BM25", "1.0"))
+YOUTUBE_RRF_WEIGHT_VECTOR = float(os.getenv("YOUTUBE_RRF_WEIGHT_VECTOR", "1.0"))
+YOUTUBE_HYBRID_TOP_K = int(os.getenv("YOUTUBE_HYBRID_TOP_K", "10"))
+# get_video_data 검색 방식: retriever(벡터 검색만, 기본) 또는 qa(RetrievalQA LLM 호출)
+YOUTUBE_RETRIEVAL_MODE = os.getenv("YOUTUBE_RETRIEVAL_MODE", "retriever")
+YOUTUBE_RETRIEVAL_RERANK = os.getenv("YOUTUBE_RETRIEVAL_RERANK", "mmr")  # mmr 또는 none
+YOUTUBE_MMR_LAMBDA = float(os.getenv("YOUTUBE_MMR_LAMBDA", "0.5"))
+# 캐시 키워드 추출용 Okt 형태소 분석기: 인스턴스 수, pos 결과 LRU 크기, 워커 프로세스 사용 여부
+YOUTUBE_OKT_POOL_SIZE = int(os.getenv("YOUTUBE_OKT_POOL_SIZE", "2"))
+YOUTUBE_OKT_CACHE_SIZE = int(os.getenv("YOUTUBE_OKT_CACHE_SIZE", "4096"))
+YOUTUBE_OKT_PROCESS = os.getenv("YOUTUBE_OKT_PROCESS", "false").lower() == "true"
+# 의미 기반 응답 캐시: 임베딩 코사인 유사도 기준값과 키워드 겹침 하한
+YOUTUBE_SEMANTIC_CACHE = os.getenv("YOUTUBE_SEMANTIC_CACHE", "true").lower() == "true"
+YOUTUBE_SEMANTIC_CACHE_THRESHOLD = float(os.getenv("YOUTUBE_SEMANTIC_CACHE_THRESHOLD", "0.92"))
+YOUTUBE_SEMANTIC_CACHE_MIN_OVERLAP = float(os.getenv("YOUTUBE_SEMANTIC_CACHE_MIN_OVERLAP", "0.5"))
+# 추론 실패(키워드 필터링 결과 없음) 결과를 캐시하는 시간(초)
+YOUTUBE_NEGATIVE_CACHE_TTL = float(os.getenv("YOUTUBE_NEGATIVE_CACHE_TTL", "600"))
+# 클립 추출 시 동시에 평가할 상위 영상 수 (기본 1: 기존 순차 재시도)
+# 2 이상이면 지연 시간은 줄지만 1순위에서 성공하는 쿼리도 k개를 모두 평가하므로 LLM 호출/토큰이 최대 k배로 늘어남
+YOUTUBE_PARALLEL_EXTRACTION_K = int(os.getenv("YOUTUBE_PARALLEL_EXTRACTION_K", "1"))
+# tag/excelerator 재수집 시 인덱싱 진행 저널도 지우고 처음부터 다시 태깅/요약할지 여부
+# (기본은 유지: 중단된 작업을 이어서 처리하며, 모델/프롬프트/자막이 바뀐 결과는 fingerprint로 걸러짐)
+YOUTUBE_RESET_INDEXING_JOURNAL = os.getenv("YOUTUBE_RESET_INDEXING_JOURNAL", "false").lower() == "true"
+
+# 캐시 저장소: sqlite(WAL, 여러 스레드/워커 동시 접근, 기존 .h5는 처음 한 번 가져옴) 또는 hdf5(기존 형식)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite")
+# 캐시 정책 (네임스페이스 = 캐시 파일 이름에서 확장자를 뺀 것, default는 공통 기본값)
+# ttl/compact_interval은 초 단위, eviction은 lru 또는 lfu
+# CACHE_POLICIES 환경 변수(JSON)로 네임스페이스별 항목을 덮어쓸 수 있음
+CACHE_POLICIES = {
+    "default": {"ttl": None, "max_entries": 10000, "eviction": "lru", "compact_interval": 600},
+    "quary_to_data": {"ttl": 7 * 86400, "max_entries": 5000, "eviction": "lru"},
+    "youtube_cache": {"ttl": 7 * 86400, "max_entries": 5000, "eviction": "lru"},
+    "review_cache": {"ttl": 30 * 86400, "max_entries": 5000, "eviction": "lfu"},
+    "Specification_cache": {"ttl": 30 * 86400, "max_entries": 5000, "eviction": "lfu"},
+}
+for _namespace, _policy in json.loads(os.getenv("CACHE_POLICIES", "{}")).items():
+    CACHE_POLICIES.setdefault(_namespace, {}).update(_policy)
+
+# 진행 상황 이벤트 버스 크기 (가득 차면 가장 오래된 이벤트부터 버림)
+PROGRESS_BUS_SIZE = int(os.getenv("PROGRESS_BUS_SIZE", "1000"))
+
 # 서버 설정
 HOST = os.getenv("HOST", "0.0.0.0")
 PORT = int(os.getenv("PORT", "8000")) 
\ No newline at end of file
@@ -2,6 +2,7 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from .config import settings
 from .routers import chat
+from .agents.youtube_agent_module.queue_manager import stop_log_consumer
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -20,3 +21,7 @@ app.add_middleware(
 # 라우터 등록
 app.include_router(chat.router, prefix="/api/chat", tags=["chat"])
 
+@app.on_event("shutdown")
+def shutdown_progress_consumer():
+    # 진행 상황 로그 소비자는 프로세스 공용이므로 앱 종료 시에만 멈춤
+    stop_log_consumer()
@@ -2,6 +2,8 @@ from fastapi import APIRouter, WebSocket
 from typing import Dict
 from app.agents.graph import define_initial_workflow, define_feedback_workflow, AgentState
 from app.agents.question_agent import QuestionAgent
+from app.agents.youtube_agent_module.queue_manager import ProgressSubscription, set_progress_session, reset_progress_session
+import asyncio
 import json
 from app.utils.logger import logger
 
@@ -14,10 +16,35 @@ def safe_none(value):
         return value
 
 
+async def forward_progress(websocket: WebSocket, client_id: str, progress: ProgressSubscription):
+    """이 연결에서 시작된 파이프라인의 단계 이벤트를 progress 프레임으로 보냄"""
+    while True:
+        event = await progress.get()
+        try:
+            await websocket.send_json({
+                "type": "progress",
+                "client_id": client_id,
+                "data": {
+                    "stage": event.stage,
+                    "message": event.message,
+                    "source": event.source,
+                    "seq": event.seq,
+                    "timestamp": event.created
+                }
+            })
+        except Exception as e:
+            logger.debug(f"progress 전송 실패 ({client_id}): {e}")
+            return
+
+
 @router.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
     await websocket.accept()
     active_connections[client_id] = websocket
+    # 이 연결에서 실행되는 에이전트가 발행하는 진행 이벤트에 client_id를 붙이고 구독
+    session_token = set_progress_session(client_id)
+    progress = ProgressSubscription(client_id)
+    progress_task = asyncio.create_task(forward_progress(websocket, client_id, progress))
     
     try:
         question_agent = QuestionAgent()
@@ -202,5 +229,8 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
     except Exception as e:
         logger.error(f"WebSocket error for client {client_id}: {e}")
     finally:
+        progress_task.cancel()
+        progress.close()
+        reset_progress_session(session_token)
         if client_id in active_connections:
             del active_connections[client_id]
@@ -32,5 +32,5 @@ def setup_logger(log_dir: str = "logs"):
 
     return logger
 
-# 기본 로거 설정
-logger = setup_logger()
+# 기본 로거 설정 (LOG_DIR 환경 변수로 로그 파일 위치 변경, 테스트에서는 임시 디렉토리)
+logger = setup_logger(os.getenv("LOG_DIR", "logs"))
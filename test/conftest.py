@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# app.utils.logger는 임포트 시점에 로그 파일을 열므로, 테스트 모듈을 임포트하기 전에 작업 트리 밖으로 돌림
+os.environ.setdefault("LOG_DIR", tempfile.mkdtemp(prefix="smartpick-test-logs-"))
@@ -0,0 +1,48 @@
+import numpy as np
+
+from app.agents.youtube_agent_module.bm25 import BM25Index, char_bigrams, strip_srt
+
+DOCUMENTS = [
+    (0, {"제목": "갤럭시 탭 S10 울트라 리뷰", "태그": "삼성 태블릿", "설명": "갤럭시탭 사용기", "자막": "오늘은 갤럭시 탭을 써봤습니다"}),
+    (1, {"제목": "아이패드 프로 M4 언박싱", "태그": "애플 태블릿", "설명": "아이패드 개봉기", "자막": "아이패드 프로 디스플레이가 좋습니다"}),
+    (3, {"제목": "맥북 에어 M3 후기", "태그": "애플 노트북", "설명": "", "자막": "배터리가 오래갑니다"}),
+]
+
+
+def test_char_bigrams():
+    assert char_bigrams("갤럭시 탭") == ["갤럭", "럭시", "탭"]
+    # 띄어쓰기가 달라도 bigram 대부분이 겹침
+    assert set(char_bigrams("갤럭시 탭")) & set(char_bigrams("갤럭시탭")) == {"갤럭", "럭시"}
+
+
+def test_strip_srt():
+    srt = "1\n00:00:01,000 --> 00:00:02,000\n안녕하세요\n\n2\n00:00:02,000 --> 00:00:03,500\n리뷰입니다\n"
+    assert strip_srt(srt).split() == ["안녕하세요", "리뷰입니다"]
+
+
+def test_search_ranks_matching_video_first():
+    index = BM25Index.build(DOCUMENTS, n_docs=4)
+    hits = index.search("갤럭시 탭 리뷰")
+    assert hits[0][0] == 0
+    assert all(score > 0 for _, score in hits)
+    assert index.search("아이패드 프로", k=1) == [(1, index.search("아이패드 프로")[0][1])]
+    # 색인되지 않은 video_id(2)는 점수가 0
+    assert index.scores("갤럭시")[2] == 0
+
+
+def test_search_candidates():
+    index = BM25Index.build(DOCUMENTS, n_docs=4)
+    assert [video_id for video_id, _ in index.search("태블릿", candidates=[1, 3])] == [1]
+    assert index.search("태블릿", candidates=[3]) == []
+
+
+def test_save_load_roundtrip(tmp_path):
+    index = BM25Index.build(DOCUMENTS, n_docs=4, k1=1.5)
+    path = str(tmp_path / "bm25_index.h5")
+    index.save(path)
+    loaded = BM25Index.load(path)
+    assert loaded.terms == index.terms
+    assert loaded.n_docs == 4 and loaded.tokenizer == "bigram" and loaded.k1 == 1.5
+    for query in ("갤럭시 탭", "애플 태블릿", "배터리"):
+        np.testing.assert_allclose(loaded.scores(query), index.scores(query))
+        assert loaded.search(query) == index.search(query)
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import multiprocessing
+import os
+
+import h5py
+import pytest
+
+from app.agents.report_agent_module.bsae_reporter import CacheManager, CachePolicy
+from app.agents.report_agent_module.cache_backend import HDF5Backend, SQLiteBackend, open_backend
+
+
+def _entry(key, name):
+    hashed_key = hashlib.sha256(str(key).encode("utf-8")).hexdigest()
+    return hashed_key, key, json.dumps({"key": key, "value": [{"name": name}]}), None
+
+
+def test_migrate_from_hdf5(tmp_path):
+    h5_path = str(tmp_path / "review_cache.h5")
+    # 메타데이터 속성이 없는 예전 형식 항목
+    legacy_key, _, legacy_value, _ = _entry("예전 키", "legacy")
+    with h5py.File(h5_path, "w") as f:
+        f.create_dataset(legacy_key, data=legacy_value.encode("utf-8"))
+    source = HDF5Backend(h5_path)
+    source.put_many([_entry("새 키", "new")])
+    source.touch_many({_entry("새 키", "new")[0]: (source.meta(_entry("새 키", "new")[0])["accessed"], 3)})
+    source.close()
+
+    backend = open_backend(h5_path, kind="sqlite")
+    assert isinstance(backend, SQLiteBackend)
+    assert backend.db_path == str(tmp_path / "review_cache.sqlite3")
+    assert backend.stats()[0] == 2
+    assert json.loads(backend.get(legacy_key)[0])["value"] == [{"name": "legacy"}]
+    assert backend.meta(_entry("새 키", "new")[0])["hits"] == 3
+
+    # 가져오기는 한 번만: 지운 항목이 다시 열 때 되살아나지 않음
+    assert backend.delete_many([legacy_key]) == ["예전 키"]
+    backend.close()
+    reopened = open_backend(h5_path, kind="sqlite")
+    assert reopened.stats()[0] == 1
+    reopened.close()
+    # 원본 HDF5 파일은 그대로 남음
+    with h5py.File(h5_path, "r") as f:
+        assert legacy_key in f
+
+
+def test_cache_manager_reads_migrated_entries(tmp_path):
+    h5_path = str(tmp_path / "Specification_cache.h5")
+    policy = CachePolicy(compact_interval=0)
+    old = CacheManager(h5_path, policy=policy, backend=HDF5Backend(h5_path))
+    old.add_hash({"갤럭시 S24": [{"spec": "스냅드래곤"}]})
+    old.clean()
+
+    manager = CacheManager(h5_path, policy=policy, backend=open_backend(h5_path, kind="sqlite"))
+    assert manager.get_values(["갤럭시 S24"]) == {"갤럭시 S24": [{"spec": "스냅드래곤"}]}
+    manager.clean()
+
+
+def test_put_many_is_atomic(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "cache.sqlite3"))
+    backend.put_many([_entry("a", "a")])
+    broken = [_entry("b", "b"), ("c", None, None, None)]  # 두 번째 행이 NOT NULL 제약 위반
+    with pytest.raises(Exception):
+        backend.put_many(broken)
+    assert backend.stats()[0] == 1
+    assert backend.get(_entry("b", "b")[0]) is None
+    backend.close()
+
+
+def _write_entries(db_path, worker, count):
+    backend = SQLiteBackend(db_path, busy_timeout=60)
+    for i in range(count):
+        backend.put_many([_entry(f"{worker}-{i}", str(i)), _entry(f"{worker}-{i}-pair", str(i))])
+        backend.touch_many({_entry("shared", "shared")[0]: (0.0, 1)})
+    backend.close()
+
+
+def test_concurrent_writers_across_processes(tmp_path):
+    db_path = str(tmp_path / "cache.sqlite3")
+    backend = SQLiteBackend(db_path)
+    backend.put_many([_entry("shared", "shared")])
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_write_entries, args=(db_path, worker, 20)) for worker in range(3)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(120)
+        assert process.exitcode == 0
+
+    assert backend.stats()[0] == 1 + 3 * 20 * 2
+    # 사용 횟수 증가가 프로세스 사이에서 유실되지 않음
+    assert backend.meta(_entry("shared", "shared")[0])["hits"] == 3 * 20
+    backend.close()
+
+
+def test_hdf5_compact_rewrites_file(tmp_path):
+    path = str(tmp_path / "cache.h5")
+    backend = HDF5Backend(path)
+    backend.put_many([_entry(f"k{i}", "x" * 1000) for i in range(50)])
+    backend.delete_many([_entry(f"k{i}", "")[0] for i in range(40)])
+    assert backend.compact() is True
+    assert not os.path.exists(path + ".compact")
+    assert backend.stats()[0] == 10
+    backend.close()
+    reopened = HDF5Backend(path)
+    assert sorted(meta["key"] for _, meta in reopened.iter_meta()) == sorted(f"k{i}" for i in range(40, 50))
+    reopened.close()
+
+
+def test_unknown_backend(tmp_path):
+    with pytest.raises(ValueError):
+        open_backend(str(tmp_path / "cache.h5"), kind="lmdb")
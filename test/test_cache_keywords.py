@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from app.agents.youtube_agent_module.cache import KeywordQueryManager
+from app.agents.youtube_agent_module.lexicon import extract_model_codes, model_tokens
+
+# 제품 질의 쌍: 사전 키워드만으로는 같거나 거의 같아지는 서로 다른 모델
+PRODUCT_PAIRS = [
+    ("갤럭시 S24 울트라 추천", "아이폰 15 프로 추천"),
+    ("아이패드 에어 M2 배터리", "아이패드 프로 M4 배터리"),
+]
+
+
+class FakeOkt:
+    """어절 단위 명사로 돌려주는 형태소 분석기 대역 (테스트 환경에는 JVM이 없음)"""
+    def pos(self, text, stem=True):
+        return [(word, "Noun") for word in text.split()]
+
+    async def apos(self, text, stem=True):
+        return self.pos(text, stem)
+
+
+class BrokenOkt:
+    def pos(self, text, stem=True):
+        raise RuntimeError("JVM을 시작할 수 없습니다")
+
+    async def apos(self, text, stem=True):
+        return self.pos(text, stem)
+
+
+@pytest.fixture(params=[FakeOkt, BrokenOkt], ids=["okt", "no-okt"])
+def manager(request, tmp_path):
+    manager = KeywordQueryManager(str(tmp_path / "query_index.h5"))
+    manager.keyword_extractor.okt = request.param()
+    yield manager
+    manager.close()
+
+
+def test_model_codes():
+    assert extract_model_codes("갤럭시 S24 울트라, 아이패드 M2") == ["s24", "m2"]
+    assert extract_model_codes("아이폰15 프로") == ["15"]
+    assert model_tokens(["아이패드", "M4", "프로", "배터리"]) == {"m4", "프로"}
+
+
+def test_lexicon_only_query_skips_morph_analysis(manager):
+    manager.keyword_extractor.okt = BrokenOkt()
+    assert manager.keyword_extractor.extract_keywords("아이패드 배터리") == ["아이패드", "배터리"]
+
+
+@pytest.mark.parametrize("first, second", PRODUCT_PAIRS)
+def test_product_pairs_get_distinct_keywords(manager, first, second):
+    extractor = manager.keyword_extractor
+    assert set(extractor.extract_keywords(first)) != set(extractor.extract_keywords(second))
+    assert model_tokens(extractor.extract_keywords(first)) != model_tokens(extractor.extract_keywords(second))
+    assert asyncio.run(extractor.aextract_keywords(first)) == extractor.extract_keywords(first)
+
+
+@pytest.mark.parametrize("first, second", PRODUCT_PAIRS + [(b, a) for a, b in PRODUCT_PAIRS])
+def test_product_pairs_do_not_share_cache_entries(manager, first, second):
+    manager.add_query(first)
+    assert manager.find_matching_queries(second, min_score=0.5) == []
+    matches = manager.find_matching_queries(first, min_score=0.5)
+    assert [match["query_text"] for match in matches] == [first]
@@ -0,0 +1,139 @@
+import time
+
+import pytest
+
+from app.agents.report_agent_module.bsae_reporter import CacheManager, CachePolicy, get_cache_policy
+from app.agents.report_agent_module.cache_backend import HDF5Backend, SQLiteBackend
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["hdf5", "sqlite"])
+def make_manager(request, tmp_path):
+    managers = []
+
+    def make(policy, name="cache.h5"):
+        path = str(tmp_path / name)
+        if request.param == "hdf5":
+            backend = HDF5Backend(path)
+        else:
+            backend = SQLiteBackend(str(tmp_path / name.replace(".h5", ".sqlite3")))
+        manager = CacheManager(path, policy=policy, backend=backend)
+        managers.append(manager)
+        return manager
+
+    yield make
+    for manager in managers:
+        manager.clean()
+
+
+def _item(name):
+    return [{"name": name}]
+
+
+def test_policy_from_settings():
+    policy = get_cache_policy("review_cache")
+    assert policy.eviction == "lfu" and policy.ttl == 30 * 86400
+    # 설정에 없는 네임스페이스는 default 정책
+    assert get_cache_policy("없는_캐시").max_entries == get_cache_policy("default").max_entries
+
+
+def test_rejects_non_h5_path(tmp_path):
+    with pytest.raises(ValueError):
+        CacheManager(str(tmp_path / "cache.json"), policy=CachePolicy(compact_interval=0))
+
+
+def test_ttl_expiry(make_manager, clock):
+    manager = make_manager(CachePolicy(ttl=60, compact_interval=0))
+    evicted = []
+    manager.on_evict.append(evicted.append)
+    manager.add_hash({"a": _item("a")})
+    manager.add_hash({"b": _item("b")}, ttl=600)  # 항목별 TTL이 정책보다 우선
+
+    clock.now += 30
+    assert manager.get_values(["a", "b"]) == {"a": _item("a"), "b": _item("b")}
+    clock.now += 60
+    assert "a" not in manager and "b" in manager
+    assert manager.get_values(["a", "b"]) == {"b": _item("b")}
+    assert evicted == ["a"]
+
+    clock.now += 600
+    assert manager.purge_expired() == 1
+    assert evicted == ["a", "b"]
+    # 만료된 키는 다시 저장할 수 있음
+    assert manager.add_hash({"a": _item("a2")}) is True
+    assert manager.get_values(["a"]) == {"a": _item("a2")}
+
+
+def test_add_skips_live_entries(make_manager, clock):
+    manager = make_manager(CachePolicy(compact_interval=0))
+    assert manager.add_hash({"a": _item("a")}) is True
+    assert manager.add_hash({"a": _item("other")}) is False
+    assert manager.add_hash({"b": [{"name": "b", "error": 1}]}, reject_key="error") is False
+    assert manager.get_value({"a": None, "b": None}) is False
+    assert manager.get_dict == {"a": _item("a")}
+
+
+def test_lru_eviction(make_manager, clock):
+    manager = make_manager(CachePolicy(max_entries=2, eviction="lru", compact_interval=0))
+    evicted = []
+    manager.on_evict.append(evicted.append)
+    manager.add_hash({"a": _item("a")})
+    clock.now += 1
+    manager.add_hash({"b": _item("b")})
+    clock.now += 1
+    manager.get_values(["a"])  # a가 더 최근에 사용됨
+    clock.now += 1
+    manager.add_hash({"c": _item("c")})
+
+    assert evicted == ["b"]
+    assert set(manager.get_values(["a", "b", "c"])) == {"a", "c"}
+
+
+def test_lfu_eviction(make_manager, clock):
+    manager = make_manager(CachePolicy(max_entries=2, eviction="lfu", compact_interval=0))
+    manager.add_hash({"a": _item("a")})
+    clock.now += 1
+    manager.add_hash({"b": _item("b")})
+    for _ in range(3):
+        clock.now += 1
+        manager.get_values(["a"])
+    clock.now += 1
+    manager.get_values(["b"])  # b가 가장 최근이지만 사용 횟수가 적음
+    clock.now += 1
+    manager.add_hash({"c": _item("c")})
+
+    assert set(manager.get_values(["a", "b", "c"])) == {"a", "c"}
+
+
+def test_max_bytes_bound(make_manager, clock):
+    manager = make_manager(CachePolicy(max_bytes=200, compact_interval=0))
+    for i in range(5):
+        clock.now += 1
+        manager.add_hash({f"k{i}": [{"text": "x" * 60}]})
+    count, total = manager.backend.stats()
+    assert total <= 200 and count < 5
+    assert "k4" in manager and "k0" not in manager
+
+
+def test_remove_and_compact(make_manager, clock):
+    manager = make_manager(CachePolicy(compact_interval=0))
+    manager.add_hash({"a": _item("a"), "b": _item("b")})
+    assert manager.compact() is False  # 삭제가 없으면 다시 쓰지 않음
+    assert manager.remove("a") is True
+    assert manager.remove("a") is False
+    assert manager.compact() is True
+    assert manager.get_values(["a", "b"]) == {"b": _item("b")}
@@ -0,0 +1,34 @@
+import random
+from difflib import get_close_matches
+
+from app.agents.youtube_agent_module.fuzzy import FuzzyIndex, jamo_normalize
+
+SYLLABLES = "아이패드프로에어갤럭시탭울트라노트북태블릿펜슬삼성애플폰카메라"
+
+
+def _vocabulary(rng, size=300):
+    return list({"".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 6))) for _ in range(size)})
+
+
+def test_matches_difflib():
+    """후보 필터링을 거쳐도 difflib.get_close_matches와 결과(순서 포함)가 같아야 합니다."""
+    rng = random.Random(0)
+    vocabulary = _vocabulary(rng)
+    index = FuzzyIndex(vocabulary)
+    for _ in range(200):
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(0, 6)))
+        for cutoff in (0.0, 0.6, 0.85):
+            assert index.get_close_matches(word, n=5, cutoff=cutoff) == get_close_matches(word, vocabulary, n=5, cutoff=cutoff)
+
+
+def test_default_cutoff():
+    vocabulary = ["갤럭시", "갤럭시탭", "아이패드"]
+    assert FuzzyIndex(vocabulary, cutoff=0.85).get_close_matches("갤럭시탭") == get_close_matches("갤럭시탭", vocabulary, n=3, cutoff=0.85)
+
+
+def test_jamo_normalize_matches_spacing_and_typos():
+    index = FuzzyIndex(["아이패드", "갤럭시탭", "태블릿", "아이폰"], normalize=jamo_normalize, cutoff=0.85)
+    assert index.get_close_matches("아이 패드") == ["아이패드"]
+    assert index.get_close_matches("갤럭시 탭") == ["갤럭시탭"]
+    assert index.get_close_matches("태블렛") == ["태블릿"]
+    assert "아이폰" not in index.get_close_matches("아이패드")
@@ -0,0 +1,166 @@
+import os
+import threading
+
+import h5py
+import numpy as np
+
+from app.agents.youtube_agent_module.cache import IndexStorage
+
+
+def _open(path, **kwargs):
+    # flush_interval=0이 아니면 백그라운드 반영이 돌기 때문에 테스트에서는 직접 flush를 호출
+    kwargs.setdefault("flush_interval", 3600)
+    return IndexStorage(str(path), **kwargs)
+
+
+def _h5_postings(path):
+    with h5py.File(path, "r") as f:
+        postings = {
+            dataset.attrs["keyword"]: [qid.decode("utf-8") for qid in dataset[:]]
+            for dataset in f["keywords"].values()
+        }
+        return sorted(f["queries"].keys()), postings
+
+
+def test_add_and_lookup(tmp_path):
+    storage = _open(tmp_path / "index.h5")
+    storage.add_query("q1", {"query_text": "아이패드 프로", "keywords": ["아이패드", "프로"]}, keywords=["아이패드", "프로"])
+    storage.add_query("q2", {"query_text": "아이패드 에어"}, keywords=["아이패드", "에어", "아이패드"])
+    storage.add_keyword_to_index("태블릿", "q2")
+
+    assert storage.get_queries_by_keyword("아이패드") == ["q1", "q2"]
+    assert storage.get_queries_by_keyword("태블릿") == ["q2"]
+    assert storage.get_queries_by_keyword("없음") == []
+    assert storage.get_query_info("q1")["keywords"] == ["아이패드", "프로"]
+    assert storage.get_query_info("q1")["query_id"] == "q1"
+    assert sorted(storage.get_all_keywords()) == ["아이패드", "에어", "태블릿", "프로"]
+    storage.close()
+
+
+def test_journal_replay_after_crash(tmp_path):
+    path = tmp_path / "index.h5"
+    storage = _open(path)
+    storage.add_query("q1", {"query_text": "갤럭시 탭"}, keywords=["갤럭시", "탭"])
+    storage.flush()
+    storage.add_query("q2", {"query_text": "갤럭시 S24"}, keywords=["갤럭시", "S24"])
+    storage.remove_query("q1")
+    # H5에 반영하지 않은 채 종료된 상황: 저널만 남김
+    storage._stop.set()
+    storage._journal.close()
+    storage.file.close()
+    assert os.path.getsize(storage.journal_path) > 0
+
+    reopened = _open(path)
+    assert reopened.get_all_queries() == ["q2"]
+    assert reopened.get_queries_by_keyword("갤럭시") == ["q2"]
+    assert reopened.get_queries_by_keyword("탭") == []
+    # 재적용 후 저널은 비워지고 H5에 반영됨
+    assert os.path.getsize(reopened.journal_path) == 0
+    reopened.close()
+    queries, postings = _h5_postings(path)
+    assert queries == ["q2"]
+    assert postings == {"갤럭시": ["q2"], "S24": ["q2"]}
+
+
+def test_append_only_postings_survive_reload(tmp_path):
+    path = tmp_path / "index.h5"
+    storage = _open(path, merge_every=2)
+    for i in range(5):
+        storage.add_query(f"q{i}", {"query_text": f"쿼리 {i}"}, keywords=["공통", f"k{i}"])
+        if i % 2:
+            storage.flush()
+    storage.close()
+
+    _, postings = _h5_postings(path)
+    assert postings["공통"] == [f"q{i}" for i in range(5)]
+    reopened = _open(path)
+    assert reopened.get_queries_by_keyword("공통") == [f"q{i}" for i in range(5)]
+    reopened.close()
+
+
+def test_remove_query(tmp_path):
+    path = tmp_path / "index.h5"
+    storage = _open(path)
+    storage.add_query("q1", {"query_text": "a"}, keywords=["공통", "하나"])
+    storage.add_query("q2", {"query_text": "b"}, keywords=["공통"])
+    storage.flush()
+
+    assert storage.remove_query("q1") is True
+    assert storage.remove_query("q1") is False
+    assert storage.remove_query("missing") is False
+    assert storage.get_query_info("q1") is None
+    assert storage.get_queries_by_keyword("공통") == ["q2"]
+    assert "하나" not in storage.get_all_keywords()
+    storage.flush()
+    queries, postings = _h5_postings(path)
+    assert queries == ["q2"]
+    assert postings == {"공통": ["q2"]}
+    storage.close()
+
+
+def test_compaction_after_removals(tmp_path):
+    path = tmp_path / "index.h5"
+    storage = _open(path, compact_after=3)
+    for i in range(6):
+        storage.add_query(f"q{i}", {"query_text": str(i), "tier": {"level": i}}, keywords=["공통", f"k{i}"])
+    storage.flush()
+    for i in range(3):
+        storage.remove_query(f"q{i}")
+    storage.flush()
+
+    # 삭제 수가 compact_after에 도달하면 파일을 메모리 기준으로 다시 씀
+    assert storage._removed == 0
+    assert not os.path.exists(str(path) + ".compact")
+    queries, postings = _h5_postings(path)
+    assert queries == ["q3", "q4", "q5"]
+    assert postings["공통"] == ["q3", "q4", "q5"]
+    assert "k0" not in postings
+    storage.close()
+
+    reopened = _open(path)
+    assert reopened.get_query_info("q4")["tier"] == {"level": 4}
+    assert reopened.get_queries_by_keyword("공통") == ["q3", "q4", "q5"]
+    reopened.close()
+
+
+def test_reader_during_delta_merge(tmp_path):
+    storage = _open(tmp_path / "index.h5", merge_every=100)
+    for i in range(3):
+        storage.add_query(f"q{i}", {"query_text": str(i)}, keywords=["공통"])
+    # 병합 도중(기반 배열은 교체됐고 델타는 아직 남은 상태)에 읽어도 중복/누락이 없음
+    delta = storage._deltas["공통"]
+    storage._postings["공통"] = np.asarray(delta, dtype=np.int32)
+    assert storage.get_queries_by_keyword("공통") == ["q0", "q1", "q2"]
+    del storage._deltas["공통"]
+    assert storage.get_queries_by_keyword("공통") == ["q0", "q1", "q2"]
+    # 실제 병합도 같은 결과
+    storage.add_query("q3", {"query_text": "3"}, keywords=["공통"])
+    storage._merge_delta("공통")
+    assert "공통" not in storage._deltas
+    assert storage.get_queries_by_keyword("공통") == ["q0", "q1", "q2", "q3"]
+    storage.close()
+
+
+def test_concurrent_reads_see_every_added_query(tmp_path):
+    storage = _open(tmp_path / "index.h5", merge_every=2)
+    added = []
+    errors = []
+    done = threading.Event()
+
+    def reader():
+        while not done.is_set():
+            expected = list(added)
+            found = storage.get_queries_by_keyword("공통")
+            if len(found) != len(set(found)) or not set(expected) <= set(found):
+                errors.append((expected, found))
+                return
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    for i in range(300):
+        storage.add_query(f"q{i}", {"query_text": str(i)}, keywords=["공통"])
+        added.append(f"q{i}")
+    done.set()
+    thread.join()
+    storage.close()
+    assert errors == []
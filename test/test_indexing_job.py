@@ -0,0 +1,93 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from app.agents.youtube_agent_module import indexing_job
+from app.agents.youtube_agent_module.dataloader import Dataprocessor
+
+SRT = "1\n00:00:01,000 --> 00:00:02,000\n{text}\n"
+
+
+class FakeIndexer:
+    model = "gpt-4o-mini"
+    prompt = "태그를 추출하세요"
+
+    def __init__(self, fail_rows=()):
+        self.fail_rows = set(fail_rows)
+        self.calls = []
+
+    def respond(self, script, context):
+        row = int(script.split("설명번호")[1][0])
+        self.calls.append(row)
+        if row in self.fail_rows:
+            raise RuntimeError("API 오류")
+        return f"[[태그{row}]]", 10
+
+
+@pytest.fixture(autouse=True)
+def fast_job(monkeypatch):
+    # tiktoken 인코딩은 네트워크가 필요하고, 재시도 백오프는 기다릴 필요가 없음
+    monkeypatch.setattr(indexing_job.tokenizer, "count_tokens", lambda text: len(text))
+    real_sleep = asyncio.sleep
+    monkeypatch.setattr(indexing_job.asyncio, "sleep", lambda delay: real_sleep(0))
+
+
+@pytest.fixture
+def processor(tmp_path):
+    channel_dir = tmp_path / "youtube" / "채널"
+    channel_dir.mkdir(parents=True)
+    for row in range(3):
+        (channel_dir / f"채널.{row}.srt").write_text(SRT.format(text=f"자막 {row}"), encoding="utf-8")
+    df = pd.DataFrame({
+        "인덱스": [0, 1, 2],
+        "설명": [f"설명번호{row}" for row in range(3)],
+        "자막": [""] * 3,
+        "태그": [None] * 3,
+    })
+    return SimpleNamespace(
+        mode="tag",
+        target_dir=str(tmp_path / "youtube"),
+        data={"채널": ["채널.csv", df]},
+        tot_doc_len=0,
+        pickle_file=str(tmp_path / "data.pkl"),
+        save_data_to_pickle=lambda data, filename: None,
+        indexer=None,
+    )
+
+
+def _journal_keys(path):
+    with open(path, encoding="utf-8") as f:
+        return sorted(json.loads(line)["key"] for line in f)
+
+
+def test_second_run_skips_journaled_tasks(processor, tmp_path):
+    journal = str(tmp_path / "indexing_progress.jsonl")
+    processor.indexer = FakeIndexer(fail_rows={1})
+    Dataprocessor.load_srt_in_folder(processor, workers=2, journal_path=journal)
+    # 실패가 남으면 저널을 남겨 둠
+    assert _journal_keys(journal) == ["채널/0", "채널/2"]
+
+    # 재수집 때 피클을 지워도 저널은 유지 (reset_journal일 때만 삭제)
+    paths = {name: str(tmp_path / f"{name}.pkl") for name in ("lang_path", "summary_path", "index_table", "keyword_set")}
+    Dataprocessor.remove_pickle(processor, bm25_index=str(tmp_path / "bm25.h5"),
+                                cue_store=str(tmp_path / "cue.npz"), indexing_journal=journal, **paths)
+    assert _journal_keys(journal) == ["채널/0", "채널/2"]
+
+    processor.indexer = FakeIndexer()
+    Dataprocessor.load_srt_in_folder(processor, workers=2, journal_path=journal)
+    assert processor.indexer.calls == [1]
+    assert list(processor.data["채널"][1]["태그"]) == [[["태그0"]], [["태그1"]], [["태그2"]]]
+    # 모든 작업이 끝나면 저널 삭제
+    assert not (tmp_path / "indexing_progress.jsonl").exists()
+
+
+def test_reset_journal_removes_it(processor, tmp_path):
+    journal = tmp_path / "indexing_progress.jsonl"
+    journal.write_text('{"key": "채널/0", "text": "[[태그0]]", "tokens": 1, "fingerprint": null}\n', encoding="utf-8")
+    paths = {name: str(tmp_path / f"{name}.pkl") for name in ("lang_path", "summary_path", "index_table", "keyword_set")}
+    Dataprocessor.remove_pickle(processor, bm25_index=str(tmp_path / "bm25.h5"), cue_store=str(tmp_path / "cue.npz"),
+                                indexing_journal=str(journal), reset_journal=True, **paths)
+    assert not journal.exists()
@@ -0,0 +1,59 @@
+import pytest
+
+from app.agents.youtube_agent_module.lexicon import AhoCorasick, LexiconMatcher, normalize_text
+
+CATEGORIES = {
+    "태블릿": ["아이패드", "갤럭시 탭", "태블릿"],
+    "스마트폰": ["갤럭시", "아이폰", "폰"],
+    "부품": ["램", "카메라", "배터리", "S펜"],
+}
+TIERS = {"고급": ["프로", "울트라"], "보급": ["에어", "라이트"]}
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return LexiconMatcher(CATEGORIES, TIERS)
+
+
+def test_normalize_text():
+    assert normalize_text("Galaxy  탭") == ("galaxy탭", [True, False, False, False, False, False, True])
+
+
+def test_aho_corasick_finds_overlapping_patterns():
+    automaton = AhoCorasick(["he", "she", "his", "hers"])
+    found = sorted((start, end, automaton.patterns[pid]) for start, end, pid in automaton.finditer("ushers"))
+    assert found == [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")]
+
+
+def test_extract_prefers_longest_and_ignores_spacing(matcher):
+    # '갤럭시탭'은 '갤럭시'가 아니라 더 긴 '갤럭시 탭'으로 인식
+    assert matcher.extract("갤럭시탭 배터리") == ["갤럭시 탭", "배터리"]
+    assert matcher.extract("아이 패드 프로") == ["아이패드", "프로"]
+    assert matcher.extract("아이패드 아이패드") == ["아이패드"]
+
+
+def test_extract_word_boundaries(matcher):
+    # 한 글자 단어는 어절 시작에서만: '프로그램'의 '램' 제외
+    assert matcher.extract("프로그램 추천") == ["프로"]
+    assert matcher.extract("램 용량") == ["램"]
+    # 영문/숫자 단어는 앞뒤가 영문/숫자가 아닐 때만
+    assert matcher.extract("S펜 지원") == ["S펜"]
+    assert matcher.extract("XS펜") == []
+
+
+@pytest.mark.parametrize("text, keywords, residue", [
+    ("아이패드 배터리", ["아이패드", "배터리"], []),
+    ("아이패드 에어 M2 배터리", ["아이패드", "에어", "배터리"], ["m2"]),
+    ("갤럭시 S24 울트라 카메라", ["갤럭시", "울트라", "카메라"], ["s24"]),
+    ("아이폰 15 프로 카메라 추천", ["아이폰", "프로", "카메라"], ["15", "추천"]),
+    # 한 글자 단어가 어절 중간에 있으면 어절 전체가 나머지로 남음
+    ("폴더블폰 추천", [], ["폴더블폰", "추천"]),
+])
+def test_extract_with_residue(matcher, text, keywords, residue):
+    assert matcher.extract_with_residue(text) == (keywords, residue)
+
+
+def test_category_and_tier(matcher):
+    keywords = matcher.extract("갤럭시 탭 울트라와 아이폰 에어")
+    assert matcher.match_category(keywords) == {"태블릿": ["갤럭시 탭"], "스마트폰": ["아이폰"], "부품": []}
+    assert matcher.match_tier(keywords) == {"고급": ["울트라"], "보급": ["에어"]}
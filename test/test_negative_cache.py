@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.agents.youtube_agent import YouTubeAgent
+from app.agents.youtube_agent_module.cache import YouTubeCacheSystem
+from app.agents.youtube_agent_module.cache_replay import bigram_embedding
+
+FAIL = {"youtube": {"raw_meta_data": {"제목": "인덱싱 오류로 적합한 데이터 추출 실패"}}}
+
+
+def _result(title):
+    return {"youtube": {"raw_meta_data": {"제목": title}}}
+
+
+@pytest.fixture
+def make_system(tmp_path):
+    systems = []
+
+    def make(semantic=False):
+        system = YouTubeCacheSystem(
+            data_path=str(tmp_path / "quary_to_data.h5"),
+            qary_path=str(tmp_path / "keyword_to_quary.h5"),
+            semantic=semantic,
+            embed_fn=bigram_embedding(),
+        )
+        systems.append(system)
+        return system
+
+    yield make
+    for system in systems:
+        system.close()
+
+
+def test_negative_served_on_exact_key(make_system):
+    system = make_system()
+    system.add_negative(["갤럭시 S24 카메라 비교"], [FAIL])
+    assert system.find_matching_queries(["갤럭시 S24 카메라 비교"]) == (FAIL, "갤럭시 S24 카메라 비교")
+    # 공백만 다른 쿼리는 같은 키
+    assert system.find_matching_queries("갤럭시S24 카메라 비교")[0] == FAIL
+
+
+def test_negative_not_served_on_keyword_overlap(make_system):
+    system = make_system()
+    system.add_negative("갤럭시 S24 카메라 비교", FAIL)
+    assert system.find_keyword_match("갤럭시 S24 카메라 비교 영상") is False
+    assert system.find_matching_queries("갤럭시 S24 카메라 비교 영상") is False
+
+    # 실패 결과보다 점수가 낮아도 정상 결과는 키워드 계층에서 반환
+    system.add_query("갤럭시 S24 카메라", _result("S24 카메라 리뷰"))
+    assert system.find_matching_queries("갤럭시 S24 카메라 비교 영상")[0] == _result("S24 카메라 리뷰")
+
+
+def test_negative_served_on_semantic_hit(make_system):
+    system = make_system(semantic=True)
+    system.add_negative("갤럭시 S24 카메라 비교 리뷰 영상", FAIL)
+    assert system.find_keyword_match("갤럭시 S24 카메라 비교 리뷰 영상들") is False
+    assert system.find_matching_queries("갤럭시 S24 카메라 비교 리뷰 영상들")[0] == FAIL
+
+
+class RecordingCache:
+    def __init__(self):
+        self.calls = []
+
+    def add_query(self, query, result):
+        self.calls.append(("positive", query))
+
+    def add_negative(self, query, result):
+        self.calls.append(("negative", query))
+
+
+@pytest.mark.parametrize("rag_out, expected", [
+    (None, [("negative", ["q"])]),
+    (SimpleNamespace(marker=True), [("positive", ["q"])]),
+    # 클립 추출 실패는 일시 오류일 수 있으므로 캐시하지 않음
+    (SimpleNamespace(marker=False), []),
+])
+def test_run_inference_caches_only_filter_failures(rag_out, expected):
+    cache = RecordingCache()
+    agent = SimpleNamespace(CacheSystem=cache, extract_from_query=lambda query: (FAIL, rag_out))
+    assert YouTubeAgent.run_inference(agent, ["q"]) == FAIL
+    assert cache.calls == expected
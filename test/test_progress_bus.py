@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+from app.agents.youtube_agent_module.queue_manager import (
+    LogConsumer,
+    ProgressBus,
+    ProgressSubscription,
+    get_log_consumer,
+    reset_progress_session,
+    set_progress_session,
+    stop_log_consumer,
+)
+
+
+def _drain(bus):
+    events = []
+    while True:
+        event = bus.get(timeout=0)
+        if event is None:
+            return events
+        events.append(event)
+
+
+def test_publish_parses_stage():
+    bus = ProgressBus(maxsize=10)
+    event = bus.publish("<<::STATE::KEYWORD FILTTERED>> 키워드 3개")
+    assert event.stage == "KEYWORD FILTTERED" and event.message == "키워드 3개"
+    plain = bus.publish("일반 로그", source="search")
+    assert plain.stage is None and plain.source == "search" and plain.seq == event.seq + 1
+
+
+def test_overflow_drops_oldest():
+    bus = ProgressBus(maxsize=3)
+    for i in range(10):
+        bus.publish(f"로그 {i}")
+    assert bus.dropped == 7
+    assert bus.queue.qsize() == 3
+    assert [event.message for event in _drain(bus)] == ["로그 7", "로그 8", "로그 9"]
+
+
+def test_session_tag_follows_context():
+    bus = ProgressBus(maxsize=10)
+    token = set_progress_session("client-a")
+    try:
+        tagged = bus.publish("세션 안")
+
+        async def in_thread():
+            return await asyncio.to_thread(bus.publish, "스레드 안")
+
+        threaded = asyncio.run(in_thread())
+    finally:
+        reset_progress_session(token)
+    assert tagged.session_id == "client-a"
+    assert threaded.session_id == "client-a"
+    assert bus.publish("세션 밖").session_id is None
+
+
+@pytest.fixture
+def consumer():
+    consumer = LogConsumer(max_logs=5)
+    consumer.bus = ProgressBus(maxsize=100)
+    consumer.run()
+    yield consumer
+    consumer.stop()
+
+
+def test_consumer_keeps_bounded_recent_logs(consumer):
+    for i in range(20):
+        consumer.bus.publish(f"로그 {i}")
+    consumer.bus.publish("<<::STATE::RETRIEVAL START>>")
+    consumer.bus.queue.join()
+    assert len(consumer.recent_logs) == 5
+    assert consumer.state["status"] == "RETRIEVAL START"
+    assert consumer.state["processed_logs"] == 21
+    assert consumer.stop() is True
+    assert consumer.stop() is False
+
+
+def test_subscription_routes_by_session(consumer):
+    async def scenario():
+        async with ProgressSubscription("a", consumer=consumer) as sub_a, \
+                ProgressSubscription("b", consumer=consumer, stages_only=False) as sub_b:
+            for session, message in (("a", "<<::STATE::RETRIEVAL START>>"), ("b", "b 로그"),
+                                     ("a", "a 일반 로그"), (None, "<<::STATE::세션 없음>>"),
+                                     ("b", "<<::STATE::CLIP EXTRACTION START>>")):
+                token = set_progress_session(session)
+                consumer.bus.publish(message)
+                reset_progress_session(token)
+            await asyncio.to_thread(consumer.bus.queue.join)
+            await asyncio.sleep(0)
+            received_a = [sub_a.queue.get_nowait() for _ in range(sub_a.queue.qsize())]
+            received_b = [sub_b.queue.get_nowait() for _ in range(sub_b.queue.qsize())]
+        return received_a, received_b
+
+    received_a, received_b = asyncio.run(scenario())
+    # a는 단계 이벤트만, b는 모든 이벤트를 받고 다른 세션/세션 없는 이벤트는 받지 않음
+    assert [event.stage for event in received_a] == ["RETRIEVAL START"]
+    assert [event.message for event in received_b] == ["b 로그", ""]
+    assert received_b[1].stage == "CLIP EXTRACTION START"
+    # 닫힌 구독은 해제됨
+    assert consumer._session_subscribers == {}
+
+
+def test_subscription_queue_drops_oldest(consumer):
+    async def scenario():
+        async with ProgressSubscription("a", maxsize=2, consumer=consumer) as sub:
+            token = set_progress_session("a")
+            for i in range(5):
+                consumer.bus.publish(f"<<::STATE::단계 {i}>>")
+            reset_progress_session(token)
+            await asyncio.to_thread(consumer.bus.queue.join)
+            await asyncio.sleep(0)
+            return [(await sub.get()).stage for _ in range(sub.queue.qsize())]
+
+    assert asyncio.run(scenario()) == ["단계 3", "단계 4"]
+
+
+def test_shared_consumer_restarts_after_stop():
+    shared = get_log_consumer()
+    assert get_log_consumer() is shared and shared.thread.is_alive()
+    # 에이전트 정리(clean)에서 멈춰도 다음 요청은 살아 있는 소비자를 받음
+    shared.stop()
+    restarted = get_log_consumer()
+    assert restarted is not shared and restarted.thread.is_alive()
+    assert stop_log_consumer() is True
+    assert not restarted.thread.is_alive()
+    assert stop_log_consumer() is False
@@ -0,0 +1,110 @@
+from app.agents.youtube_agent_module.srt import CueStore, format_timestamp, parse_srt, select_windows
+
+SRT = """1
+00:00:01,000 --> 00:00:03,500
+안녕하세요 오늘은 갤럭시 탭 리뷰입니다
+
+2
+00:00:04,000 --> 00:00:06,000
+먼저 디자인부터
+
+3
+00:00:07,000 --> 00:00:09,00
+카메라 화질 비교
+
+번호만 있고 시간이 없는 블록
+
+4
+00:01:10.500 --> 00:01:12.000
+배터리는 하루 종일 갑니다
+두 줄 자막
+
+5
+00:02:00,000 --> 00:02:01,000
+"""
+
+
+def test_parse_srt():
+    cues = parse_srt(SRT)
+    assert [cue.index for cue in cues] == [0, 1, 2, 3]
+    assert cues[0].start_ms == 1000 and cues[0].end_ms == 3500
+    # 밀리초 자릿수가 모자라면 뒤를 0으로 채움
+    assert cues[2].end_ms == 9000
+    # 시간 줄이 없는 블록과 본문이 빈 큐는 건너뛰고, 여러 줄 본문은 공백으로 합침
+    assert cues[3].start_ms == 70_500
+    assert cues[3].text == "배터리는 하루 종일 갑니다 두 줄 자막"
+    assert parse_srt(None) == []
+    assert format_timestamp(3_723_999) == "01:02:03"
+
+
+def test_parse_srt_multiline_and_empty_body():
+    cues = parse_srt("1\n00:01:10.500 --> 00:01:12.000\n배터리는\n하루 종일\n\n2\n00:02:00,000 --> 00:02:01,000\n")
+    assert len(cues) == 1
+    assert cues[0].start_ms == 70_500 and cues[0].text == "배터리는 하루 종일"
+
+
+def _cues(texts):
+    srt = "\n\n".join(
+        f"{i + 1}\n00:00:{i:02d},000 --> 00:00:{i:02d},900\n{text}" for i, text in enumerate(texts)
+    )
+    return parse_srt(srt)
+
+
+def test_select_windows():
+    cues = _cues(["인사"] * 5 + ["배터리 성능", "배터리 충전"] + ["잡담"] * 5 + ["카메라 화질"] + ["잡담"] * 3)
+    spans = select_windows(cues, "배터리", window=3, max_windows=2)
+    assert len(spans) <= 2
+    assert spans == sorted(spans)
+    assert any(start <= 5 and 7 <= end for start, end in spans)
+    for (_, end), (start, _) in zip(spans, spans[1:]):
+        assert end <= start
+    # 질의와 겹치는 구간이 없어도 첫 구간 하나는 반환
+    assert len(select_windows(cues, "존재하지않는단어", window=3)) == 1
+    assert select_windows([], "배터리") == []
+    assert select_windows(cues[:2], "배터리", window=12) == [(0, 2)]
+
+
+def test_cue_store():
+    store = CueStore.build([(0, SRT), (2, "1\n00:00:05,000 --> 00:00:06,000\n두번째 영상")], n_videos=3)
+    assert len(store) == 3
+    assert store.cue_count(0) == 4 and store.cue_count(1) == 0 and store.cue_count(2) == 1
+    assert store.cues(0) == parse_srt(SRT)
+    assert store.cue(2, 0).text == "두번째 영상"
+
+    assert store.cue_at(0, 500) is None
+    assert store.cue_at(0, 1000) == 0
+    assert store.cue_at(0, 5000) == 1
+    assert store.cue_at(0, 999_999) == 3
+    assert store.cue_at_seconds(2, 5) == 0
+    assert store.cue_at(1, 1000) is None
+    assert store.cue_at(7, 1000) is None
+
+    assert store.find_text(0, "디자인") == 1
+    assert store.find_text(0, "안녕하세요") == 0
+    assert store.find_text(0, "두번째 영상") is None
+    assert store.find_text(2, "두번째") == 0
+    assert store.find_text(1, "디자인") is None
+    assert store.start_seconds(0, 1) == 4
+
+
+def test_cue_store_save_load(tmp_path):
+    store = CueStore.build([(0, SRT)], n_videos=1)
+    path = str(tmp_path / "cue_store.npz")
+    store.save(path)
+    loaded = CueStore.load(path)
+    assert loaded.cues(0) == store.cues(0)
+
+
+def test_make_clip_without_readable_seconds():
+    from types import SimpleNamespace
+    from app.agents.youtube_agent_module.search import RAGOUT
+
+    store = CueStore.build([(0, SRT)], n_videos=1)
+    link = "https://www.youtube.com/watch?v=abc"
+    rag = SimpleNamespace(second_procesed=True, fomatted_data={"data": {"링크": link}, "video_id": 0}, cue_store=store)
+    rag.snap_seconds = lambda seconds: RAGOUT.snap_seconds(rag, seconds)
+    for seconds, expected in ((["5"], link + "&t=4s"), (["약 몇 초"], link), ([], link), ("", link)):
+        rag.video_extraction = {"seconds": seconds, "start_seconds": None}
+        assert RAGOUT.make_clip(rag) == expected
+    rag.video_extraction = {"seconds": [], "start_seconds": 70}
+    assert RAGOUT.make_clip(rag) == link + "&t=70s"
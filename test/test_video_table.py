@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+import pandas as pd
+
+from app.agents.youtube_agent_module.dataloader import Dataprocessor
+from app.agents.youtube_agent_module.video_table import VideoTable
+
+
+def _data(rows_by_channel):
+    return {
+        channel: [f"{channel}.csv", pd.DataFrame({"태그": [[[f"{channel}{row}", "공통"]] for row in rows]}, index=rows)]
+        for channel, rows in rows_by_channel.items()
+    }
+
+
+def test_extend_keeps_existing_ids():
+    table = VideoTable.from_data(_data({"A": [0, 1], "B": [0, 1]}))
+    assert [table.locate(i) for i in range(len(table))] == [("A", 0), ("A", 1), ("B", 0), ("B", 1)]
+
+    # B의 0번 행이 사라지고 A에 새 행, 새 채널 C가 추가된 재수집
+    assert table.extend(_data({"A": [0, 1, 2], "B": [1], "C": [0]})) == 2
+    assert table.id_of("B", 1) == 3
+    assert table.locate(2) == ("B", 0)  # 사라진 영상의 번호도 재사용하지 않음
+    assert table.id_of("A", 2) == 4 and table.id_of("C", 0) == 5
+
+    restored = VideoTable.from_dict(table.to_dict())
+    assert [restored.locate(i) for i in range(len(restored))] == [table.locate(i) for i in range(len(table))]
+
+
+def test_setup_tag_table_after_reingest_with_removed_rows():
+    processor = SimpleNamespace(
+        video_table=VideoTable.from_data(_data({"A": [0, 1], "B": [0, 1]})),
+        data=_data({"A": [0, 1], "B": [1]}),  # B 0번 영상이 재수집에서 빠짐
+        save_data_to_pickle=lambda data, filename: None,
+    )
+    processor.set_upload_index = lambda: Dataprocessor.set_upload_index(processor)
+    Dataprocessor.setup_tag_table(processor)
+
+    table = processor.Index_table
+    assert list(table.columns) == [0, 1, 2, 3]
+    # 사라진 영상(video_id 2)은 태그가 비어 있고, 다른 영상의 video_id는 그대로
+    assert table[2].sum() == 0
+    assert table.loc["B1", 3] == 1 and table.loc["A0", 0] == 1
+    assert table.loc["공통"].tolist() == [1, 1, 0, 1]
+    assert "B0" not in processor.keyword_set